@@ -0,0 +1,76 @@
+# Сравнение пропускной способности посимвольного шифра:
+# чисто питоновский цикл против векторизованного пути на NumPy
+# и табличного байтового режима.
+#
+# Запуск из корня репозитория:
+#     python -m benchmarks.bench_cipher [число_символов]
+import random
+import string
+import sys
+import time
+
+import crypto.fiat_shamir as fiat_shamir
+import crypto.shnorr_encryption as shnorr_encryption
+import crypto.guillou_quisquater as guillou_quisquater
+import crypto.vectorized as vectorized
+
+# Лучшее время из нескольких запусков
+def best_time(func, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    text = ''.join(random.choices(string.printable, k=size))
+    data = text.encode('ascii')
+
+    (N, v), secret = fiat_shamir.generate_keys()
+    (p, g, y), x = shnorr_encryption.generate_keys()
+    (N_gq, v_gq), secret_gq = guillou_quisquater.generate_keys()
+    contexts = {
+        "FS": fiat_shamir.make_context(secret, N),
+        "SH": shnorr_encryption.make_context(x, g, p),
+        "GQ": guillou_quisquater.make_context(secret_gq, N_gq),
+    }
+
+    if vectorized.numpy() is None:
+        print("NumPy не установлен: векторизованный путь недоступен")
+        return
+
+    print(f"Символов: {size}")
+    print(f"{'alg':<4}{'op':<9}{'python, с':>12}{'numpy, с':>12}{'ускорение':>12}")
+    for name, ctx in contexts.items():
+        encrypted = vectorized.encrypt_text(text, ctx, use_numpy=False)
+        array = vectorized.encrypt_codes(text, ctx)
+        assert vectorized.encrypt_text(text, ctx, use_numpy=True) == encrypted
+        assert vectorized.decrypt_text(encrypted, ctx, use_numpy=True) == text
+
+        python_encrypt = best_time(lambda: vectorized.encrypt_text(text, ctx, use_numpy=False))
+        python_decrypt = best_time(lambda: vectorized.decrypt_text(encrypted, ctx, use_numpy=False))
+        rows = (
+            # Публичный API: списки Python на входе/выходе
+            ("encrypt", python_encrypt, lambda: vectorized.encrypt_text(text, ctx, use_numpy=True)),
+            ("decrypt", python_decrypt, lambda: vectorized.decrypt_text(encrypted, ctx, use_numpy=True)),
+            # Само ядро на массивах, без конвертации в список Python
+            ("enc-core", python_encrypt, lambda: vectorized.encrypt_codes(text, ctx)),
+            ("dec-core", python_decrypt, lambda: vectorized.decrypt_codes(array, ctx)),
+        )
+        for op, slow, func in rows:
+            fast = best_time(func)
+            print(f"{name:<4}{op:<9}{slow:>12.3f}{fast:>12.3f}{slow / fast:>11.1f}x")
+
+        # Табличный путь для байтов: только индексация, без умножения по модулю
+        table = ctx.byte_table
+        words = table.encrypt(data)
+        assert table.decrypt(words) == data
+        for op, slow, func in (("enc-tbl", python_encrypt, lambda: table.encrypt(data)),
+                               ("dec-tbl", python_decrypt, lambda: table.decrypt(words))):
+            fast = best_time(func)
+            print(f"{name:<4}{op:<9}{slow:>12.3f}{fast:>12.3f}{slow / fast:>11.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# Время запуска: импорт криптографических модулей в свежем интерпретаторе.
+# Сравнивается текущий бэкенд (без sympy) с прежним поведением, когда
+# каждый модуль тянул sympy при импорте.
+#
+# Запуск из корня репозитория:
+#     python -m benchmarks.bench_import [число_запусков]
+import statistics
+import subprocess
+import sys
+
+CRYPTO_IMPORTS = ("import crypto.fiat_shamir, crypto.shnorr_encryption, "
+                  "crypto.guillou_quisquater, crypto.encryption_info")
+
+CASES = (
+    ("python (пустой запуск)", "pass"),
+    ("crypto (без sympy)", CRYPTO_IMPORTS),
+    ("crypto + sympy (как раньше)", f"import sympy; {CRYPTO_IMPORTS}"),
+)
+
+# Время выполнения кода в новом процессе (мс) по самому процессу, без учёта fork/exec
+def run_once(code):
+    script = ("import time; _t = time.perf_counter(); "
+              f"{code}; print((time.perf_counter() - _t) * 1000)")
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True,
+                            text=True, check=True).stdout
+    return float(output)
+
+# Полное время жизни процесса (мс), как его видит пакетный скрипт
+def run_process(code):
+    script = f"import time, subprocess, sys; _t = time.perf_counter(); " \
+             f"subprocess.run([sys.executable, '-c', {code!r}], check=True); " \
+             f"print((time.perf_counter() - _t) * 1000)"
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True,
+                            text=True, check=True).stdout
+    return float(output)
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    print(f"Запусков: {runs}, медиана в мс")
+    print(f"{'':<30}{'импорт':>10}{'процесс':>10}")
+    for name, code in CASES:
+        imports = statistics.median(run_once(code) for _ in range(runs))
+        process = statistics.median(run_process(code) for _ in range(runs))
+        print(f"{name:<30}{imports:>10.1f}{process:>10.1f}")
+
+    loaded = subprocess.run([sys.executable, "-c", f"import sys; {CRYPTO_IMPORTS}; "
+                             "print('sympy' in sys.modules)"],
+                            capture_output=True, text=True, check=True).stdout.strip()
+    print(f"sympy загружен после импорта crypto: {loaded}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Задержка генерации ключей: старая схема (random.randint + sympy.isprime
+# с отбраковкой, primitive_root на каждый ключ Шнорра) против движка
+# crypto.primes (решето + Миллер-Рабин) и кэша групп crypto.schnorr_groups.
+#
+# Запуск из корня репозитория:
+#     python -m benchmarks.bench_keygen [число_запусков]
+import random
+import statistics
+import sys
+import time
+
+from sympy import isprime, primitive_root
+
+import crypto.fiat_shamir as fiat_shamir
+import crypto.guillou_quisquater as guillou_quisquater
+import crypto.primes as primes
+import crypto.shnorr_encryption as shnorr_encryption
+
+# Прежняя генерация простого: случайное число до тех пор, пока не выпадет простое
+def legacy_prime(start, end):
+    while True:
+        num = random.randint(start, end)
+        if isprime(num):
+            return num
+
+# Прежняя генерация ключей Фиата-Шамира / Гиллу-Кискатера
+def legacy_generate_keys():
+    N = legacy_prime(100, 500) * legacy_prime(100, 500)
+    s = random.randint(2, N - 1)
+    while not isprime(s):
+        s = random.randint(2, N - 1)
+    return N, s
+
+# Прежняя генерация ключей Шнорра: новое простое и primitive_root на каждый вызов
+def legacy_schnorr_keys():
+    p = legacy_prime(1000, 5000)
+    g = primitive_root(p)
+    x = random.randint(2, p - 2)
+    return (p, g, pow(g, x, p)), x
+
+# Время каждого вызова в микросекундах
+def timings(func, runs):
+    result = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        result.append((time.perf_counter() - start) * 1e6)
+    return result
+
+def report(name, samples):
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{name:<28}{statistics.mean(samples):>10.1f}{statistics.median(samples):>10.1f}"
+          f"{p99:>10.1f}{samples[-1]:>10.1f}")
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    primes.primes_up_to(primes.SIEVE_LIMIT)  # Решето строится один раз на процесс
+
+    print(f"Запусков: {runs}, время в мкс")
+    print(f"{'':<28}{'среднее':>10}{'медиана':>10}{'p99':>10}{'макс':>10}")
+    report("legacy FS/GQ keygen", timings(legacy_generate_keys, runs))
+    report("FS generate_keys", timings(fiat_shamir.generate_keys, runs))
+    report("GQ generate_keys", timings(guillou_quisquater.generate_keys, runs))
+    report("legacy SH keygen", timings(legacy_schnorr_keys, runs))
+    report("SH generate_keys", timings(shnorr_encryption.generate_keys, runs))
+    report("legacy prime 512 bit", timings(lambda: legacy_prime(1 << 511, (1 << 512) - 1), runs // 20))
+    report("random_prime_bits(512)", timings(lambda: primes.random_prime_bits(512), runs // 20))
+
+if __name__ == "__main__":
+    main()
@@ -1,204 +1,475 @@
+import argparse
+import queue
 import socket
+import threading
 import random
 import os
-import hashlib
-import time
+import secrets
 # Import encryption modules
-import crypto.fiat_shamir as fiat_shamir
-import crypto.shnorr_encryption as shnorr_encryption
-import crypto.guillou_quisquater as guillou_quisquater
-
-# Запрашиваем путь к файлу
-file_path = input("Введите путь к файлу для отправки: ")
-
-# Проверяем существование файла
-if not os.path.exists(file_path):
-    print(f"[КЛИЕНТ] Ошибка: Файл {file_path} не найден")
-    exit(1)
-
-# Выбор протокола
-print("Выберите протокол аутентификации:")
-print("1. Фиат-Шамир (текущий)")
-print("2. Шнорр")
-print("3. Гиллу-Кискатер")
-protocol = int(input("Введите номер протокола (1-3): "))
-# Validate input
-if protocol not in [1, 2, 3]:
-    print("Ошибка: Введите число от 1 до 3")
-    exit(1)
-
-# Подключаемся к серверу
-client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-client_socket.connect(("127.0.0.1", 8080))
-
-# Отправляем выбранный протокол
-client_socket.send(str(protocol).encode())
-# Add a small delay or wait for acknowledgment
-time.sleep(0.1)
-print(f"[КЛИЕНТ] Выбран протокол: {protocol}")
-
-# Аутентификация с использованием выбранного протокола
-if protocol == 1:  # Фиат-Шамир
-    # Устанавливаем параметры
-    n = 3233  # Простое число (p * q)
-    S = 123  # Закрытый ключ клиента
-    V = pow(S, 2, n)  # Открытый ключ
-
-    # Генерируем случайное r
-    r = random.randint(1, n-1)
-    X = pow(r, 2, n)  # X = r^2 mod n
-
-    # Отправляем X
-    client_socket.send(str(X).encode())
-    print(f"[КЛИЕНТ] Отправлено X: {X}")
-
-    # Получаем e
-    e = int(client_socket.recv(1024).decode())
-    print(f"[КЛИЕНТ] Получено e: {e}")
-
-    # Вычисляем y = r * S^e mod n
-    y = (r * pow(S, e, n)) % n
-    client_socket.send(str(y).encode())
-    print(f"[КЛИЕНТ] Отправлено y: {y}")
-
-elif protocol == 2:  # Шнорр
-    # Параметры протокола Шнорра
-    p = 2267  # Простое число
-    q = 103  # Простой делитель p-1
-    g = 354  # Генератор подгруппы порядка q
-    x = 47  # Закрытый ключ (x < q)
-    y = pow(g, x, p)  # Открытый ключ
-
-    # Отправляем открытый ключ
-    client_socket.send(str(y).encode())
+import crypto.compression as compression
+import crypto.nizk as nizk
+import crypto.streaming as streaming
+import crypto.zk_protocols as zk
+from crypto.encryption_info import encrypt_stream, encrypted_size, format_info
+from crypto.key_pool import KeyPool
+from network.admission import ServerBusyError
+from network.channel import open_channel
+from network.resume import UploadJournal, format_resume_query, parse_offset
+from network.upload import CHUNK_RECEIVED, SESSION_END, format_upload_header
+
+# Отправлять шифротекст в компактном бинарном формате вместо десятичного текста
+BINARY_CIPHERTEXT = True
+
+# Шифровать файл как произвольные байты (без декодирования UTF-8, подходит для любых файлов)
+FILE_MODE = streaming.MODE_BYTES
+
+# Сжатие открытого текста перед шифрованием: AUTO - метод выбирается по пробе
+# файла (плохо сжимаемые файлы идут без сжатия), "zlib"/"lzma" - всегда, None - никогда.
+# Сжатые данные шифруются в режиме bytes независимо от FILE_MODE.
+COMPRESSION = compression.AUTO
+
+# Неинтерактивная аутентификация: доказательство одним сообщением (вызовы - хэш),
+# один RTT вместо двух. По умолчанию - классический интерактивный обмен.
+NON_INTERACTIVE_AUTH = False
+
+# Целевая стойкость аутентификации в битах: k раундов протокола выполняются
+# параллельно за один обмен (k обязательств - вектор вызовов - k ответов).
+# None - один классический раунд.
+TARGET_SOUNDNESS_BITS = None
+
+# Адрес сервера по умолчанию
+HOST = "127.0.0.1"
+PORT = 8080
+
+# Возобновляемые загрузки (по умолчанию выключены, --resumable): ключ шифрования
+# хранится в журнале до подтверждения сервера, после обрыва повторный запуск
+# клиента досылает только недостающие байты. Сервер при этом пишет принятое
+# в частичный файл и периодически сбрасывает его на диск.
+RESUMABLE_UPLOADS = False
+
+# Параллельная загрузка: число аутентифицированных соединений, по которым
+# одновременно идут куски шифротекста (1 - все по одному соединению), и размер куска.
+# Файлы меньше двух кусков отправляются обычным способом.
+STRIPE_CONNECTIONS = 1
+STRIPE_CHUNK_SIZE = 1024 * 1024
+
+# Закрытые ключи клиента для протоколов аутентификации
+CLIENT_SECRETS = {1: 123, 2: 47, 3: 621}
+
+# Пул заранее сгенерированных ключей: сколько держать на алгоритм и при каком остатке доливать
+KEY_POOL_SIZE = 2
+KEY_POOL_LOW_WATER = 1
+
+# Получение ответа сервера; перегруженный сервер вместо него присылает BUSY - ServerBusyError
+def receive_reply(channel):
+    return channel.recv_message().decode()
+
+# Подключение к серверу по протоколу с кадрами
+def connect(host=HOST, port=PORT):
+    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    client_socket.connect((host, port))
+    # Протокол с кадрами: границы сообщений сохраняются, пауза после номера протокола не нужна
+    return open_channel(client_socket)
+
+# Аутентификация по выбранному протоколу, возвращает ответ сервера (AUTH_SUCCESS при успехе)
+def authenticate(channel, protocol, non_interactive=NON_INTERACTIVE_AUTH, soundness_bits=TARGET_SOUNDNESS_BITS):
+    # Число параллельных раундов для целевой стойкости
+    rounds = zk.rounds_for_soundness(protocol, soundness_bits) if soundness_bits else 1
+
+    # Отправляем выбранный протокол (в неинтерактивном режиме и при параллельных
+    # раундах он входит в первое сообщение)
+    if not non_interactive and rounds == 1:
+        channel.send_message(str(protocol).encode())
+    print(f"[КЛИЕНТ] Выбран протокол: {protocol}")
+
+    if non_interactive:
+        # Доказательство целиком: k раундов, вызовы - хэш обязательств, nonce, времени и контекста
+        proof = nizk.prove(protocol, CLIENT_SECRETS[protocol])
+        channel.send_message(nizk.format_proof(proof))
+        print(f"[КЛИЕНТ] Отправлено неинтерактивное доказательство, nonce: {proof['nonce']}")
+
+    elif rounds > 1:
+        # Все k обязательств одним сообщением, в ответ - вектор вызовов
+        secret = CLIENT_SECRETS[protocol]
+        public, randomness, commitments = zk.commit(protocol, secret, rounds)
+        channel.send_message(zk.format_rounds(protocol, public, commitments))
+        print(f"[КЛИЕНТ] Отправлено {rounds} обязательств (стойкость {soundness_bits} бит)")
+
+        challenge_vector = zk.parse_challenges(receive_reply(channel), rounds)
+        channel.send_message(zk.format_responses(zk.respond(protocol, secret, randomness, challenge_vector)))
+        print(f"[КЛИЕНТ] Отправлены ответы на {rounds} вызовов")
+
+    elif protocol == 1:  # Фиат-Шамир
+        # Устанавливаем параметры
+        n = 3233  # Простое число (p * q)
+        S = CLIENT_SECRETS[1]  # Закрытый ключ клиента
+        V = pow(S, 2, n)  # Открытый ключ
+
+        # Генерируем случайное r
+        r = random.randint(1, n-1)
+        X = pow(r, 2, n)  # X = r^2 mod n
+
+        # Отправляем X
+        channel.send_message(str(X).encode())
+        print(f"[КЛИЕНТ] Отправлено X: {X}")
+
+        # Получаем e
+        e = int(receive_reply(channel))
+        print(f"[КЛИЕНТ] Получено e: {e}")
+
+        # Вычисляем y = r * S^e mod n
+        y = (r * pow(S, e, n)) % n
+        channel.send_message(str(y).encode())
+        print(f"[КЛИЕНТ] Отправлено y: {y}")
+
+    elif protocol == 2:  # Шнорр
+        # Параметры протокола Шнорра
+        p = 2267  # Простое число
+        q = 103  # Простой делитель p-1
+        g = 354  # Генератор подгруппы порядка q
+        x = CLIENT_SECRETS[2]  # Закрытый ключ (x < q)
+        y = pow(g, x, p)  # Открытый ключ
+
+        # Отправляем открытый ключ
+        channel.send_message(str(y).encode())
     
-    # Генерируем случайное k < q
-    k = random.randint(1, q-1)
-    r = pow(g, k, p)
+        # Генерируем случайное k < q
+        k = random.randint(1, q-1)
+        r = pow(g, k, p)
     
-    # Отправляем r
-    client_socket.send(str(r).encode())
-    print(f"[КЛИЕНТ] Отправлено r: {r}")
+        # Отправляем r
+        channel.send_message(str(r).encode())
+        print(f"[КЛИЕНТ] Отправлено r: {r}")
     
-    # Получаем случайный вызов e от сервера
-    e = int(client_socket.recv(1024).decode())
-    print(f"[КЛИЕНТ] Получено e: {e}")
+        # Получаем случайный вызов e от сервера
+        e = int(receive_reply(channel))
+        print(f"[КЛИЕНТ] Получено e: {e}")
     
-    # Вычисляем s = (k + e*x) mod q
-    s = (k + e * x) % q
-    client_socket.send(str(s).encode())
-    print(f"[КЛИЕНТ] Отправлено s: {s}")
-
-elif protocol == 3:  # Гиллу-Кискатер
-    # Параметры протокола Гиллу-Кискатер
-    n = 3233  # Модуль (p*q)
-    v = 17    # Открытая экспонента (взаимно простая с φ(n))
-    s = 621   # Секретный ключ
-    J = pow(s, v, n)  # Открытый ключ
+        # Вычисляем s = (k + e*x) mod q
+        s = (k + e * x) % q
+        channel.send_message(str(s).encode())
+        print(f"[КЛИЕНТ] Отправлено s: {s}")
+
+    elif protocol == 3:  # Гиллу-Кискатер
+        # Параметры протокола Гиллу-Кискатер
+        n = 3233  # Модуль (p*q)
+        v = 17    # Открытая экспонента (взаимно простая с φ(n))
+        s = CLIENT_SECRETS[3]   # Секретный ключ
+        J = pow(s, v, n)  # Открытый ключ
     
-    # Отправляем открытый ключ
-    client_socket.send(str(J).encode())
+        # Отправляем открытый ключ
+        channel.send_message(str(J).encode())
     
-    # Генерируем случайное r
-    r = random.randint(1, n-1)
-    X = pow(r, v, n)
+        # Генерируем случайное r
+        r = random.randint(1, n-1)
+        X = pow(r, v, n)
     
-    # Отправляем X
-    client_socket.send(str(X).encode())
-    print(f"[КЛИЕНТ] Отправлено X: {X}")
+        # Отправляем X
+        channel.send_message(str(X).encode())
+        print(f"[КЛИЕНТ] Отправлено X: {X}")
     
-    # Получаем случайный вызов e от сервера
-    e = int(client_socket.recv(1024).decode())
-    print(f"[КЛИЕНТ] Получено e: {e}")
+        # Получаем случайный вызов e от сервера
+        e = int(receive_reply(channel))
+        print(f"[КЛИЕНТ] Получено e: {e}")
     
-    # Вычисляем y = (r * s^e) mod n
-    y = (r * pow(s, e, n)) % n
-    client_socket.send(str(y).encode())
-    print(f"[КЛИЕНТ] Отправлено y: {y}")
-
-# Получаем ответ
-result = client_socket.recv(1024).decode()
-print(f"[КЛИЕНТ] Ответ от сервера: {result}")
-
-# Если аутентификация успешна, отправляем файл
-if result == "AUTH_SUCCESS":
-    print(f"[КЛИЕНТ] Аутентификация успешна. Начинаем передачу файла: {file_path}")
+        # Вычисляем y = (r * s^e) mod n
+        y = (r * pow(s, e, n)) % n
+        channel.send_message(str(y).encode())
+        print(f"[КЛИЕНТ] Отправлено y: {y}")
+
+    # Получаем ответ
+    result = receive_reply(channel)
+    print(f"[КЛИЕНТ] Ответ от сервера: {result}")
+    return result
+
+# Ключи шифрования из пула, возвращает строку информации о шифровании.
+# compress - метод сжатия открытого текста (объявляется опцией compress=),
+# plain_size - размер исходного файла: сервер распаковывает не больше него (опция size=).
+def take_encryption_info(protocol, key_pool, compress=None, plain_size=None):
+    if compress:
+        options = {"mode": streaming.MODE_BYTES, "compress": compress, "size": plain_size}
+    else:
+        options = {"mode": FILE_MODE}
+    if protocol == 1:  # Фиат-Шамир
+        # Берём готовые ключи из пула (генерируются в фоне)
+        (pub_keys, secret) = key_pool.get("FS")
+        N, v = pub_keys
+        return format_info("FS", N, secret, **options)
+
+    if protocol == 2:  # Шнорр
+        (pub_keys, secret) = key_pool.get("SH")
+        p, g, y = pub_keys
+        return format_info("SH", p, g, secret, **options)
+
+    if protocol == 3:  # Гиллу-Кискатер
+        (pub_keys, secret) = key_pool.get("GQ")
+        N, v = pub_keys
+        return format_info("GQ", N, v, secret, **options)
+
+    raise ValueError(f"Недопустимый протокол: {protocol}")
+
+# Метод сжатия файла по настройке (AUTO - по пробе файла) с записью в журнал
+def choose_compression(file_path, setting=COMPRESSION):
+    method = compression.resolve_method(file_path, setting)
+    if method:
+        print(f"[КЛИЕНТ] Открытый текст {os.path.basename(file_path)} будет сжат методом {method}")
+    return method
+
+# Отправка потока кусков шифротекста кадрами данных, возвращает число байт.
+# Канал сам делит кусок на кадры без копирования (memoryview + sendmsg).
+def send_stream(channel, pieces):
+    sent = 0
+    for piece in pieces:
+        channel.send_data(piece)
+        sent += len(piece)
+    return sent
+
+# Шифрование и отправка одного файла в открытой сессии, возвращает подтверждение сервера.
+# Файл шифруется по ходу отправки: следующие куски шифруются в фоновом потоке,
+# пока отправляются предыдущие, а размер шифротекста для заголовка считается заранее.
+# С журналом загрузка возобновляемая: незавершенная загрузка продолжается со
+# смещения, которое сообщил сервер, - шифротекст с этого места получается заново
+# тем же ключом; запись журнала удаляется только после ответа сервера.
+def send_file(channel, protocol, file_path, key_pool, journal=None, compress=COMPRESSION):
+    file_name = os.path.basename(file_path)
+    entry = journal.get(file_path) if journal is not None else None
+    offset = 0
+    if entry:
+        upload_id, encryption_info = entry["upload_id"], entry["encryption"]
+        binary = entry.get("binary", BINARY_CIPHERTEXT)
+        channel.send_message(format_resume_query(upload_id))
+        reply = receive_reply(channel)
+        # Отказ (например, загрузку еще держит прежнее соединение) - запись журнала сохраняем
+        if reply.startswith("ERROR"):
+            return reply
+        offset = parse_offset(reply)
+        print(f"[КЛИЕНТ] Продолжаем загрузку {file_name} с байта {offset}")
+    else:
+        encryption_info = take_encryption_info(protocol, key_pool, choose_compression(file_path, compress),
+                                               os.path.getsize(file_path))
+        binary = BINARY_CIPHERTEXT
+        if journal is not None:
+            upload_id = secrets.token_hex(16)
+            journal.add(file_path, upload_id, encryption_info, binary)
+
+    # Отправляем единый заголовок загрузки (имя, информация о шифровании, размер)
+    # и сразу следом данные: сервер ответит, только если отклонит заголовок
+    fields = {"upload_id": upload_id, "offset": offset} if journal is not None else {}
+    file_size = encrypted_size(encryption_info, file_path, binary)
+    channel.send_message(format_upload_header(file_name, encryption_info, file_size, **fields))
+    print(f"[КЛИЕНТ] Шифруем и передаем файл используя алгоритм {protocol}...")
+    sent = send_stream(channel, streaming.prefetch(encrypt_stream(encryption_info, file_path, binary, offset)))
+    print(f"[КЛИЕНТ] Зашифрованный файл {file_name} успешно передан ({sent} байт)")
+
+    # Получаем подтверждение о получении файла
+    confirmation = channel.recv_message().decode()
+    print(f"[КЛИЕНТ] {confirmation}")
+    # Отклоненную загрузку тоже забываем: повтор с тем же заголовком не поможет
+    if journal is not None and confirmation.startswith(("FILE_RECEIVED", "ERROR")):
+        journal.remove(file_path)
+    return confirmation
+
+# Параллельная отправка одного файла: шифротекст нарезается на куски по мере
+# шифрования, а куски разбирают channel и connections - 1 дополнительных
+# соединений (каждое проходит аутентификацию). Кусок, не дошедший из-за
+# обрыва соединения, достается другому.
+# Возвращает итоговый ответ сервера (FILE_RECEIVED или ERROR:).
+def send_file_striped(channel, protocol, file_path, key_pool, host=HOST, port=PORT,
+                      connections=STRIPE_CONNECTIONS, chunk_size=STRIPE_CHUNK_SIZE, compress=COMPRESSION,
+                      soundness_bits=TARGET_SOUNDNESS_BITS):
+    upload_id = secrets.token_hex(16)
+    encryption_info = take_encryption_info(protocol, key_pool, choose_compression(file_path, compress),
+                                           os.path.getsize(file_path))
+    file_name = os.path.basename(file_path)
+    file_size = encrypted_size(encryption_info, file_path, BINARY_CIPHERTEXT)
+    print(f"[КЛИЕНТ] Шифруем и передаем файл используя алгоритм {protocol}...")
+
+    pieces = streaming.prefetch(encrypt_stream(encryption_info, file_path, BINARY_CIPHERTEXT))
+    chunks = streaming.fixed_chunks(pieces, chunk_size)
+    chunks_lock = threading.Lock()
+    retry = queue.Queue()
+    replies = []
+
+    # Следующий кусок (смещение, данные): сначала возвращенные после обрыва
+    def next_chunk():
+        try:
+            return retry.get_nowait()
+        except queue.Empty:
+            pass
+        with chunks_lock:
+            return next(chunks, None)
+
+    def send_chunks(stripe):
+        while not replies:
+            chunk = next_chunk()
+            if chunk is None:
+                return
+            offset, data = chunk
+            try:
+                stripe.send_message(format_upload_header(file_name, encryption_info, file_size,
+                                                         upload_id=upload_id, offset=offset, length=len(data)))
+                send_stream(stripe, [data])
+                reply = stripe.recv_message().decode()
+            except Exception:
+                retry.put(chunk)
+                raise
+            if not reply.startswith(CHUNK_RECEIVED):
+                replies.append(reply)
+
+    # Дополнительное соединение: подключение, аутентификация, куски, BYE
+    def extra_stripe():
+        try:
+            stripe = connect(host, port)
+        except OSError as e:
+            print(f"[КЛИЕНТ] Не удалось открыть дополнительное соединение: {e}")
+            return
+        try:
+            if authenticate(stripe, protocol, soundness_bits=soundness_bits) == "AUTH_SUCCESS":
+                send_chunks(stripe)
+                stripe.send_message(SESSION_END.encode())
+        except Exception as e:
+            print(f"[КЛИЕНТ] Дополнительное соединение прервано: {e}")
+        finally:
+            stripe.close()
+
+    threads = [threading.Thread(target=extra_stripe)
+               for _ in range(min(connections, -(-file_size // chunk_size)) - 1)]
+    for thread in threads:
+        thread.start()
     try:
-        # Шифруем файл перед отправкой
-        print(f"[КЛИЕНТ] Шифруем файл используя алгоритм {protocol}...")
-        
-        # Создаем временный файл для шифрования
-        temp_encrypted_file = "temp_encrypted.txt"
-        
-        # Шифруем файл в зависимости от выбранного протокола
-        if protocol == 1:  # Фиат-Шамир
-            # Генерируем ключи
-            (pub_keys, secret) = fiat_shamir.generate_keys()
-            N, v = pub_keys
-            # Шифруем файл
-            fiat_shamir.encrypt_fileFS(file_path, temp_encrypted_file, secret, N)
-            # Сохраняем ключи для передачи серверу
-            encryption_info = f"FS:{N}:{secret}"
-        
-        elif protocol == 2:  # Шнорр
-            # Генерируем ключи
-            (pub_keys, secret) = shnorr_encryption.generate_keys()
-            p, g, y = pub_keys
-            # Шифруем файл
-            shnorr_encryption.encrypt_fileSH(file_path, temp_encrypted_file, secret, g, p)
-            # Сохраняем ключи для передачи серверу
-            encryption_info = f"SH:{p}:{g}:{secret}"
-        
-        elif protocol == 3:  # Гиллу-Кискатер
-            # Генерируем ключи
-            (pub_keys, secret) = guillou_quisquater.generate_keys()
-            N, v = pub_keys
-            # Шифруем файл
-            guillou_quisquater.encrypt_fileGQ(file_path, temp_encrypted_file, secret, N)
-            # Сохраняем ключи для передачи серверу
-            encryption_info = f"GQ:{N}:{v}:{secret}"
-        
-        print(f"[КЛИЕНТ] Файл успешно зашифрован")
-        
-        # Отправляем имя файла
-        file_name = os.path.basename(file_path)
-        client_socket.send(f"FILENAME:{file_name}".encode())
-        response = client_socket.recv(1024).decode()  # Получаем подтверждение
-        
-        # Отправляем информацию о шифровании
-        client_socket.send(f"ENCRYPTION:{encryption_info}".encode())
-        response = client_socket.recv(1024).decode()  # Получаем подтверждение
-        
-        # Отправляем размер зашифрованного файла
-        file_size = os.path.getsize(temp_encrypted_file)
-        client_socket.send(f"FILESIZE:{file_size}".encode())
-        
-        # Получаем подтверждение готовности
-        ready = client_socket.recv(1024).decode()
-        if ready != "READY":
-            print(f"[КЛИЕНТ] Ошибка: сервер не готов к приему файла")
-            client_socket.close()
-            exit(1)
-            
-        # Отправляем содержимое зашифрованного файла
-        with open(temp_encrypted_file, 'rb') as f:
-            data = f.read(4096)
-            while data:
-                client_socket.send(data)
-                data = f.read(4096)
-                
-        print(f"[КЛИЕНТ] Зашифрованный файл {file_name} успешно передан")
-        
-        # Удаляем временный зашифрованный файл
-        os.remove(temp_encrypted_file)
-        
-        # Получаем подтверждение о получении файла
-        confirmation = client_socket.recv(1024).decode()
-        print(f"[КЛИЕНТ] {confirmation}")
-        
+        send_chunks(channel)
+        for thread in threads:
+            thread.join()
+        # Куски оборвавшихся дополнительных соединений досылаем по основному
+        send_chunks(channel)
+    finally:
+        for thread in threads:
+            thread.join()
+        chunks.close()
+        pieces.close()
+
+    confirmation = replies[0] if replies else f"ERROR: Файл {file_name} передан не полностью"
+    print(f"[КЛИЕНТ] Файл {file_name} передан кусками по {len(threads) + 1} соединениям")
+    print(f"[КЛИЕНТ] {confirmation}")
+    return confirmation
+
+# Отправка списка файлов за одно подключение и одну аутентификацию.
+# Возвращает подтверждения сервера по отправленным файлам; после отказа
+# сервера (ERROR:) сессия завершается и остальные файлы не отправляются.
+# Перегруженный сервер (BUSY) - исключение ServerBusyError.
+def upload_files(file_paths, protocol, host=HOST, port=PORT, key_pool=None, resumable=RESUMABLE_UPLOADS,
+                 connections=STRIPE_CONNECTIONS, compress=COMPRESSION, soundness_bits=TARGET_SOUNDNESS_BITS):
+    # Пул ключей, созданный здесь, останавливаем по завершении
+    own_pool = key_pool is None
+    if own_pool:
+        key_pool = KeyPool(size=KEY_POOL_SIZE, low_water=KEY_POOL_LOW_WATER).start()
+    try:
+        return _upload_files(file_paths, protocol, host, port, key_pool, resumable, connections, compress,
+                             soundness_bits)
+    finally:
+        if own_pool:
+            key_pool.stop()
+
+# Сессия отправки файлов с готовым пулом ключей
+def _upload_files(file_paths, protocol, host, port, key_pool, resumable, connections, compress, soundness_bits):
+    journal = UploadJournal() if resumable else None
+    channel = connect(host, port)
+    confirmations = []
+    try:
+        if authenticate(channel, protocol, soundness_bits=soundness_bits) != "AUTH_SUCCESS":
+            print("[КЛИЕНТ] Аутентификация не удалась. Отправка файла невозможна.")
+            return confirmations
+        print(f"[КЛИЕНТ] Аутентификация успешна. Файлов к передаче: {len(file_paths)}")
+
+        for file_path in file_paths:
+            print(f"[КЛИЕНТ] Начинаем передачу файла: {file_path}")
+            # Большой файл при нескольких соединениях отправляем кусками параллельно
+            # (оценка по исходному размеру; сжатый файл может уложиться и в один кусок)
+            if connections > 1 and os.path.getsize(file_path) > STRIPE_CHUNK_SIZE:
+                confirmation = send_file_striped(channel, protocol, file_path, key_pool,
+                                                 host, port, connections, compress=compress,
+                                                 soundness_bits=soundness_bits)
+            else:
+                confirmation = send_file(channel, protocol, file_path, key_pool, journal, compress)
+            confirmations.append(confirmation)
+            if not confirmation.startswith("FILE_RECEIVED"):
+                break
+
+        # Завершаем сессию явно, не дожидаясь таймаута простоя на сервере
+        channel.send_message(SESSION_END.encode())
+    except ServerBusyError:
+        raise
     except Exception as e:
         print(f"[КЛИЕНТ] Ошибка при передаче файла: {str(e)}")
-else:
-    print("[КЛИЕНТ] Аутентификация не удалась. Отправка файла невозможна.")
+    finally:
+        channel.close()
+    return confirmations
+
+def main():
+    parser = argparse.ArgumentParser(description="Клиент отправки файлов с аутентификацией с нулевым разглашением")
+    parser.add_argument("files", nargs="*", help="файлы для отправки в одной сессии (без них - интерактивный ввод)")
+    parser.add_argument("--protocol", type=int, choices=(1, 2, 3),
+                        help="протокол аутентификации: 1 - Фиат-Шамир, 2 - Шнорр, 3 - Гиллу-Кискатер")
+    parser.add_argument("--host", default=HOST, help="адрес сервера")
+    parser.add_argument("--port", type=int, default=PORT, help="порт сервера")
+    parser.add_argument("--connections", type=int, default=STRIPE_CONNECTIONS,
+                        help="число параллельных соединений для больших файлов")
+    parser.add_argument("--compress", choices=(compression.AUTO, *compression.METHODS, "none"),
+                        default=COMPRESSION or "none",
+                        help="сжатие открытого текста перед шифрованием (auto - по пробе файла)")
+    parser.add_argument("--resumable", action="store_true", default=RESUMABLE_UPLOADS,
+                        help="возобновляемая загрузка: после обрыва повторный запуск досылает остаток")
+    parser.add_argument("--soundness-bits", type=int, default=TARGET_SOUNDNESS_BITS,
+                        help="целевая стойкость аутентификации в битах (k параллельных раундов, 0 - один раунд)")
+    args = parser.parse_args()
+
+    # Ключи шифрования генерируются в фоне, пока пользователь выбирает файл и идёт аутентификация
+    key_pool = KeyPool(size=KEY_POOL_SIZE, low_water=KEY_POOL_LOW_WATER).start()
+
+    # Запрашиваем путь к файлу
+    file_paths = args.files or [input("Введите путь к файлу для отправки: ")]
+
+    # Проверяем существование файлов
+    for file_path in file_paths:
+        if not os.path.exists(file_path):
+            print(f"[КЛИЕНТ] Ошибка: Файл {file_path} не найден")
+            exit(1)
+
+    protocol = args.protocol
+    if protocol is None:
+        # Выбор протокола
+        print("Выберите протокол аутентификации:")
+        print("1. Фиат-Шамир (текущий)")
+        print("2. Шнорр")
+        print("3. Гиллу-Кискатер")
+        protocol = int(input("Введите номер протокола (1-3): "))
+        # Validate input
+        if protocol not in [1, 2, 3]:
+            print("Ошибка: Введите число от 1 до 3")
+            exit(1)
+
+    if args.connections < 1:
+        print("[КЛИЕНТ] Ошибка: число соединений должно быть положительным")
+        exit(1)
+
+    if args.soundness_bits:
+        try:
+            if args.soundness_bits < 0:
+                raise ValueError("Стойкость не может быть отрицательной")
+            zk.rounds_for_soundness(protocol, args.soundness_bits)
+        except ValueError as e:
+            print(f"[КЛИЕНТ] Ошибка: {e}")
+            exit(1)
+
+    compress = None if args.compress == "none" else args.compress
+    try:
+        upload_files(file_paths, protocol, args.host, args.port, key_pool, args.resumable,
+                     args.connections, compress, args.soundness_bits)
+    except ServerBusyError:
+        print("[КЛИЕНТ] Сервер перегружен (BUSY), повторите попытку позже")
+        exit(1)
+    finally:
+        key_pool.stop()
 
-client_socket.close()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
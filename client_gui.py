@@ -1,21 +1,54 @@
 import sys
 import os
 import socket
+import queue
 import random
-import time
+import secrets
 import threading
 from datetime import datetime
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                            QLabel, QPushButton, QLineEdit, QTextEdit, QRadioButton,
                            QButtonGroup, QFileDialog, QProgressBar, QMessageBox,
-                           QGroupBox, QFormLayout, QFrame, QSplitter)
+                           QGroupBox, QFormLayout, QFrame, QSplitter, QCheckBox)
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal, pyqtSlot
 from PyQt6.QtGui import QPalette, QColor, QFont
 
 # Импортируем модули криптографии
-import crypto.fiat_shamir as fiat_shamir
-import crypto.shnorr_encryption as shnorr_encryption
-import crypto.guillou_quisquater as guillou_quisquater
+import crypto.compression as compression
+import crypto.nizk as nizk
+import crypto.streaming as streaming
+import crypto.zk_protocols as zk
+from crypto.encryption_info import encrypt_stream, encrypted_size, format_info
+from crypto.key_pool import KeyPool
+from network.channel import open_channel
+from network.resume import UploadJournal, format_resume_query, parse_offset
+from network.upload import CHUNK_RECEIVED, SESSION_END, format_upload_header
+
+# Отправлять шифротекст в компактном бинарном формате вместо десятичного текста
+BINARY_CIPHERTEXT = True
+
+# Шифровать файл как произвольные байты (без декодирования UTF-8, подходит для любых файлов)
+FILE_MODE = streaming.MODE_BYTES
+
+# Сжатие открытого текста перед шифрованием по умолчанию: AUTO - метод выбирается
+# по пробе файла, плохо сжимаемые файлы идут без сжатия
+COMPRESSION = compression.AUTO
+
+# Возобновляемые загрузки по умолчанию: ключ шифрования хранится в журнале до
+# подтверждения сервера, а сервер пишет принятое в частичный файл с фиксацией смещения
+RESUMABLE_UPLOADS = False
+
+# Закрытые ключи клиента для протоколов аутентификации
+CLIENT_SECRETS = {1: 123, 2: 47, 3: 621}
+
+# Пул заранее сгенерированных ключей: сколько держать на алгоритм и при каком остатке доливать
+KEY_POOL_SIZE = 2
+KEY_POOL_LOW_WATER = 1
+
+# Параллельная загрузка: число соединений по умолчанию и размер куска шифротекста.
+# Файлы меньше двух кусков отправляются по основному соединению.
+STRIPE_CONNECTIONS = 1
+STRIPE_CHUNK_SIZE = 1024 * 1024
 
 class ClientGUI(QMainWindow):
     # Сигналы для обновления GUI из других потоков
@@ -32,9 +65,18 @@ class ClientGUI(QMainWindow):
         
         # Переменные для соединения
         self.client_socket = None
-        self.file_path = None
+        self.channel = None  # канал с кадрами поверх client_socket
+        self.server_address = None  # адрес сервера для дополнительных соединений параллельной загрузки
+        self.file_paths = []  # файлы для отправки в одной сессии
         self.authentication_success = False
         
+        # Пул ключей шифрования заполняется в фоне, пока выбирается файл и идёт аутентификация
+        self.key_pool = KeyPool(size=KEY_POOL_SIZE, low_water=KEY_POOL_LOW_WATER).start()
+        
+        # Журнал незавершенных загрузок (для возобновляемых): после обрыва
+        # отправка продолжается с места остановки
+        self.upload_journal = UploadJournal()
+        
         # Создание интерфейса
         self.create_widgets()
         
@@ -195,6 +237,34 @@ class ClientGUI(QMainWindow):
         protocol_layout.addWidget(self.rb_shnorr)
         protocol_layout.addWidget(self.rb_guillou)
         
+        # Неинтерактивный режим: доказательство одним сообщением (один RTT вместо двух)
+        self.non_interactive_check = QCheckBox("Неинтерактивный режим")
+        protocol_layout.addWidget(self.non_interactive_check)
+        
+        # Целевая стойкость: k раундов выполняются параллельно за один обмен (0 - один раунд)
+        soundness_layout = QHBoxLayout()
+        soundness_layout.addWidget(QLabel("Стойкость, бит:"))
+        self.soundness_entry = QLineEdit("0")
+        soundness_layout.addWidget(self.soundness_entry)
+        protocol_layout.addLayout(soundness_layout)
+        
+        # Параллельная загрузка: большие файлы идут кусками по нескольким соединениям
+        connections_layout = QHBoxLayout()
+        connections_layout.addWidget(QLabel("Соединений:"))
+        self.connections_entry = QLineEdit(str(STRIPE_CONNECTIONS))
+        connections_layout.addWidget(self.connections_entry)
+        protocol_layout.addLayout(connections_layout)
+        
+        # Сжатие открытого текста перед шифрованием (метод выбирается по пробе файла)
+        self.compress_check = QCheckBox("Сжимать файлы перед шифрованием")
+        self.compress_check.setChecked(COMPRESSION is not None)
+        protocol_layout.addWidget(self.compress_check)
+        
+        # Возобновляемая загрузка: после обрыва отправка продолжится с места остановки
+        self.resumable_check = QCheckBox("Возобновляемая загрузка")
+        self.resumable_check.setChecked(RESUMABLE_UPLOADS)
+        protocol_layout.addWidget(self.resumable_check)
+        
         connection_layout.addWidget(protocol_group)
         
         # Выбор файла и подключение
@@ -203,7 +273,7 @@ class ClientGUI(QMainWindow):
         # Выбор файла
         file_layout = QHBoxLayout()
         self.file_path_entry = QLineEdit()
-        self.file_path_entry.setPlaceholderText("Путь к файлу...")
+        self.file_path_entry.setPlaceholderText("Пути к файлам...")
         self.file_path_entry.setReadOnly(True)
         
         browse_button = QPushButton("Обзор...")
@@ -218,12 +288,18 @@ class ClientGUI(QMainWindow):
         self.connect_button = QPushButton("Подключиться")
         self.connect_button.clicked.connect(self.connect_to_server)
         
-        self.send_button = QPushButton("Отправить файл")
+        self.send_button = QPushButton("Отправить файлы")
         self.send_button.clicked.connect(self.send_file)
         self.send_button.setEnabled(False)  # Активируется после аутентификации
         
+        # Сессия остается открытой между отправками, пока не нажата эта кнопка
+        self.disconnect_button = QPushButton("Отключиться")
+        self.disconnect_button.clicked.connect(self.close_session)
+        self.disconnect_button.setEnabled(False)
+        
         buttons_layout.addWidget(self.connect_button)
         buttons_layout.addWidget(self.send_button)
+        buttons_layout.addWidget(self.disconnect_button)
         file_connect_layout.addLayout(buttons_layout)
         
         connection_layout.addLayout(file_connect_layout)
@@ -285,6 +361,7 @@ class ClientGUI(QMainWindow):
         """Обрабатывает изменение статуса аутентификации"""
         self.authentication_success = success
         self.send_button.setEnabled(success)
+        self.disconnect_button.setEnabled(success)
         if success:
             self.status_update_signal.emit("Аутентификация успешна. Готов к отправке файла")
             self.connect_button.setEnabled(False)
@@ -292,14 +369,15 @@ class ClientGUI(QMainWindow):
             self.status_update_signal.emit("Аутентификация не удалась")
     
     def browse_file(self):
-        """Открывает диалог выбора файла"""
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Выберите файл для отправки", "", "Все файлы (*.*)"
+        """Открывает диалог выбора файлов"""
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Выберите файлы для отправки", "", "Все файлы (*.*)"
         )
-        if file_path:
-            self.file_path = file_path
-            self.file_path_entry.setText(file_path)
-            self.log(f"Выбран файл: {file_path}")
+        if file_paths:
+            self.file_paths = file_paths
+            self.file_path_entry.setText("; ".join(file_paths))
+            for file_path in file_paths:
+                self.log(f"Выбран файл: {file_path}")
     
     def get_selected_protocol(self):
         """Возвращает выбранный протокол"""
@@ -307,8 +385,8 @@ class ClientGUI(QMainWindow):
     
     def connect_to_server(self):
         """Подключается к серверу и выполняет аутентификацию"""
-        # Проверяем, выбран ли файл
-        if not self.file_path:
+        # Проверяем, выбраны ли файлы
+        if not self.file_paths:
             QMessageBox.warning(self, "Предупреждение", "Выберите файл для отправки")
             return
         
@@ -322,15 +400,29 @@ class ClientGUI(QMainWindow):
             QMessageBox.critical(self, "Ошибка", f"Некорректный порт: {str(e)}")
             return
         
+        non_interactive = self.non_interactive_check.isChecked()
+        
+        # Число параллельных раундов для целевой стойкости
+        try:
+            soundness_bits = int(self.soundness_entry.text().strip() or 0)
+            if soundness_bits < 0:
+                raise ValueError("Стойкость не может быть отрицательной")
+            protocol = self.get_selected_protocol()
+            rounds = zk.rounds_for_soundness(protocol, soundness_bits) if soundness_bits else 1
+        except ValueError as e:
+            QMessageBox.critical(self, "Ошибка", f"Некорректная стойкость: {str(e)}")
+            return
+        
         # Запускаем подключение в отдельном потоке
-        threading.Thread(target=self.connect_thread, args=(ip, port)).start()
+        threading.Thread(target=self.connect_thread, args=(ip, port, non_interactive, rounds)).start()
     
-    def connect_thread(self, ip, port):
+    def connect_thread(self, ip, port, non_interactive=False, rounds=1):
         """Поток для подключения и аутентификации"""
         try:
             # Создаем сокет и подключаемся к серверу
             self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.client_socket.connect((ip, port))
+            self.server_address = (ip, port)
             self.status_update_signal.emit(f"Подключено к {ip}:{port}")
             self.log(f"Подключено к серверу {ip}:{port}")
             
@@ -339,14 +431,22 @@ class ClientGUI(QMainWindow):
             protocol_names = {1: "Фиат-Шамир", 2: "Шнорр", 3: "Гиллу-Кискатер"}
             self.log(f"Выбран протокол: {protocol_names.get(protocol)}")
             
-            # Отправляем протокол серверу
-            self.client_socket.send(str(protocol).encode())
-            time.sleep(0.1)  # Небольшая задержка
+            # Протокол с кадрами: границы сообщений сохраняются, пауза после номера протокола не нужна
+            self.channel = open_channel(self.client_socket)
+            
+            # Отправляем протокол серверу (в неинтерактивном режиме и при параллельных
+            # раундах он входит в первое сообщение)
+            if not non_interactive and rounds == 1:
+                self.channel.send_message(str(protocol).encode())
             
             # Аутентификация с использованием выбранного протокола
             auth_success = False
             
-            if protocol == 1:  # Фиат-Шамир
+            if non_interactive:  # Протокол входит в само доказательство
+                auth_success = self.authenticate_non_interactive(protocol)
+            elif rounds > 1:  # Протокол входит в сообщение с обязательствами
+                auth_success = self.authenticate_rounds(protocol, rounds)
+            elif protocol == 1:  # Фиат-Шамир
                 auth_success = self.authenticate_fiat_shamir()
             elif protocol == 2:  # Шнорр
                 auth_success = self.authenticate_shnorr()
@@ -362,13 +462,58 @@ class ClientGUI(QMainWindow):
             if self.client_socket:
                 self.client_socket.close()
                 self.client_socket = None
+                self.channel = None
+    
+    def receive_challenge(self):
+        """Получение вызова e от сервера (перегруженный сервер присылает BUSY - ServerBusyError)"""
+        return int(self.channel.recv_message().decode())
+    
+    def authenticate_non_interactive(self, protocol):
+        """Неинтерактивная аутентификация: k раундов, вызовы - хэш обязательств, nonce, времени и контекста"""
+        try:
+            proof = nizk.prove(protocol, CLIENT_SECRETS[protocol])
+            self.channel.send_message(nizk.format_proof(proof))
+            self.log(f"Отправлено неинтерактивное доказательство, nonce: {proof['nonce']}")
+            
+            # Получаем результат аутентификации
+            result = self.channel.recv_message().decode()
+            self.log(f"Ответ сервера: {result}")
+            
+            return result == "AUTH_SUCCESS"
+        
+        except Exception as e:
+            self.log(f"Ошибка при неинтерактивной аутентификации: {str(e)}")
+            return False
+    
+    def authenticate_rounds(self, protocol, rounds):
+        """Параллельные раунды: k обязательств, вектор вызовов и k ответов за один обмен"""
+        try:
+            secret = CLIENT_SECRETS[protocol]
+            public, randomness, commitments = zk.commit(protocol, secret, rounds)
+            self.channel.send_message(zk.format_rounds(protocol, public, commitments))
+            self.log(f"Отправлено {rounds} обязательств")
+            
+            challenge_vector = zk.parse_challenges(self.channel.recv_message().decode(), rounds)
+            responses = zk.respond(protocol, secret, randomness, challenge_vector)
+            self.channel.send_message(zk.format_responses(responses))
+            self.log(f"Отправлены ответы на {rounds} вызовов")
+            
+            # Получаем результат аутентификации
+            result = self.channel.recv_message().decode()
+            self.log(f"Ответ сервера: {result}")
+            
+            return result == "AUTH_SUCCESS"
+        
+        except Exception as e:
+            self.log(f"Ошибка при аутентификации в параллельных раундах: {str(e)}")
+            return False
     
     def authenticate_fiat_shamir(self):
         """Аутентификация по протоколу Фиат-Шамир"""
         try:
             # Устанавливаем параметры
             n = 3233  # Простое число (p * q)
-            S = 123   # Закрытый ключ клиента
+            S = CLIENT_SECRETS[1]   # Закрытый ключ клиента
             V = pow(S, 2, n)  # Открытый ключ
             
             # Генерируем случайное r
@@ -376,20 +521,20 @@ class ClientGUI(QMainWindow):
             X = pow(r, 2, n)  # X = r^2 mod n
             
             # Отправляем X
-            self.client_socket.send(str(X).encode())
+            self.channel.send_message(str(X).encode())
             self.log(f"Отправлено X: {X}")
             
             # Получаем e
-            e = int(self.client_socket.recv(1024).decode())
+            e = self.receive_challenge()
             self.log(f"Получено e: {e}")
             
             # Вычисляем y = r * S^e mod n
             y = (r * pow(S, e, n)) % n
-            self.client_socket.send(str(y).encode())
+            self.channel.send_message(str(y).encode())
             self.log(f"Отправлено y: {y}")
             
             # Получаем результат аутентификации
-            result = self.client_socket.recv(1024).decode()
+            result = self.channel.recv_message().decode()
             self.log(f"Ответ сервера: {result}")
             
             return result == "AUTH_SUCCESS"
@@ -405,31 +550,31 @@ class ClientGUI(QMainWindow):
             p = 2267  # Простое число
             q = 103   # Простой делитель p-1
             g = 354   # Генератор подгруппы порядка q
-            x = 47    # Закрытый ключ (x < q)
+            x = CLIENT_SECRETS[2]    # Закрытый ключ (x < q)
             y = pow(g, x, p)  # Открытый ключ
             
             # Отправляем открытый ключ
-            self.client_socket.send(str(y).encode())
+            self.channel.send_message(str(y).encode())
             
             # Генерируем случайное k < q
             k = random.randint(1, q-1)
             r = pow(g, k, p)
             
             # Отправляем r
-            self.client_socket.send(str(r).encode())
+            self.channel.send_message(str(r).encode())
             self.log(f"Отправлено r: {r}")
             
             # Получаем случайный вызов e от сервера
-            e = int(self.client_socket.recv(1024).decode())
+            e = self.receive_challenge()
             self.log(f"Получено e: {e}")
             
             # Вычисляем s = (k + e*x) mod q
             s = (k + e * x) % q
-            self.client_socket.send(str(s).encode())
+            self.channel.send_message(str(s).encode())
             self.log(f"Отправлено s: {s}")
             
             # Получаем результат аутентификации
-            result = self.client_socket.recv(1024).decode()
+            result = self.channel.recv_message().decode()
             self.log(f"Ответ сервера: {result}")
             
             return result == "AUTH_SUCCESS"
@@ -444,31 +589,31 @@ class ClientGUI(QMainWindow):
             # Параметры протокола Гиллу-Кискатер
             n = 3233  # Модуль (p*q)
             v = 17    # Открытая экспонента (взаимно простая с φ(n))
-            s = 621   # Секретный ключ
+            s = CLIENT_SECRETS[3]   # Секретный ключ
             J = pow(s, v, n)  # Открытый ключ
             
             # Отправляем открытый ключ
-            self.client_socket.send(str(J).encode())
+            self.channel.send_message(str(J).encode())
             
             # Генерируем случайное r
             r = random.randint(1, n-1)
             X = pow(r, v, n)
             
             # Отправляем X
-            self.client_socket.send(str(X).encode())
+            self.channel.send_message(str(X).encode())
             self.log(f"Отправлено X: {X}")
             
             # Получаем случайный вызов e от сервера
-            e = int(self.client_socket.recv(1024).decode())
+            e = self.receive_challenge()
             self.log(f"Получено e: {e}")
             
             # Вычисляем y = (r * s^e) mod n
             y = (r * pow(s, e, n)) % n
-            self.client_socket.send(str(y).encode())
+            self.channel.send_message(str(y).encode())
             self.log(f"Отправлено y: {y}")
             
             # Получаем результат аутентификации
-            result = self.client_socket.recv(1024).decode()
+            result = self.channel.recv_message().decode()
             self.log(f"Ответ сервера: {result}")
             
             return result == "AUTH_SUCCESS"
@@ -479,123 +624,270 @@ class ClientGUI(QMainWindow):
     
     def send_file(self):
         """Отправляет файл на сервер"""
-        if not self.authentication_success or not self.client_socket or not self.file_path:
+        if not self.authentication_success or not self.client_socket or not self.file_paths:
             QMessageBox.warning(self, "Предупреждение", "Необходимо аутентифицироваться и выбрать файл")
             return
         
+        try:
+            connections = int(self.connections_entry.text().strip() or 1)
+            if connections < 1:
+                raise ValueError("Число соединений должно быть положительным")
+        except ValueError as e:
+            QMessageBox.critical(self, "Ошибка", f"Некорректное число соединений: {str(e)}")
+            return
+        
+        compress = (COMPRESSION or compression.AUTO) if self.compress_check.isChecked() else None
+        journal = self.upload_journal if self.resumable_check.isChecked() else None
+        
         # Запускаем отправку в отдельном потоке
-        threading.Thread(target=self.send_file_thread).start()
+        threading.Thread(target=self.send_file_thread, args=(connections, compress, journal)).start()
     
-    def send_file_thread(self):
-        """Поток для отправки файла"""
+    def take_encryption_info(self, protocol, compress=None, plain_size=None):
+        """Берёт ключи шифрования из пула, возвращает строку информации о шифровании;
+        compress - метод сжатия открытого текста (сжатые данные шифруются как байты),
+        plain_size - размер исходного файла, больше которого сервер не распаковывает"""
+        if compress:
+            options = {"mode": streaming.MODE_BYTES, "compress": compress, "size": plain_size}
+        else:
+            options = {"mode": FILE_MODE}
+        if protocol == 1:  # Фиат-Шамир
+            # Берём готовые ключи из пула (генерируются в фоне)
+            (pub_keys, secret) = self.key_pool.get("FS")
+            N, v = pub_keys
+            return format_info("FS", N, secret, **options)
+        
+        elif protocol == 2:  # Шнорр
+            (pub_keys, secret) = self.key_pool.get("SH")
+            p, g, y = pub_keys
+            return format_info("SH", p, g, secret, **options)
+        
+        elif protocol == 3:  # Гиллу-Кискатер
+            (pub_keys, secret) = self.key_pool.get("GQ")
+            N, v = pub_keys
+            return format_info("GQ", N, v, secret, **options)
+    
+    def choose_compression(self, file_path, setting):
+        """Метод сжатия файла по настройке (AUTO - по пробе файла) с записью в журнал"""
+        method = compression.resolve_method(file_path, setting)
+        if method:
+            self.log(f"Открытый текст {os.path.basename(file_path)} будет сжат методом {method}")
+        return method
+    
+    def open_stripe(self, protocol):
+        """Дополнительное соединение для параллельной загрузки: подключение и
+        неинтерактивная аутентификация (одно сообщение вместо обмена)"""
+        stripe_socket = socket.create_connection(self.server_address)
+        stripe = open_channel(stripe_socket)
         try:
-            protocol = self.get_selected_protocol()
-            self.log(f"Начинаем передачу файла: {self.file_path}")
-            
-            # Обновляем прогресс-бар
-            self.progress_signal.emit(10)
-            
-            # Создаем временный файл для шифрования
-            temp_encrypted_file = "temp_encrypted.txt"
-            
-            # Шифруем файл в зависимости от выбранного протокола
-            self.log(f"Шифруем файл...")
-            self.progress_signal.emit(20)
-            
-            if protocol == 1:  # Фиат-Шамир
-                # Генерируем ключи
-                (pub_keys, secret) = fiat_shamir.generate_keys()
-                N, v = pub_keys
-                # Шифруем файл
-                fiat_shamir.encrypt_fileFS(self.file_path, temp_encrypted_file, secret, N)
-                # Сохраняем ключи для передачи серверу
-                encryption_info = f"FS:{N}:{secret}"
-            
-            elif protocol == 2:  # Шнорр
-                # Генерируем ключи
-                (pub_keys, secret) = shnorr_encryption.generate_keys()
-                p, g, y = pub_keys
-                # Шифруем файл
-                shnorr_encryption.encrypt_fileSH(self.file_path, temp_encrypted_file, secret, g, p)
-                # Сохраняем ключи для передачи серверу
-                encryption_info = f"SH:{p}:{g}:{secret}"
-            
-            elif protocol == 3:  # Гиллу-Кискатер
-                # Генерируем ключи
-                (pub_keys, secret) = guillou_quisquater.generate_keys()
-                N, v = pub_keys
-                # Шифруем файл
-                guillou_quisquater.encrypt_fileGQ(self.file_path, temp_encrypted_file, secret, N)
-                # Сохраняем ключи для передачи серверу
-                encryption_info = f"GQ:{N}:{v}:{secret}"
-            
-            self.log(f"Файл успешно зашифрован")
-            self.progress_signal.emit(40)
-            
-            # Отправляем имя файла
-            file_name = os.path.basename(self.file_path)
-            self.client_socket.send(f"FILENAME:{file_name}".encode())
-            response = self.client_socket.recv(1024).decode()  # Получаем подтверждение
-            
-            self.progress_signal.emit(50)
-            
-            # Отправляем информацию о шифровании
-            self.client_socket.send(f"ENCRYPTION:{encryption_info}".encode())
-            response = self.client_socket.recv(1024).decode()  # Получаем подтверждение
-            
-            self.progress_signal.emit(60)
-            
-            # Отправляем размер зашифрованного файла
-            file_size = os.path.getsize(temp_encrypted_file)
-            self.client_socket.send(f"FILESIZE:{file_size}".encode())
-            
-            # Получаем подтверждение готовности
-            ready = self.client_socket.recv(1024).decode()
-            if ready != "READY":
-                self.log(f"Ошибка: сервер не готов к приему файла")
-                self.progress_signal.emit(0)
+            proof = nizk.prove(protocol, CLIENT_SECRETS[protocol])
+            stripe.send_message(nizk.format_proof(proof))
+            result = stripe.recv_message().decode()
+            if result != "AUTH_SUCCESS":
+                raise ConnectionError(f"Аутентификация дополнительного соединения: {result}")
+        except Exception:
+            stripe.close()
+            raise
+        return stripe
+    
+    def upload_file_striped(self, protocol, file_path, index, count, connections, compress=None):
+        """Параллельная отправка одного файла: куски шифротекста разбирают из общей очереди
+        основное и дополнительные соединения, возвращает итоговый ответ сервера"""
+        def progress(value):
+            self.progress_signal.emit(int((index + value / 100) / count * 100))
+        
+        self.log(f"Начинаем параллельную передачу файла: {file_path}")
+        progress(10)
+        
+        upload_id = secrets.token_hex(16)
+        encryption_info = self.take_encryption_info(protocol, self.choose_compression(file_path, compress),
+                                                    os.path.getsize(file_path))
+        file_name = os.path.basename(file_path)
+        file_size = encrypted_size(encryption_info, file_path, BINARY_CIPHERTEXT)
+        total_chunks = -(-file_size // STRIPE_CHUNK_SIZE)
+        self.log(f"Шифруем и передаем файл...")
+        progress(20)
+        
+        # Шифротекст нарезается на куски по мере шифрования (в фоновом потоке)
+        pieces = streaming.prefetch(encrypt_stream(encryption_info, file_path, BINARY_CIPHERTEXT))
+        chunks = streaming.fixed_chunks(pieces, STRIPE_CHUNK_SIZE)
+        chunks_lock = threading.Lock()
+        retry = queue.Queue()
+        replies = []
+        sent = []
+        
+        def next_chunk():
+            # Сначала куски, возвращенные после обрыва соединения
+            try:
+                return retry.get_nowait()
+            except queue.Empty:
+                pass
+            with chunks_lock:
+                return next(chunks, None)
+        
+        def send_chunks(stripe):
+            while not replies:
+                chunk = next_chunk()
+                if chunk is None:
+                    return
+                offset, data = chunk
+                try:
+                    stripe.send_message(format_upload_header(file_name, encryption_info, file_size,
+                                                             upload_id=upload_id, offset=offset,
+                                                             length=len(data)))
+                    stripe.send_data(data)
+                    reply = stripe.recv_message().decode()
+                except Exception:
+                    # Кусок достанется другому соединению
+                    retry.put(chunk)
+                    raise
+                sent.append(offset)
+                progress(20 + len(sent) / total_chunks * 70)  # От 20% до 90%
+                if not reply.startswith(CHUNK_RECEIVED):
+                    replies.append(reply)
+        
+        def extra_stripe():
+            try:
+                stripe = self.open_stripe(protocol)
+            except Exception as e:
+                self.log(f"Не удалось открыть дополнительное соединение: {str(e)}")
                 return
-            
-            self.progress_signal.emit(70)
-                
-            # Отправляем содержимое зашифрованного файла
-            bytes_sent = 0
-            with open(temp_encrypted_file, 'rb') as f:
-                data = f.read(4096)
-                while data:
-                    self.client_socket.send(data)
-                    bytes_sent += len(data)
-                    # Обновляем прогресс
-                    progress = 70 + (bytes_sent / file_size) * 20  # От 70% до 90%
-                    self.progress_signal.emit(int(progress))
-                    data = f.read(4096)
-                    
-            self.log(f"Зашифрованный файл {file_name} успешно передан")
-            self.progress_signal.emit(90)
-            
-            # Удаляем временный зашифрованный файл
-            os.remove(temp_encrypted_file)
-            
-            # Получаем подтверждение о получении файла
-            confirmation = self.client_socket.recv(1024).decode()
-            self.log(f"{confirmation}")
+            try:
+                send_chunks(stripe)
+                stripe.send_message(SESSION_END.encode())
+            except Exception as e:
+                self.log(f"Дополнительное соединение прервано: {str(e)}")
+            finally:
+                stripe.close()
+        
+        threads = [threading.Thread(target=extra_stripe) for _ in range(min(connections, total_chunks) - 1)]
+        for thread in threads:
+            thread.start()
+        try:
+            send_chunks(self.channel)
+            for thread in threads:
+                thread.join()
+            # Куски оборвавшихся дополнительных соединений досылаем по основному
+            send_chunks(self.channel)
+        finally:
+            for thread in threads:
+                thread.join()
+            chunks.close()
+            pieces.close()
+        
+        confirmation = replies[0] if replies else f"ERROR: Файл {file_name} передан не полностью"
+        self.log(f"Файл {file_name} передан кусками по {len(threads) + 1} соединениям")
+        self.log(f"{confirmation}")
+        progress(90)
+        return confirmation
+    
+    def upload_file(self, protocol, file_path, index, count, compress=None, journal=None):
+        """Шифрование и отправка одного файла в открытой сессии, возвращает ответ сервера;
+        с журналом (journal) загрузка возобновляемая"""
+        # Прогресс файла index из count - своя доля общего прогресс-бара
+        def progress(value):
+            self.progress_signal.emit(int((index + value / 100) / count * 100))
+        
+        self.log(f"Начинаем передачу файла: {file_path}")
+        
+        # Обновляем прогресс-бар
+        progress(10)
+        
+        file_name = os.path.basename(file_path)
+        entry = journal.get(file_path) if journal is not None else None
+        offset = 0
+        if entry:
+            # Незавершенная загрузка: узнаем у сервера, сколько байт уже принято
+            upload_id, encryption_info = entry["upload_id"], entry["encryption"]
+            binary = entry.get("binary", BINARY_CIPHERTEXT)
+            self.channel.send_message(format_resume_query(upload_id))
+            reply = self.channel.recv_message().decode()
+            # Отказ (например, загрузку еще держит прежнее соединение) - запись журнала сохраняем
+            if reply.startswith("ERROR"):
+                return reply
+            offset = parse_offset(reply)
+            self.log(f"Продолжаем загрузку {file_name} с байта {offset}")
+        else:
+            encryption_info = self.take_encryption_info(protocol, self.choose_compression(file_path, compress),
+                                                        os.path.getsize(file_path))
+            binary = BINARY_CIPHERTEXT
+            if journal is not None:
+                # Ключ хранится в журнале до подтверждения сервера: шифрование детерминировано,
+                # и после обрыва недостающий шифротекст получается заново
+                upload_id = secrets.token_hex(16)
+                journal.add(file_path, upload_id, encryption_info, binary)
+        progress(20)
+        
+        # Отправляем единый заголовок загрузки (имя, информация о шифровании, размер,
+        # для возобновляемой - идентификатор и смещение) и сразу следом данные:
+        # сервер ответит, только если отклонит заголовок
+        fields = {"upload_id": upload_id, "offset": offset} if journal is not None else {}
+        file_size = encrypted_size(encryption_info, file_path, binary)
+        self.channel.send_message(format_upload_header(file_name, encryption_info, file_size, **fields))
+        
+        # Шифруем и отправляем с места остановки: следующие куски шифруются
+        # в фоновом потоке, пока отправляются предыдущие
+        self.log(f"Шифруем и передаем файл...")
+        bytes_sent = offset
+        for piece in streaming.prefetch(encrypt_stream(encryption_info, file_path, binary, offset)):
+            self.channel.send_data(piece)
+            bytes_sent += len(piece)
+            # Обновляем прогресс
+            progress(20 + (bytes_sent / file_size) * 70)  # От 20% до 90%
+        
+        self.log(f"Зашифрованный файл {file_name} успешно передан")
+        progress(90)
+        
+        # Получаем подтверждение о получении файла
+        confirmation = self.channel.recv_message().decode()
+        self.log(f"{confirmation}")
+        
+        # Подтвержденную или отклоненную загрузку удаляем из журнала
+        if journal is not None and confirmation.startswith(("FILE_RECEIVED", "ERROR")):
+            journal.remove(file_path)
+        
+        return confirmation
+    
+    def send_file_thread(self, connections=STRIPE_CONNECTIONS, compress=COMPRESSION, journal=None):
+        """Поток для отправки выбранных файлов в одной сессии без повторной аутентификации"""
+        try:
+            protocol = self.get_selected_protocol()
+            file_paths = list(self.file_paths)
+            for index, file_path in enumerate(file_paths):
+                # Большие файлы при нескольких соединениях идут кусками параллельно
+                if connections > 1 and os.path.getsize(file_path) > STRIPE_CHUNK_SIZE:
+                    confirmation = self.upload_file_striped(protocol, file_path, index,
+                                                            len(file_paths), connections, compress)
+                else:
+                    confirmation = self.upload_file(protocol, file_path, index, len(file_paths), compress, journal)
+                if not confirmation.startswith("FILE_RECEIVED"):
+                    raise ConnectionError(confirmation)
             
             self.progress_signal.emit(100)
-            self.status_update_signal.emit("Файл успешно отправлен и расшифрован на сервере")
+            self.status_update_signal.emit(f"Отправлено файлов: {len(file_paths)}. Сессия открыта")
             
         except Exception as e:
             self.log(f"Ошибка при отправке файла: {str(e)}")
             self.status_update_signal.emit(f"Ошибка: {str(e)}")
             self.progress_signal.emit(0)
-        finally:
-            # Закрываем соединение
-            if self.client_socket:
-                self.client_socket.close()
-                self.client_socket = None
-            # Сбрасываем статус аутентификации
-            self.auth_status_signal.emit(False)
-            # Восстанавливаем кнопку подключения
-            self.connect_button.setEnabled(True)
+            # После ошибки сервер закрывает сессию - закрываем соединение и мы
+            self.close_session(send_bye=False)
+    
+    def close_session(self, send_bye=True):
+        """Завершает сессию (BYE) и закрывает соединение"""
+        if self.client_socket:
+            if send_bye and self.channel:
+                try:
+                    self.channel.send_message(SESSION_END.encode())
+                except OSError:
+                    pass
+            self.client_socket.close()
+            self.client_socket = None
+            self.channel = None
+            self.log("Сессия завершена")
+        # Сбрасываем статус аутентификации
+        self.auth_status_signal.emit(False)
+        # Восстанавливаем кнопку подключения
+        self.connect_button.setEnabled(True)
     
     def closeEvent(self, event):
         """Обработчик закрытия окна"""
@@ -608,12 +900,13 @@ class ClientGUI(QMainWindow):
                 QMessageBox.StandardButton.No
             )
             if reply == QMessageBox.StandardButton.Yes:
-                if self.client_socket:
-                    self.client_socket.close()
+                self.close_session()
+                self.key_pool.stop()
                 event.accept()
             else:
                 event.ignore()
         else:
+            self.key_pool.stop()
             event.accept()
 
 if __name__ == "__main__":
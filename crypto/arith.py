@@ -0,0 +1,48 @@
+import math
+
+import crypto.primes as primes
+
+# Лёгкий арифметический бэкенд вместо sympy.
+# sympy импортируется только лениво, как запасной вариант для случаев,
+# которые здесь не покрыты (например, первообразный корень по составному модулю).
+
+# До какой границы раскладываем p - 1 пробным делением при поиске первообразного корня
+FACTOR_TRIAL_LIMIT = 1 << 20
+
+# Проверка простоты (детерминированный Миллер-Рабин ниже 3.3 * 10^24)
+def isprime(n):
+    return primes.is_prime(n)
+
+# Обратный элемент по модулю через встроенный pow(a, -1, n)
+def mod_inverse(a, n):
+    try:
+        return pow(a, -1, n)
+    except ValueError:
+        raise ValueError(f"inverse of {a} (mod {n}) does not exist") from None
+
+# Простые делители n пробным делением; None, если n не разложилось до границы
+def _prime_factors(n, limit=FACTOR_TRIAL_LIMIT):
+    factors = []
+    for p in primes.primes_up_to(min(limit, max(math.isqrt(n), 2))):
+        if p * p > n:
+            break
+        if n % p == 0:
+            factors.append(p)
+            while n % p == 0:
+                n //= p
+    if n > 1:
+        if n > limit * limit and not primes.is_prime(n):
+            return None
+        factors.append(n)
+    return factors
+
+# Наименьший первообразный корень по простому модулю p (как sympy.primitive_root)
+def primitive_root(p):
+    factors = _prime_factors(p - 1) if p > 2 and primes.is_prime(p) else None
+    if factors is None:
+        from sympy import primitive_root as sympy_primitive_root
+        return sympy_primitive_root(p)
+    exponents = [(p - 1) // q for q in factors]
+    for g in range(2, p):
+        if all(pow(g, e, p) != 1 for e in exponents):
+            return g
@@ -0,0 +1,72 @@
+import struct
+import sys
+from array import array
+
+import crypto.vectorized as vectorized
+
+# Бинарный контейнер шифротекста.
+# Заголовок: магия "ZKC", версия, алгоритм (2 символа ASCII), ширина слова в байтах.
+# Далее идут слова шифротекста фиксированной ширины в порядке little-endian,
+# которые читаются через array/np.frombuffer без разбора текста.
+MAGIC = b"ZKC"
+VERSION = 1
+HEADER = struct.Struct("<3sB2sB")
+
+# Допустимые ширины слова
+WORD_WIDTHS = (1, 2, 4, 8)
+
+# Коды типов array с нужным размером элемента на этой платформе
+_ARRAY_TYPECODES = {}
+for _typecode in "BHILQ":
+    _ARRAY_TYPECODES.setdefault(array(_typecode).itemsize, _typecode)
+
+# Минимальная ширина слова, в которую помещается любой остаток по модулю
+def word_width(modulus):
+    for width in WORD_WIDTHS:
+        if modulus - 1 < 256 ** width:
+            return width
+    raise ValueError(f"Модуль {modulus} не помещается в 64-битное слово")
+
+# Упаковка заголовка контейнера
+def pack_header(algorithm, width):
+    return HEADER.pack(MAGIC, VERSION, algorithm.encode('ascii'), width)
+
+# Разбор заголовка: возвращает (алгоритм, ширина слова)
+def unpack_header(data):
+    if len(data) < HEADER.size:
+        raise ValueError("Слишком короткий заголовок бинарного шифротекста")
+    magic, version, algorithm, width = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Неверная сигнатура бинарного шифротекста")
+    if version != VERSION:
+        raise ValueError(f"Неподдерживаемая версия бинарного шифротекста: {version}")
+    if width not in WORD_WIDTHS:
+        raise ValueError(f"Недопустимая ширина слова: {width}")
+    return algorithm.decode('ascii'), width
+
+# Является ли начало данных бинарным контейнером
+def is_binary(prefix):
+    return prefix[:len(MAGIC)] == MAGIC
+
+# Слова шифротекста -> байты (little-endian, фиксированная ширина)
+def encode_words(words, width):
+    if vectorized.np is not None and isinstance(words, vectorized.np.ndarray):
+        return words.astype(f"<u{width}").tobytes()
+    packed = array(_ARRAY_TYPECODES[width], words)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+# Байты -> слова шифротекста (массив NumPy, если он доступен, иначе список)
+def decode_words(data, width):
+    if len(data) % width:
+        raise ValueError("Бинарный шифротекст обрезан посередине слова")
+    if width < 8 and len(data) >= vectorized.VECTORIZE_THRESHOLD * width \
+            and vectorized.numpy() is not None:
+        np = vectorized.np
+        return np.frombuffer(data, dtype=f"<u{width}").astype(np.int64)
+    packed = array(_ARRAY_TYPECODES[width])
+    packed.frombytes(data)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tolist()
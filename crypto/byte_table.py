@@ -0,0 +1,75 @@
+import crypto.vectorized as vectorized
+
+# Размер байтового алфавита
+ALPHABET_SIZE = 256
+
+# До такого модуля обратная таблица для NumPy хранится плотным массивом по всем остаткам
+DENSE_INVERSE_LIMIT = 1 << 22
+
+# Таблицы посимвольного шифра для байтового алфавита.
+# Для фиксированного ключа шифр байта - это просто b * multiplier mod modulus,
+# поэтому прямая таблица из 256 значений и обратный словарь строятся один раз,
+# а шифрование/расшифрование сводится к индексации без модульной арифметики.
+# Таблицы для NumPy строятся лениво, когда приходит первый большой буфер.
+class ByteTable:
+    __slots__ = ("modulus", "forward", "inverse", "_np_forward", "_np_dense", "_np_sorted", "_np_order")
+
+    def __init__(self, ctx):
+        multiplier, modulus = ctx.multiplier, ctx.modulus
+        self.modulus = modulus
+        self.forward = tuple((b * multiplier) % modulus for b in range(ALPHABET_SIZE))
+        self.inverse = {c: b for b, c in enumerate(self.forward)}
+        if len(self.inverse) != ALPHABET_SIZE:
+            raise ValueError(f"Модуль {modulus} слишком мал для байтового алфавита")
+        self._np_forward = self._np_dense = self._np_sorted = self._np_order = None
+
+    # Нужен ли путь NumPy для буфера такого размера (таблицы строятся при первом вызове)
+    def _use_numpy(self, words):
+        np = vectorized.np
+        if not (np is not None and isinstance(words, np.ndarray)):
+            if len(words) < vectorized.VECTORIZE_THRESHOLD or vectorized.numpy() is None:
+                return False
+            np = vectorized.np
+        if self._np_forward is None:
+            forward = np.array(self.forward, dtype=np.int64)
+            if self.modulus <= DENSE_INVERSE_LIMIT:
+                # Остаток -> байт, -1 для значений вне алфавита
+                self._np_dense = np.full(self.modulus, -1, dtype=np.int16)
+                self._np_dense[forward] = np.arange(ALPHABET_SIZE, dtype=np.int16)
+            else:
+                self._np_order = np.argsort(forward).astype(np.uint8)
+                self._np_sorted = forward[self._np_order]
+            self._np_forward = forward
+        return True
+
+    # Шифрование bytes/bytearray/memoryview: массив NumPy для больших буферов или список слов
+    def encrypt(self, data):
+        if self._use_numpy(data):
+            np = vectorized.np
+            return self._np_forward[np.frombuffer(data, dtype=np.uint8)]
+        return list(map(self.forward.__getitem__, memoryview(data).cast('B')))
+
+    # Расшифрование слов шифротекста обратно в bytes
+    def decrypt(self, words):
+        if self._use_numpy(words):
+            np = vectorized.np
+            words = np.asarray(words, dtype=np.int64)
+            if self._np_dense is not None:
+                if words.size and (int(words.min()) < 0 or int(words.max()) >= self._np_dense.size):
+                    raise ValueError("Шифротекст содержит значение вне байтового алфавита")
+                decrypted = self._np_dense[words]
+                if words.size and int(decrypted.min()) < 0:
+                    raise ValueError("Шифротекст содержит значение вне байтового алфавита")
+                return decrypted.astype(np.uint8).tobytes()
+            # Поиск по отсортированной прямой таблице вместо умножения по модулю
+            positions = np.searchsorted(self._np_sorted, words)
+            np.minimum(positions, ALPHABET_SIZE - 1, out=positions)
+            if not np.array_equal(self._np_sorted[positions], words):
+                raise ValueError("Шифротекст содержит значение вне байтового алфавита")
+            return self._np_order[positions].tobytes()
+        if not isinstance(words, list):
+            words = words.tolist()
+        try:
+            return bytes(map(self.inverse.__getitem__, words))
+        except KeyError as e:
+            raise ValueError(f"Шифротекст содержит значение вне байтового алфавита: {e}") from None
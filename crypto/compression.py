@@ -0,0 +1,145 @@
+import lzma
+import zlib
+
+# Сжатие открытого текста перед шифрованием. Шифр посимвольный и раздувает
+# данные в несколько раз, поэтому хорошо сжимаемые файлы (журналы, CSV)
+# выгоднее сначала сжать. Метод передается опцией compress=<метод> в строке
+# ENCRYPTION:, а исходный размер файла - опцией size=<байт>; сервер распаковывает
+# открытый текст после расшифрования, но не больше объявленного размера.
+# Сжатые данные - произвольные байты, поэтому шифруются в режиме bytes.
+
+# Поддерживаемые методы и значение настройки клиента "выбрать по пробе файла"
+METHODS = ("zlib", "lzma")
+AUTO = "auto"
+
+# Уровни сжатия: zlib - по умолчанию, lzma - самый быстрый пресет
+ZLIB_LEVEL = 6
+LZMA_PRESET = 1
+
+# Проба для выбора метода: сколько байт брать из начала, середины и конца файла
+SAMPLE_SIZE = 64 * 1024
+
+# Сжимать, только если проба сжимается zlib хотя бы до этой доли
+MAX_RATIO = 0.9
+
+# lzma медленнее, поэтому выбирается, только если жмет пробу заметно лучше
+# zlib (до этой доли от результата zlib)
+LZMA_GAIN = 0.8
+
+# Наибольшая порция, которую распаковщик выдает за один вызов
+CHUNK_SIZE = 64 * 1024
+
+# Проверка названия метода; ValueError при неизвестном
+def check_method(method):
+    if method not in METHODS:
+        raise ValueError(f"Неизвестный метод сжатия: {method}")
+    return method
+
+# Объект сжатия для метода
+def _compressor(method):
+    if check_method(method) == "zlib":
+        return zlib.compressobj(ZLIB_LEVEL)
+    return lzma.LZMACompressor(preset=LZMA_PRESET)
+
+# Объект распаковки для метода
+def _decompressor(method):
+    if check_method(method) == "zlib":
+        return zlib.decompressobj()
+    return lzma.LZMADecompressor()
+
+# Распаковка очередной порции порциями по CHUNK_SIZE, всего не больше limit байт
+# (иначе ValueError); данные после конца сжатого потока - ошибка
+def _decompress(decompressor, data, limit):
+    if decompressor.eof:
+        if data:
+            raise ValueError("Лишние данные после конца сжатого потока")
+        return b''
+    pieces = []
+    size = 0
+    while True:
+        try:
+            piece = decompressor.decompress(data, CHUNK_SIZE)
+        except (zlib.error, lzma.LZMAError) as e:
+            raise ValueError(f"Некорректные сжатые данные: {e}") from None
+        size += len(piece)
+        if size > limit:
+            raise ValueError("Распакованные данные превышают допустимый размер")
+        pieces.append(piece)
+        if decompressor.eof:
+            break
+        # Вход, не поместившийся в порцию (zlib хранит его снаружи, lzma - внутри)
+        data = getattr(decompressor, "unconsumed_tail", b'')
+        if not data and len(piece) < CHUNK_SIZE:
+            break
+    if decompressor.unused_data:
+        raise ValueError("Лишние данные после конца сжатого потока")
+    return b''.join(pieces)
+
+# Сжатие потока кусков байтов; результат детерминирован (при той же версии
+# библиотеки), так что поток можно получить заново для продолжения загрузки
+def compress_chunks(chunks, method):
+    compressor = _compressor(method)
+    for chunk in chunks:
+        piece = compressor.compress(chunk)
+        if piece:
+            yield piece
+    piece = compressor.flush()
+    if piece:
+        yield piece
+
+# Проба файла: куски из начала, середины и конца (небольшой файл - целиком)
+def _sample(path, size=SAMPLE_SIZE):
+    with open(path, 'rb') as f:
+        data = f.read(size)
+        length = f.seek(0, 2)
+        if length <= 3 * size:
+            f.seek(size)
+            return data + f.read()
+        for offset in ((length - size) // 2, length - size):
+            f.seek(offset)
+            data += f.read(size)
+    return data
+
+# Выбор метода по пробе файла; None - файл сжимается плохо, сжатие не нужно
+def choose_method(path):
+    data = _sample(path)
+    if not data:
+        return None
+    zlib_size = len(zlib.compress(data, ZLIB_LEVEL))
+    if zlib_size > len(data) * MAX_RATIO:
+        return None
+    if len(lzma.compress(data, preset=LZMA_PRESET)) < zlib_size * LZMA_GAIN:
+        return "lzma"
+    return "zlib"
+
+# Метод сжатия файла по настройке клиента: AUTO - по пробе, иначе сама настройка
+def resolve_method(path, setting):
+    if setting == AUTO:
+        return choose_method(path)
+    return check_method(setting) if setting else None
+
+# Пошаговая распаковка вывода расшифровщика (StreamDecryptor): тот же
+# интерфейс feed()/finish(), на выходе - исходный открытый текст.
+# size - объявленный размер исходного файла: больше распаковать нельзя
+# ("бомба" прерывается ValueError), меньше - поток обрезан или подменен.
+class StreamDecompressor:
+    def __init__(self, decoder, method, size):
+        self._decoder = decoder
+        self._decompressor = _decompressor(method)
+        self._remaining = size
+
+    def feed(self, data):
+        return self._decompress(self._decoder.feed(data))
+
+    def finish(self):
+        piece = self._decompress(self._decoder.finish())
+        if not self._decompressor.eof:
+            raise ValueError("Сжатые данные обрезаны")
+        if self._remaining:
+            raise ValueError("Размер распакованных данных меньше объявленного")
+        return piece
+
+    def _decompress(self, data):
+        piece = _decompress(self._decompressor, data, self._remaining)
+        self._remaining -= len(piece)
+        return piece
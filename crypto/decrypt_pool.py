@@ -0,0 +1,86 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import crypto.fiat_shamir as fiat_shamir
+import crypto.shnorr_encryption as shnorr_encryption
+import crypto.guillou_quisquater as guillou_quisquater
+import crypto.streaming as streaming
+from crypto.encryption_info import context_from_info, info_compression, info_mode, stream_decryptor
+
+# Число процессов расшифровки по умолчанию - по числу ядер
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Шифротекст до этого размера (байты) расшифровывается на лету в потоке соединения;
+# больший принимается в файл и расшифровывается в пуле процессов
+STREAM_LIMIT = 4 * 1024 * 1024
+
+# Функции расшифровки файлов по алгоритмам (обозначения как в строке ENCRYPTION:)
+FILE_DECRYPTORS = {
+    "FS": fiat_shamir.decrypt_fileFS,
+    "SH": shnorr_encryption.decrypt_fileSH,
+    "GQ": guillou_quisquater.decrypt_fileGQ,
+}
+
+# Расшифровка файла по строке ENCRYPTION:, возвращает алгоритм.
+# Функция верхнего уровня, чтобы её можно было выполнить в дочернем процессе;
+# контексты ключей кэшируются в каждом процессе отдельно.
+def decrypt_file(encryption_info, encrypted_file, decrypted_file):
+    algorithm, key_context = context_from_info(encryption_info)
+    if info_compression(encryption_info):
+        # Сжатый открытый текст распаковывается по ходу расшифрования (за один проход);
+        # при ошибке, в том числе превышении предела распаковки, файл не сохраняется
+        decryptor = stream_decryptor(encryption_info)
+        try:
+            with open(encrypted_file, 'rb') as src, open(decrypted_file, 'wb') as dst:
+                for chunk in streaming.read_chunks(src):
+                    dst.write(decryptor.feed(chunk))
+                dst.write(decryptor.finish())
+        except BaseException:
+            os.remove(decrypted_file)
+            raise
+        return algorithm
+    FILE_DECRYPTORS[algorithm](encrypted_file, decrypted_file, key_context,
+                               mode=info_mode(encryption_info))
+    return algorithm
+
+# Пул процессов для расшифровки принятых файлов.
+# Расшифровка - чистая арифметика на Python и держит GIL, поэтому в потоке
+# соединения она тормозит рукопожатия остальных клиентов. В отдельных
+# процессах файлы расшифровываются параллельно на всех ядрах.
+# При workers=0 расшифровка выполняется в вызывающем потоке, как раньше.
+class DecryptPool:
+    def __init__(self, workers=DEFAULT_WORKERS, stream_limit=STREAM_LIMIT):
+        if workers < 0:
+            raise ValueError("Число процессов не может быть отрицательным")
+        self.workers = workers
+        self.stream_limit = stream_limit
+        self._executor = None
+
+    # Запуск пула (процессы создаются по мере поступления задач)
+    def start(self):
+        if self.workers and self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    # Остановка пула; wait=False не ждёт уже запущенные задачи
+    def stop(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+
+    # Расшифровывать ли загрузку размера size на лету, по мере приема:
+    # небольшие - да, большие отдаются пулу (без пула - все на лету)
+    def streams(self, size):
+        return self._executor is None or size <= self.stream_limit
+
+    # Постановка файла в очередь расшифровки, возвращает Future с алгоритмом
+    def submit(self, encryption_info, encrypted_file, decrypted_file):
+        if self._executor is None:
+            raise RuntimeError("Пул расшифровки не запущен")
+        return self._executor.submit(decrypt_file, encryption_info, encrypted_file, decrypted_file)
+
+    # Расшифровка с ожиданием результата
+    def decrypt(self, encryption_info, encrypted_file, decrypted_file):
+        if self._executor is None:
+            return decrypt_file(encryption_info, encrypted_file, decrypted_file)
+        return self.submit(encryption_info, encrypted_file, decrypted_file).result()
@@ -0,0 +1,117 @@
+from functools import lru_cache
+
+import crypto.fiat_shamir as fiat_shamir
+import crypto.shnorr_encryption as shnorr_encryption
+import crypto.guillou_quisquater as guillou_quisquater
+import crypto.compression as compression
+import crypto.streaming as streaming
+
+# Сколько разных строк ENCRYPTION: держать в кэше контекстов
+INFO_CACHE_SIZE = 128
+
+# Число параметров ключа у каждого алгоритма; после них идут опции вида key=value
+INFO_PARAMS = {"FS": 2, "SH": 3, "GQ": 3}
+
+# Сборка строки ENCRYPTION: "ALG:param1:param2[:key=value...]"
+def format_info(algorithm, *params, **options):
+    parts = [algorithm, *map(str, params)]
+    parts += [f"{key}={value}" for key, value in options.items()]
+    return ":".join(parts)
+
+# Опции из строки ENCRYPTION: (всё, что идёт после параметров ключа)
+def info_options(encryption_info):
+    enc_parts = encryption_info.split(":")
+    options = {}
+    for part in enc_parts[1 + INFO_PARAMS.get(enc_parts[0], 0):]:
+        key, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"Некорректная опция шифрования: {part}")
+        options[key] = value
+    return options
+
+# Режим открытого текста: без опции mode - текст, как у старых клиентов
+def info_mode(encryption_info):
+    mode = info_options(encryption_info).get("mode", streaming.MODE_TEXT)
+    if mode not in streaming.MODES:
+        raise ValueError(f"Неизвестный режим шифрования: {mode}")
+    return mode
+
+# Метод сжатия открытого текста (опция compress) или None - без сжатия
+def info_compression(encryption_info):
+    method = info_options(encryption_info).get("compress")
+    if method is None:
+        return None
+    compression.check_method(method)
+    if info_mode(encryption_info) != streaming.MODE_BYTES:
+        raise ValueError("Сжатый открытый текст шифруется только в режиме bytes")
+    return method
+
+# Размер исходного файла (опция size) для сжатого открытого текста: предел распаковки
+def info_plain_size(encryption_info):
+    size = info_options(encryption_info).get("size")
+    if size is None or not size.isdigit():
+        raise ValueError("Для сжатого открытого текста нужен размер исходного файла (опция size)")
+    return int(size)
+
+# Разбор строки ENCRYPTION: в (алгоритм, контекст ключа для расшифрования).
+# Результат кэшируется, так что повторные загрузки с тем же ключом
+# не пересчитывают множитель и обратный элемент.
+@lru_cache(maxsize=INFO_CACHE_SIZE)
+def context_from_info(encryption_info):
+    enc_parts = encryption_info.split(":")
+    algorithm = enc_parts[0]
+
+    if algorithm == "FS":  # Фиат-Шамир
+        N = int(enc_parts[1])
+        secret = int(enc_parts[2])
+        return algorithm, fiat_shamir.make_context(secret, N)
+
+    if algorithm == "SH":  # Шнорр
+        p = int(enc_parts[1])
+        g = int(enc_parts[2])
+        secret = int(enc_parts[3])
+        return algorithm, shnorr_encryption.make_context(secret, g, p)
+
+    if algorithm == "GQ":  # Гиллу-Кискатер
+        N = int(enc_parts[1])
+        v = int(enc_parts[2])
+        return algorithm, guillou_quisquater.public_context(v, N)
+
+    raise ValueError(f"Неизвестный алгоритм шифрования: {algorithm}")
+
+# Пошаговый расшифровщик по строке ENCRYPTION: для данных, приходящих из сокета.
+# Открытый текст выдается байтами (текст - в UTF-8); state - сохраненное состояние.
+# Сжатый открытый текст распаковывается ровно до объявленного размера исходного
+# файла. У распаковщика нет сохраняемого состояния, поэтому state для сжатого
+# открытого текста не поддерживается.
+def stream_decryptor(encryption_info, state=None):
+    algorithm, ctx = context_from_info(encryption_info)
+    decryptor = streaming.StreamDecryptor(ctx, algorithm, info_mode(encryption_info), state, as_bytes=True)
+    method = info_compression(encryption_info)
+    if method:
+        if state is not None:
+            raise ValueError("Состояние распаковщика сжатого открытого текста не сохраняется")
+        return compression.StreamDecompressor(decryptor, method, info_plain_size(encryption_info))
+    return decryptor
+
+# Потоковое шифрование файла по строке ENCRYPTION: (на стороне клиента):
+# куски шифротекста начиная с байта offset
+def encrypt_stream(encryption_info, input_file, binary=False, offset=0):
+    algorithm, ctx = context_from_info(encryption_info)
+    return streaming.encrypt_stream(input_file, ctx, binary, algorithm, info_mode(encryption_info), offset,
+                                    compress=info_compression(encryption_info))
+
+# Размер шифротекста файла по строке ENCRYPTION: - для заголовка загрузки до шифрования
+def encrypted_size(encryption_info, input_file, binary=False):
+    _, ctx = context_from_info(encryption_info)
+    return streaming.encrypted_size(input_file, ctx, binary, info_mode(encryption_info),
+                                    compress=info_compression(encryption_info))
+
+# Проверка строки ENCRYPTION: до приема файла; ValueError с описанием при ошибке
+def check_info(encryption_info):
+    try:
+        context_from_info(encryption_info)
+        if info_compression(encryption_info):
+            info_plain_size(encryption_info)
+    except (IndexError, ValueError):
+        raise ValueError(f"Некорректная информация о шифровании: {encryption_info}") from None
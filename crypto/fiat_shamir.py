@@ -1,55 +1,73 @@
-import random
-from sympy import isprime, mod_inverse
+import crypto.primes as primes
+import crypto.streaming as streaming
+import crypto.vectorized as vectorized
+from crypto.arith import mod_inverse
+from crypto.key_context import KeyContext, resolve
 
 # Генерация двух простых чисел p и q
 def generate_prime(start=100, end=500):
-    while True:
-        num = random.randint(start, end)
-        if isprime(num):
-            return num
+    return primes.random_prime(start, end)
 
 # Генерация ключей
 def generate_keys():
     p = generate_prime()
     q = generate_prime()
     N = p * q
-    s = random.randint(2, N - 1)  # Секретный ключ
-    while not isprime(s):  # s должно быть взаимно простым с N
-        s = random.randint(2, N - 1)
+    s = primes.random_prime(2, N - 1)  # Секретный ключ
+    while N % s == 0:  # s должно быть взаимно простым с N
+        s = primes.random_prime(2, N - 1)
     v = pow(s, 2, N)  # Открытый ключ
     return (N, v), s  # (публичные ключи, приватный ключ)
 
+# Контекст ключа: множитель s^2 mod N и обратный к нему
+def make_context(s, N):
+    multiplier = pow(s, 2, N)
+    return KeyContext(N, multiplier, mod_inverse(multiplier, N))
+
 # Шифрование ASCII-кода
-def encrypt_char(m, s, N):
-    return (m * pow(s, 2, N)) % N
+def encrypt_char(m, s, N=None):
+    ctx = resolve(s, make_context, N)
+    return (m * ctx.multiplier) % ctx.modulus
 
 # Расшифрование ASCII-кода
-def decrypt_char(c, s, N):
-    s_inv = mod_inverse(pow(s, 2, N), N)  # Обратное число
-    return (c * s_inv) % N
+def decrypt_char(c, s, N=None):
+    ctx = resolve(s, make_context, N)
+    return (c * ctx.inverse) % ctx.modulus  # Обратное число считается один раз в контексте
 
-# Шифрование текста
-def encrypt_text(text, s, N):
-    return [encrypt_char(ord(c), s, N) for c in text]
+# Шифрование текста (s - секретный ключ или готовый контекст ключа)
+def encrypt_text(text, s, N=None):
+    ctx = resolve(s, make_context, N)
+    return vectorized.encrypt_text(text, ctx)
 
 # Расшифрование текста
-def decrypt_text(encrypted, s, N):
-    return ''.join(chr(decrypt_char(c, s, N)) for c in encrypted)
-
-# Чтение и запись в файл
-def encrypt_fileFS(input_file, output_file, s, N):
-    with open(input_file, 'r', encoding='utf-8') as f:
-        text = f.read()
-    encrypted = encrypt_text(text, s, N)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(' '.join(map(str, encrypted)))
-
-def decrypt_fileFS(input_file, output_file, s, N):
-    with open(input_file, 'r', encoding='utf-8') as f:
-        encrypted = list(map(int, f.read().split()))
-    decrypted = decrypt_text(encrypted, s, N)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(decrypted)
+def decrypt_text(encrypted, s, N=None):
+    ctx = resolve(s, make_context, N)
+    return vectorized.decrypt_text(encrypted, ctx)
+
+# Шифрование байтов через таблицу ключа (bytes/bytearray/memoryview)
+def encrypt_bytes(data, s, N=None):
+    ctx = resolve(s, make_context, N)
+    encrypted = ctx.byte_table.encrypt(data)
+    return encrypted if isinstance(encrypted, list) else encrypted.tolist()
+
+# Расшифрование байтов через обратную таблицу ключа
+def decrypt_bytes(encrypted, s, N=None):
+    ctx = resolve(s, make_context, N)
+    return ctx.byte_table.decrypt(encrypted)
+
+# Чтение и запись в файл (потоково, окнами по chunk_size символов).
+# binary=True - компактный бинарный контейнер вместо десятичного текста;
+# при расшифровании формат определяется автоматически.
+# mode=streaming.MODE_BYTES - файл шифруется как произвольные байты (бинарно-безопасно).
+def encrypt_fileFS(input_file, output_file, s, N=None, chunk_size=streaming.CHUNK_SIZE, binary=False,
+                   mode=streaming.MODE_TEXT):
+    ctx = resolve(s, make_context, N)
+    streaming.encrypt_file(input_file, output_file, ctx, chunk_size, binary, "FS", mode)
+
+def decrypt_fileFS(input_file, output_file, s, N=None, chunk_size=streaming.CHUNK_SIZE,
+                   mode=streaming.MODE_TEXT):
+    ctx = resolve(s, make_context, N)
+    streaming.decrypt_file(input_file, output_file, ctx, chunk_size, "FS", mode)
 
 # # ==== ТЕСТ ====
 # (pub_keys, secret) = generate_keys()
@@ -1,54 +1,77 @@
-import random
-from sympy import isprime, mod_inverse
+import crypto.primes as primes
+import crypto.streaming as streaming
+import crypto.vectorized as vectorized
+from crypto.arith import mod_inverse
+from crypto.key_context import KeyContext, resolve
 
 # Генерация простых чисел
 def generate_prime(start=100, end=500):
-    while True:
-        num = random.randint(start, end)
-        if isprime(num):
-            return num
+    return primes.random_prime(start, end)
 
 # Генерация ключей
 def generate_keys():
     p = generate_prime()
     q = generate_prime()
     N = p * q
-    s = random.randint(2, N - 1)  # Секретный ключ
-    while not isprime(s):  # s должно быть взаимно простым с N
-        s = random.randint(2, N - 1)
+    s = primes.random_prime(2, N - 1)  # Секретный ключ
+    while N % s == 0:  # s должно быть взаимно простым с N
+        s = primes.random_prime(2, N - 1)
     v = mod_inverse(pow(s, 2, N), N)  # Открытый ключ = s^(-2) mod N
     return (N, v), s
 
+# Контекст ключа отправителя: множитель s^2 mod N и обратный к нему (v)
+def make_context(s, N):
+    multiplier = pow(s, 2, N)
+    return KeyContext(N, multiplier, mod_inverse(multiplier, N))
+
+# Контекст ключа получателя по открытому ключу v = s^(-2) mod N
+def public_context(v, N):
+    return KeyContext(N, mod_inverse(v, N), v)
+
 # Шифрование символа
-def encrypt_char(m, s, N):
-    return (m * pow(s, 2, N)) % N
+def encrypt_char(m, s, N=None):
+    ctx = resolve(s, make_context, N)
+    return (m * ctx.multiplier) % ctx.modulus
 
 # Расшифрование символа
-def decrypt_char(c, v, N):
-    return (c * v) % N
-
-# Шифрование текста
-def encrypt_text(text, s, N):
-    return [encrypt_char(ord(c), s, N) for c in text]
-
-# Расшифрование текста
-def decrypt_text(encrypted, v, N):
-    return ''.join(chr(decrypt_char(c, v, N)) for c in encrypted)
-
-# Чтение и запись в файл
-def encrypt_fileGQ(input_file, output_file, s, N):
-    with open(input_file, 'r', encoding='utf-8') as f:
-        text = f.read()
-    encrypted = encrypt_text(text, s, N)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(' '.join(map(str, encrypted)))
-
-def decrypt_fileGQ(input_file, output_file, v, N):
-    with open(input_file, 'r', encoding='utf-8') as f:
-        encrypted = list(map(int, f.read().split()))
-    decrypted = decrypt_text(encrypted, v, N)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(decrypted)
+def decrypt_char(c, v, N=None):
+    ctx = resolve(v, public_context, N)
+    return (c * ctx.inverse) % ctx.modulus
+
+# Шифрование текста (s - секретный ключ или готовый контекст ключа)
+def encrypt_text(text, s, N=None):
+    ctx = resolve(s, make_context, N)
+    return vectorized.encrypt_text(text, ctx)
+
+# Расшифрование текста (v - открытый ключ или готовый контекст ключа)
+def decrypt_text(encrypted, v, N=None):
+    ctx = resolve(v, public_context, N)
+    return vectorized.decrypt_text(encrypted, ctx)
+
+# Шифрование байтов через таблицу ключа (bytes/bytearray/memoryview)
+def encrypt_bytes(data, s, N=None):
+    ctx = resolve(s, make_context, N)
+    encrypted = ctx.byte_table.encrypt(data)
+    return encrypted if isinstance(encrypted, list) else encrypted.tolist()
+
+# Расшифрование байтов через обратную таблицу ключа
+def decrypt_bytes(encrypted, v, N=None):
+    ctx = resolve(v, public_context, N)
+    return ctx.byte_table.decrypt(encrypted)
+
+# Чтение и запись в файл (потоково, окнами по chunk_size символов).
+# binary=True - компактный бинарный контейнер вместо десятичного текста;
+# при расшифровании формат определяется автоматически.
+# mode=streaming.MODE_BYTES - файл шифруется как произвольные байты (бинарно-безопасно).
+def encrypt_fileGQ(input_file, output_file, s, N=None, chunk_size=streaming.CHUNK_SIZE, binary=False,
+                   mode=streaming.MODE_TEXT):
+    ctx = resolve(s, make_context, N)
+    streaming.encrypt_file(input_file, output_file, ctx, chunk_size, binary, "GQ", mode)
+
+def decrypt_fileGQ(input_file, output_file, v, N=None, chunk_size=streaming.CHUNK_SIZE,
+                   mode=streaming.MODE_TEXT):
+    ctx = resolve(v, public_context, N)
+    streaming.decrypt_file(input_file, output_file, ctx, chunk_size, "GQ", mode)
 
 #  ==== ТЕСТ ====
 # (pub_keys, secret) = generate_keys()
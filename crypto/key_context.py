@@ -0,0 +1,35 @@
+from crypto.arith import mod_inverse
+from crypto.byte_table import ByteTable
+
+# Контекст ключа для посимвольного шифра.
+# Хранит модуль, прямой множитель (c = m * multiplier mod modulus)
+# и обратный к нему (m = c * inverse mod modulus). Строится один раз на ключ,
+# чтобы не считать pow/mod_inverse для каждого символа.
+# Таблицы для байтового режима строятся лениво при первом обращении.
+class KeyContext:
+    __slots__ = ("modulus", "multiplier", "inverse", "_byte_table")
+
+    def __init__(self, modulus, multiplier, inverse=None):
+        self.modulus = modulus
+        self.multiplier = multiplier % modulus
+        if inverse is None:
+            inverse = mod_inverse(self.multiplier, modulus)
+        self.inverse = inverse % modulus
+        self._byte_table = None
+
+    # Прямая и обратная таблицы шифра для байтового алфавита
+    @property
+    def byte_table(self):
+        if self._byte_table is None:
+            self._byte_table = ByteTable(self)
+        return self._byte_table
+
+    def __repr__(self):
+        return (f"KeyContext(modulus={self.modulus}, multiplier={self.multiplier}, "
+                f"inverse={self.inverse})")
+
+# Возвращает готовый контекст или строит его из параметров ключа
+def resolve(key, factory, *params):
+    if isinstance(key, KeyContext):
+        return key
+    return factory(key, *params)
@@ -0,0 +1,71 @@
+import threading
+from collections import deque
+
+import crypto.fiat_shamir as fiat_shamir
+import crypto.shnorr_encryption as shnorr_encryption
+import crypto.guillou_quisquater as guillou_quisquater
+
+# Генераторы ключей по алгоритмам (обозначения как в строке ENCRYPTION:)
+DEFAULT_GENERATORS = {
+    "FS": fiat_shamir.generate_keys,
+    "SH": shnorr_encryption.generate_keys,
+    "GQ": guillou_quisquater.generate_keys,
+}
+
+# Пул заранее сгенерированных ключей.
+# Фоновый поток держит для каждого алгоритма до size готовых пар ключей и
+# доливает их, когда запас опускается до low_water. get() забирает готовый
+# ключ сразу, а если пул пуст - генерирует ключ синхронно, как раньше.
+class KeyPool:
+    def __init__(self, generators=None, size=4, low_water=1):
+        if not 0 <= low_water < size:
+            raise ValueError("Нужно 0 <= low_water < size")
+        self.generators = dict(DEFAULT_GENERATORS if generators is None else generators)
+        self.size = size
+        self.low_water = low_water
+        self._keys = {algorithm: deque() for algorithm in self.generators}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    # Запуск фонового заполнения (сразу доливает пул до size)
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._fill_loop, daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+        return self
+
+    # Остановка фонового потока
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    # Сколько готовых ключей лежит в пуле для алгоритма
+    def available(self, algorithm):
+        with self._lock:
+            return len(self._keys[algorithm])
+
+    # Готовый ключ ((публичные ключи), приватный ключ) для алгоритма
+    def get(self, algorithm):
+        generate = self.generators[algorithm]
+        with self._lock:
+            keys = self._keys[algorithm]
+            key = keys.popleft() if keys else None
+            if len(keys) <= self.low_water:
+                self._wakeup.set()
+        return key if key is not None else generate()
+
+    def _fill_loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait()
+            self._wakeup.clear()
+            for algorithm, generate in self.generators.items():
+                while not self._stopped.is_set() and self.available(algorithm) < self.size:
+                    key = generate()
+                    with self._lock:
+                        self._keys[algorithm].append(key)
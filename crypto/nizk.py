@@ -0,0 +1,138 @@
+import hashlib
+import json
+import secrets
+import threading
+import time
+from collections import deque
+
+import crypto.zk_protocols as zk
+
+# Неинтерактивный режим аутентификации (преобразование Фиата-Шамира).
+# Вызовы не присылает сервер, а обе стороны вычисляют их как хэш от
+# обязательств k раундов, открытого ключа, одноразового nonce, времени и контекста.
+# Клиент отправляет готовое доказательство одним сообщением, сервер сразу
+# проверяет его - вместо двух RTT рукопожатия остается один.
+
+# Префикс сообщения с неинтерактивным доказательством
+PROOF_PREFIX = "PROOF:"
+
+# Контекст по умолчанию: доказательство нельзя перенести в другое приложение
+DEFAULT_CONTEXT = "mskzi-zeroknowledge/auth"
+
+# Допустимое расхождение часов клиента и сервера, секунды
+MAX_CLOCK_SKEW = 300
+
+# Длина nonce в байтах и максимальная длина nonce в сообщении (символов)
+NONCE_BYTES = 16
+MAX_NONCE_LENGTH = 64
+
+# Стойкость доказательства в битах. Вызовы из хэша можно перебирать офлайн,
+# поэтому порог выше, чем у интерактивных параллельных раундов
+PROOF_SOUNDNESS_BITS = 128
+
+# Сколько байт хэша уходит на один вызов (смещение остатка по модулю ничтожно)
+CHALLENGE_BYTES = 8
+
+# Вызовы e из хэша SHAKE-256 по k раундам в диапазоне протокола. Хэш
+# берется от всех обязательств сразу, поэтому подобрать nonce или время под
+# удобный вызов можно, только угадав все k вызовов одновременно
+def derive_challenges(protocol, public, commitments, nonce, timestamp, context=DEFAULT_CONTEXT):
+    low, high = zk.CHALLENGE_RANGES[protocol]
+    data = f"{context}|{protocol}|{public}|{','.join(map(str, commitments))}|{nonce}|{timestamp}".encode()
+    digest = hashlib.shake_256(data).digest(CHALLENGE_BYTES * len(commitments))
+    return [low + int.from_bytes(digest[i:i + CHALLENGE_BYTES], "big") % (high - low + 1)
+            for i in range(0, len(digest), CHALLENGE_BYTES)]
+
+# Неинтерактивное доказательство знания секрета (сторона клиента):
+# k параллельных раундов с вызовами из хэша
+def prove(protocol, secret, context=DEFAULT_CONTEXT, nonce=None, timestamp=None,
+          soundness_bits=PROOF_SOUNDNESS_BITS):
+    nonce = nonce or secrets.token_hex(NONCE_BYTES)
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    rounds = zk.rounds_for_soundness(protocol, soundness_bits)
+    public, randomness, commitments = zk.commit(protocol, secret, rounds)
+    challenge_vector = derive_challenges(protocol, public, commitments, nonce, timestamp, context)
+    return {"protocol": protocol, "public": public, "commitments": commitments,
+            "responses": zk.respond(protocol, secret, randomness, challenge_vector),
+            "nonce": nonce, "timestamp": timestamp}
+
+# Проверка доказательства (сторона сервера), без проверки повтора.
+# Доказательство с числом раундов меньше нужного для soundness_bits отклоняется
+def verify(proof, context=DEFAULT_CONTEXT, soundness_bits=PROOF_SOUNDNESS_BITS):
+    protocol, public, commitments = proof["protocol"], proof["public"], proof["commitments"]
+    if len(commitments) < zk.rounds_for_soundness(protocol, soundness_bits):
+        return False
+    # Открытый ключ клиента Фиат-Шамир известен серверу заранее
+    if protocol == 1 and public != zk.FS_V:
+        return False
+    challenge_vector = derive_challenges(protocol, public, commitments, proof["nonce"], proof["timestamp"], context)
+    return zk.verify_rounds(protocol, public, commitments, challenge_vector, proof["responses"])
+
+# Сообщение - неинтерактивное доказательство PROOF:
+def is_proof(message):
+    return message.startswith(PROOF_PREFIX)
+
+# Сборка сообщения PROOF:{...}
+def format_proof(proof):
+    return (PROOF_PREFIX + json.dumps(proof)).encode()
+
+# Разбор сообщения PROOF:{...}; при ошибке - ValueError
+def parse_proof(message):
+    if not is_proof(message):
+        raise ValueError("Ожидалось сообщение PROOF:")
+    try:
+        proof = json.loads(message[len(PROOF_PREFIX):])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Некорректное доказательство: {e}") from None
+    if not isinstance(proof, dict):
+        raise ValueError("Доказательство должно быть JSON-объектом")
+    for field in ("protocol", "public", "timestamp"):
+        if not isinstance(proof.get(field), int) or isinstance(proof.get(field), bool):
+            raise ValueError(f"Некорректное поле доказательства: {field}")
+    zk.parse_protocol(proof["protocol"])
+    commitments, responses = proof.get("commitments"), proof.get("responses")
+    for values in (commitments, responses):
+        if (not isinstance(values, list) or not 0 < len(values) <= zk.MAX_ROUNDS
+                or any(not isinstance(v, int) or isinstance(v, bool) for v in values)):
+            raise ValueError("Некорректные раунды доказательства")
+    if len(commitments) != len(responses):
+        raise ValueError("Число обязательств и ответов доказательства не совпадает")
+    nonce = proof.get("nonce")
+    if not isinstance(nonce, str) or not 0 < len(nonce) <= MAX_NONCE_LENGTH:
+        raise ValueError("Некорректный nonce")
+    return proof
+
+# Кэш использованных nonce для защиты от повторной отправки доказательства.
+# Доказательство принимается, только если его время отличается от часов
+# сервера не больше чем на max_skew, а nonce не встречался; запись хранится
+# 2 * max_skew - дольше повтор все равно отсекается по времени.
+class ReplayCache:
+    def __init__(self, max_skew=MAX_CLOCK_SKEW):
+        self.max_skew = max_skew
+        self._seen = set()
+        self._expiry = deque()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._seen)
+
+    # Регистрация nonce; False - доказательство устарело или уже использовалось
+    def register(self, nonce, timestamp, now=None):
+        now = time.time() if now is None else now
+        if abs(now - timestamp) > self.max_skew:
+            return False
+        with self._lock:
+            while self._expiry and self._expiry[0][0] < now:
+                self._seen.discard(self._expiry.popleft()[1])
+            if nonce in self._seen:
+                return False
+            self._seen.add(nonce)
+            self._expiry.append((now + 2 * self.max_skew, nonce))
+        return True
+
+# Полная проверка на сервере: свежесть, повтор и само доказательство
+def check_proof(proof, replay_cache, context=DEFAULT_CONTEXT, soundness_bits=PROOF_SOUNDNESS_BITS):
+    if not verify(proof, context, soundness_bits):
+        return False
+    return replay_cache.register(proof["nonce"], proof["timestamp"])
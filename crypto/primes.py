@@ -0,0 +1,132 @@
+import bisect
+import math
+import random
+import threading
+from itertools import compress
+
+# До этой границы простые берутся из решета, выше - из Миллера-Рабина
+SIEVE_LIMIT = 1 << 22
+
+# Минимальный размер решета (чтобы не перестраивать его на каждом маленьком запросе)
+_SIEVE_MIN = 1 << 16
+
+# Окно кандидатов в большом диапазоне: столько подряд идущих нечётных чисел
+# просеиваются малыми простыми за один проход
+CANDIDATE_BATCH = 64
+
+# Основания Миллера-Рабина, дающие точный ответ для n < 3.3 * 10^24
+_MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+_MR_DETERMINISTIC_LIMIT = 3317044064679887385961981
+
+# Случайные раунды (после основания 2) для чисел выше детерминированной границы
+MR_RANDOM_ROUNDS = 7
+
+_sieve_lock = threading.Lock()
+_sieve_primes = []
+_sieve_bound = 0
+
+# Решето Эратосфена до bound включительно
+def _sieve(bound):
+    flags = bytearray([1]) * (bound + 1)
+    flags[0:2] = b"\x00\x00"
+    for i in range(2, math.isqrt(bound) + 1):
+        if flags[i]:
+            flags[i * i::i] = bytes(len(range(i * i, bound + 1, i)))
+    return list(compress(range(bound + 1), flags))
+
+# Отсортированный список простых, покрывающий [2, limit].
+# Решето строится лениво, кэшируется и растёт геометрически.
+def primes_up_to(limit):
+    global _sieve_primes, _sieve_bound
+    if limit > SIEVE_LIMIT:
+        raise ValueError(f"Граница {limit} больше SIEVE_LIMIT={SIEVE_LIMIT}")
+    with _sieve_lock:
+        if limit > _sieve_bound:
+            bound = min(max(limit, 2 * _sieve_bound, _SIEVE_MIN), SIEVE_LIMIT)
+            _sieve_primes = _sieve(bound)
+            _sieve_bound = bound
+        return _sieve_primes
+
+# Малые простые для пробного деления
+SMALL_PRIMES = tuple(_sieve(1000))
+
+# Разложение n - 1 = d * 2^r для Миллера-Рабина
+def _decompose(n):
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        r += 1
+    return d, r
+
+# Один раунд Миллера-Рабина по основанию a (n - 1 = d * 2^r)
+def _mr_round(n, a, d, r):
+    x = pow(a, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(r - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
+
+# Проверка простоты: пробное деление + Миллер-Рабин
+# (детерминированный ниже 3.3 * 10^24, вероятностный выше)
+def is_prime(n):
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    return _miller_rabin(n)
+
+# Миллер-Рабин для нечётного n без малых делителей
+def _miller_rabin(n):
+    d, r = _decompose(n)
+    if n < _MR_DETERMINISTIC_LIMIT:
+        bases = _MR_BASES
+    else:
+        bases = (2, *(random.randrange(3, n - 1) for _ in range(MR_RANDOM_ROUNDS)))
+    return all(_mr_round(n, a, d, r) for a in bases)
+
+# Просеивание окна нечётных чисел base, base + 2, ..., base + 2 * (count - 1):
+# для каждого малого простого p одним делением находится первое кратное
+# в окне, дальше кратные вычеркиваются срезом. Возвращает выжившие числа.
+def _sieve_window(base, count):
+    alive = bytearray([1]) * count
+    for p in SMALL_PRIMES[1:]:
+        # base + 2i = 0 (mod p)  =>  i = -base * 2^(-1) (mod p)
+        first = (-base % p) * ((p + 1) // 2) % p
+        alive[first::p] = bytes(len(range(first, count, p)))
+    return [base + 2 * i for i in compress(range(count), alive)]
+
+# Случайное простое из [start, end]
+def random_prime(start, end):
+    start = max(start, 2)
+    if start > end:
+        raise ValueError(f"Пустой диапазон [{start}, {end}]")
+
+    if end <= SIEVE_LIMIT:
+        primes = primes_up_to(end)
+        lo = bisect.bisect_left(primes, start)
+        hi = bisect.bisect_right(primes, end)
+        if lo == hi:
+            raise ValueError(f"В диапазоне [{start}, {end}] нет простых чисел")
+        return primes[random.randrange(lo, hi)]
+
+    # Большой диапазон: окно нечётных кандидатов со случайного места просеивается
+    # малыми простыми целиком, затем выжившие в случайном порядке проверяются
+    # Миллером-Рабином по одному - до первого простого
+    while True:
+        base = max(random.randint(start, end) | 1, SMALL_PRIMES[-1] + 2)
+        count = min(CANDIDATE_BATCH, (end - base) // 2 + 1)
+        if count <= 0:
+            continue
+        survivors = _sieve_window(base, count)
+        random.shuffle(survivors)
+        for candidate in survivors:
+            if _miller_rabin(candidate):
+                return candidate
+
+# Случайное простое заданной битовой длины
+def random_prime_bits(bits):
+    return random_prime(1 << (bits - 1), (1 << bits) - 1)
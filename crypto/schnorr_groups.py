@@ -0,0 +1,78 @@
+import bisect
+import json
+import os
+import random
+import threading
+
+import crypto.primes as primes
+from crypto.arith import primitive_root
+
+# Кэш параметров группы Шнорра: пары (p, g), где g - первообразный корень по модулю p.
+# Таблица предвычислена и лежит рядом с модулем, загружается лениво при первой
+# генерации ключей и может перестраиваться в фоне.
+GROUPS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schnorr_groups.json")
+
+# Диапазон простых p по умолчанию (совпадает с shnorr_encryption.generate_prime)
+DEFAULT_RANGE = (1000, 5000)
+
+_lock = threading.Lock()
+_groups = None
+
+# Построение таблицы групп для всех простых p из [start, end]
+def build_groups(start=DEFAULT_RANGE[0], end=DEFAULT_RANGE[1]):
+    all_primes = primes.primes_up_to(end)
+    selected = all_primes[bisect.bisect_left(all_primes, start):bisect.bisect_right(all_primes, end)]
+    return [(p, primitive_root(p)) for p in selected]
+
+# Атомарная запись таблицы на диск (через временный файл)
+def save_groups(groups, start, end, path=GROUPS_FILE):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({"range": [start, end], "groups": groups}, f, separators=(",", ":"))
+    os.replace(temp_path, path)
+
+# Чтение таблицы с диска; None, если файла нет, он повреждён или для другого диапазона
+def load_groups(path=GROUPS_FILE, start=DEFAULT_RANGE[0], end=DEFAULT_RANGE[1]):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data["range"] != [start, end]:
+            return None
+        groups = [(int(p), int(g)) for p, g in data["groups"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return groups or None
+
+# Текущая таблица групп: загружается лениво, при отсутствии строится и сохраняется
+def get_groups():
+    global _groups
+    if _groups is None:
+        with _lock:
+            if _groups is None:
+                groups = load_groups()
+                if groups is None:
+                    groups = build_groups()
+                    try:
+                        save_groups(groups, *DEFAULT_RANGE)
+                    except OSError:
+                        pass  # Каталог только для чтения: работаем с таблицей в памяти
+                _groups = groups
+    return _groups
+
+# Случайная группа (p, g) из кэша
+def choose_group():
+    return random.choice(get_groups())
+
+# Фоновое перестроение таблицы: новая таблица подменяет старую после записи на диск
+def refresh_async(start=DEFAULT_RANGE[0], end=DEFAULT_RANGE[1], path=GROUPS_FILE):
+    def refresh():
+        global _groups
+        groups = build_groups(start, end)
+        save_groups(groups, start, end, path)
+        if (start, end) == DEFAULT_RANGE and path == GROUPS_FILE:
+            with _lock:
+                _groups = groups
+
+    thread = threading.Thread(target=refresh, daemon=True)
+    thread.start()
+    return thread
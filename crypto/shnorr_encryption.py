@@ -1,52 +1,72 @@
 import random
-from sympy import isprime, primitive_root, mod_inverse
+
+import crypto.primes as primes
+import crypto.schnorr_groups as schnorr_groups
+import crypto.streaming as streaming
+import crypto.vectorized as vectorized
+from crypto.arith import mod_inverse
+from crypto.key_context import KeyContext, resolve
 
 # Генерация простого числа p
 def generate_prime(start=1000, end=5000):
-    while True:
-        num = random.randint(start, end)
-        if isprime(num):
-            return num
+    return primes.random_prime(start, end)
 
 # Генерация ключей
 def generate_keys():
-    p = generate_prime()
-    g = primitive_root(p)  # Выбираем первообразный корень
+    p, g = schnorr_groups.choose_group()  # Простое p и первообразный корень g из кэша групп
     x = random.randint(2, p - 2)  # Приватный ключ
     y = pow(g, x, p)  # Публичный ключ
     return (p, g, y), x
 
+# Контекст ключа: множитель g^x mod p и обратный к нему (g^x)^-1 mod p
+def make_context(x, g, p):
+    multiplier = pow(g, x, p)
+    return KeyContext(p, multiplier, mod_inverse(multiplier, p))
+
 # Шифрование символа
-def encrypt_char(m, x, g, p):
-    return (m * pow(g, x, p)) % p
+def encrypt_char(m, x, g=None, p=None):
+    ctx = resolve(x, make_context, g, p)
+    return (m * ctx.multiplier) % ctx.modulus
 
 # Расшифрование символа
-def decrypt_char(c, x, g, p):
-    g_x_inv = mod_inverse(pow(g, x, p), p)  # Обратное число (g^x)^-1 mod p
-    return (c * g_x_inv) % p
+def decrypt_char(c, x, g=None, p=None):
+    ctx = resolve(x, make_context, g, p)
+    return (c * ctx.inverse) % ctx.modulus
 
-# Шифрование текста
-def encrypt_text(text, x, g, p):
-    return [encrypt_char(ord(c), x, g, p) for c in text]
+# Шифрование текста (x - секретный ключ или готовый контекст ключа)
+def encrypt_text(text, x, g=None, p=None):
+    ctx = resolve(x, make_context, g, p)
+    return vectorized.encrypt_text(text, ctx)
 
 # Расшифрование текста
-def decrypt_text(encrypted, x, g, p):
-    return ''.join(chr(decrypt_char(c, x, g, p)) for c in encrypted)
-
-# Чтение и запись в файл
-def encrypt_fileSH(input_file, output_file, x, g, p):
-    with open(input_file, 'r', encoding='utf-8') as f:
-        text = f.read()
-    encrypted = encrypt_text(text, x, g, p)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(' '.join(map(str, encrypted)))
-
-def decrypt_fileSH(input_file, output_file, x, g, p):
-    with open(input_file, 'r', encoding='utf-8') as f:
-        encrypted = list(map(int, f.read().split()))
-    decrypted = decrypt_text(encrypted, x, g, p)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(decrypted)
+def decrypt_text(encrypted, x, g=None, p=None):
+    ctx = resolve(x, make_context, g, p)
+    return vectorized.decrypt_text(encrypted, ctx)
+
+# Шифрование байтов через таблицу ключа (bytes/bytearray/memoryview)
+def encrypt_bytes(data, x, g=None, p=None):
+    ctx = resolve(x, make_context, g, p)
+    encrypted = ctx.byte_table.encrypt(data)
+    return encrypted if isinstance(encrypted, list) else encrypted.tolist()
+
+# Расшифрование байтов через обратную таблицу ключа
+def decrypt_bytes(encrypted, x, g=None, p=None):
+    ctx = resolve(x, make_context, g, p)
+    return ctx.byte_table.decrypt(encrypted)
+
+# Чтение и запись в файл (потоково, окнами по chunk_size символов).
+# binary=True - компактный бинарный контейнер вместо десятичного текста;
+# при расшифровании формат определяется автоматически.
+# mode=streaming.MODE_BYTES - файл шифруется как произвольные байты (бинарно-безопасно).
+def encrypt_fileSH(input_file, output_file, x, g=None, p=None, chunk_size=streaming.CHUNK_SIZE, binary=False,
+                   mode=streaming.MODE_TEXT):
+    ctx = resolve(x, make_context, g, p)
+    streaming.encrypt_file(input_file, output_file, ctx, chunk_size, binary, "SH", mode)
+
+def decrypt_fileSH(input_file, output_file, x, g=None, p=None, chunk_size=streaming.CHUNK_SIZE,
+                   mode=streaming.MODE_TEXT):
+    ctx = resolve(x, make_context, g, p)
+    streaming.decrypt_file(input_file, output_file, ctx, chunk_size, "SH", mode)
 
 # # ==== ТЕСТ ====
 # (pub_keys, secret) = generate_keys()
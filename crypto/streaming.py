@@ -0,0 +1,289 @@
+import os
+import queue
+import threading
+from collections import Counter
+from itertools import chain
+
+import crypto.binary_format as binary_format
+import crypto.compression as compression
+import crypto.vectorized as vectorized
+
+# Размер окна чтения (символов текста, байт открытого текста или шифротекста)
+CHUNK_SIZE = 64 * 1024
+
+# Сколько кусков шифротекста держать готовыми впереди отправки
+PREFETCH_DEPTH = 4
+
+# Режимы открытого текста: Unicode-текст (коды символов) или произвольные байты
+MODE_TEXT = "text"
+MODE_BYTES = "bytes"
+MODES = (MODE_TEXT, MODE_BYTES)
+
+# Чтение файла окнами фиксированного размера
+def read_chunks(f, chunk_size=CHUNK_SIZE):
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+# Функция шифрования одного окна: str -> слова (текст) или bytes -> слова (таблица)
+def _chunk_encryptor(ctx, mode):
+    if mode == MODE_BYTES:
+        return ctx.byte_table.encrypt
+    if mode != MODE_TEXT:
+        raise ValueError(f"Неизвестный режим шифрования: {mode}")
+    return lambda chunk: vectorized.encrypt_words(chunk, ctx)
+
+# Функция расшифрования одного окна: слова -> str (текст) или bytes (таблица)
+def _chunk_decryptor(ctx, mode):
+    if mode == MODE_BYTES:
+        return ctx.byte_table.decrypt
+    if mode != MODE_TEXT:
+        raise ValueError(f"Неизвестный режим шифрования: {mode}")
+    return lambda words: vectorized.decrypt_text(words, ctx)
+
+# Шифрование потока кусков открытого текста.
+# Выдаёт куски шифротекста в прежнем формате "c1 c2 c3 ...", так что
+# их конкатенация совпадает с результатом шифрования всего текста сразу.
+def encrypt_chunks(chunks, ctx, mode=MODE_TEXT):
+    encrypt = _chunk_encryptor(ctx, mode)
+    separator = ''
+    for chunk in chunks:
+        encrypted = encrypt(chunk)
+        if not len(encrypted):
+            continue
+        if not isinstance(encrypted, list):
+            encrypted = encrypted.tolist()
+        yield separator + ' '.join(map(str, encrypted))
+        separator = ' '
+
+# Шифрование потока кусков открытого текста в слова бинарного контейнера (без заголовка)
+def encrypt_chunks_binary(chunks, ctx, width, mode=MODE_TEXT):
+    encrypt = _chunk_encryptor(ctx, mode)
+    for chunk in chunks:
+        yield binary_format.encode_words(encrypt(chunk), width)
+
+# Пошаговое расшифрование шифротекста, который приходит порциями (например, из сокета).
+# feed() принимает очередную порцию байтов и возвращает готовую часть открытого
+# текста, finish() - остаток в конце потока. Формат определяется по сигнатуре:
+# бинарный контейнер или десятичный текст. Неполное слово (или число, разрезанное
+# границей порции) переносится в следующую порцию. Это состояние выдает state(),
+# а конструктор принимает его обратно - расшифровку можно продолжить после обрыва.
+# В режиме MODE_TEXT части открытого текста - str (при as_bytes=True - в UTF-8),
+# в режиме MODE_BYTES - bytes.
+class StreamDecryptor:
+    def __init__(self, ctx, algorithm=None, mode=MODE_TEXT, state=None, as_bytes=False):
+        self._decrypt = _chunk_decryptor(ctx, mode)
+        self.algorithm = algorithm
+        self.mode = mode
+        self._encode = as_bytes and mode == MODE_TEXT
+        state = state or {}
+        # Начало потока, пока не пришел заголовок; ширина слова (None - формат
+        # еще не определен, 0 - десятичный текст); неполное слово на границе
+        self._head = bytes.fromhex(state.get("head", ""))
+        self._width = state.get("width")
+        self._tail = bytes.fromhex(state.get("tail", ""))
+
+    def state(self):
+        return {"head": self._head.hex(), "width": self._width, "tail": self._tail.hex()}
+
+    def _empty(self):
+        return b'' if self.mode == MODE_BYTES else ''
+
+    def _output(self, piece):
+        return piece.encode('utf-8') if self._encode else piece
+
+    # Определение формата по накопленному началу потока, возвращает остаток после заголовка
+    def _detect(self):
+        head, self._head = self._head, b''
+        if binary_format.is_binary(head):
+            header_algorithm, self._width = binary_format.unpack_header(head)
+            if self.algorithm and header_algorithm != self.algorithm:
+                raise ValueError(f"Шифротекст создан алгоритмом {header_algorithm}, ожидался {self.algorithm}")
+            return head[binary_format.HEADER.size:]
+        self._width = 0
+        return head
+
+    def _process(self, data):
+        data = self._tail + data if self._tail else data
+        if self._width:
+            usable = len(data) - len(data) % self._width
+            self._tail = bytes(data[usable:])
+            if not usable:
+                return self._empty()
+            return self._decrypt(binary_format.decode_words(data[:usable], self._width))
+        text = bytes(data).decode('ascii')
+        tokens = text.split()
+        self._tail = tokens.pop().encode('ascii') if tokens and not text[-1].isspace() else b''
+        if not tokens:
+            return self._empty()
+        return self._decrypt(list(map(int, tokens)))
+
+    def feed(self, data):
+        if self._width is None:
+            self._head += data
+            if len(self._head) < binary_format.HEADER.size:
+                return self._output(self._empty())
+            data = self._detect()
+        return self._output(self._process(data))
+
+    def finish(self):
+        piece = self._process(self._detect()) if self._width is None else self._empty()
+        tail, self._tail = self._tail, b''
+        if not tail:
+            return self._output(piece)
+        if self._width:
+            raise ValueError("Бинарный шифротекст обрезан посередине слова")
+        return self._output(piece + self._decrypt([int(tail)]))
+
+# Расшифрование потока байтов шифротекста любого формата
+def decrypt_stream(chunks, ctx, algorithm=None, mode=MODE_TEXT):
+    decryptor = StreamDecryptor(ctx, algorithm, mode)
+    for chunk in chunks:
+        piece = decryptor.feed(chunk)
+        if len(piece):
+            yield piece
+    piece = decryptor.finish()
+    if len(piece):
+        yield piece
+
+# Открытие файла открытого текста в нужном режиме (байты читаются без декодирования)
+def _open_plain(path, file_mode, mode):
+    if mode == MODE_BYTES:
+        return open(path, file_mode + 'b')
+    return open(path, file_mode, encoding='utf-8')
+
+# Куски открытого текста файла; при compress - сжатые указанным методом (только байты)
+def _plain_chunks(src, mode, compress, chunk_size):
+    chunks = read_chunks(src, chunk_size)
+    if not compress:
+        return chunks
+    if mode != MODE_BYTES:
+        raise ValueError("Сжатый открытый текст шифруется только в режиме bytes")
+    return compression.compress_chunks(chunks, compress)
+
+# Потоковое шифрование файла в куски шифротекста (bytes) начиная с байта offset
+# шифротекста. Шифрование детерминировано, поэтому продолжить поток после обрыва
+# можно без сохраненного шифротекста: начало пропускается, а в бинарном формате
+# байтового режима файл открытого текста сразу перематывается к нужному слову.
+# При binary=True выдается бинарный контейнер (нужен algorithm для заголовка).
+# compress - метод сжатия открытого текста перед шифрованием (см. crypto.compression).
+def encrypt_stream(input_file, ctx, binary=False, algorithm=None, mode=MODE_TEXT, offset=0,
+                   chunk_size=CHUNK_SIZE, compress=None):
+    with _open_plain(input_file, 'r', mode) as src:
+        if not binary:
+            chunks = _plain_chunks(src, mode, compress, chunk_size)
+            pieces = (piece.encode('ascii') for piece in encrypt_chunks(chunks, ctx, mode))
+        else:
+            width = binary_format.word_width(ctx.modulus)
+            header = binary_format.pack_header(algorithm, width)
+            # Сжатый поток так не перемотать - его начало пропускается целиком
+            if mode == MODE_BYTES and not compress and offset >= len(header):
+                words = (offset - len(header)) // width
+                src.seek(words)
+                offset -= len(header) + words * width
+                header = b''
+            chunks = _plain_chunks(src, mode, compress, chunk_size)
+            pieces = chain([header], encrypt_chunks_binary(chunks, ctx, width, mode))
+        for piece in pieces:
+            if offset >= len(piece):
+                offset -= len(piece)
+                continue
+            yield piece[offset:] if offset else piece
+            offset = 0
+
+# Размер шифротекста файла без шифрования всего файла: в бинарном формате -
+# заголовок и слово фиксированной ширины на символ (байт), в десятичном -
+# длины чисел, посчитанные по одному разу для каждого различного символа.
+# Со сжатием размер известен только после сжатия файла (без шифрования).
+def encrypted_size(input_file, ctx, binary=False, mode=MODE_TEXT, chunk_size=CHUNK_SIZE, compress=None):
+    if binary and mode == MODE_BYTES and not compress:
+        return binary_format.HEADER.size + binary_format.word_width(ctx.modulus) * os.path.getsize(input_file)
+    counts = Counter()
+    with _open_plain(input_file, 'r', mode) as src:
+        for chunk in _plain_chunks(src, mode, compress, chunk_size):
+            if binary:
+                counts[None] += len(chunk)
+            else:
+                counts.update(chunk)
+    symbols = sum(counts.values())
+    if binary:
+        return binary_format.HEADER.size + binary_format.word_width(ctx.modulus) * symbols
+    if not symbols:
+        return 0
+    alphabet = list(counts)
+    words = _chunk_encryptor(ctx, mode)(bytes(alphabet) if mode == MODE_BYTES else ''.join(alphabet))
+    # Числа разделены пробелами
+    return sum(len(str(word)) * counts[symbol] for symbol, word in zip(alphabet, words)) + symbols - 1
+
+# Разбиение потока байтов на куски фиксированного размера: (смещение, кусок)
+def fixed_chunks(pieces, chunk_size):
+    buffer = bytearray()
+    offset = 0
+    for piece in pieces:
+        buffer += piece
+        while len(buffer) >= chunk_size:
+            yield offset, bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+            offset += chunk_size
+    if buffer:
+        yield offset, bytes(buffer)
+
+# Чтение вперед: элементы iterable производятся в фоновом потоке и передаются
+# через ограниченную очередь (не больше depth элементов в памяти), так что
+# шифрование следующих кусков идет одновременно с отправкой предыдущих.
+# Если потребитель остановился, производитель тоже останавливается.
+def prefetch(iterable, depth=PREFETCH_DEPTH):
+    items = queue.Queue(depth)
+    stopped = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except BaseException as e:
+            put((end, e))
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+
+    threading.Thread(target=produce, name="prefetch", daemon=True).start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is end:
+                return
+            yield item
+    finally:
+        stopped.set()
+
+# Потоковое шифрование файла: память не зависит от размера файла.
+# При binary=True пишется бинарный контейнер (нужен algorithm для заголовка).
+def encrypt_file(input_file, output_file, ctx, chunk_size=CHUNK_SIZE, binary=False,
+                 algorithm=None, mode=MODE_TEXT):
+    with open(output_file, 'wb') as dst:
+        for piece in encrypt_stream(input_file, ctx, binary, algorithm, mode, chunk_size=chunk_size):
+            dst.write(piece)
+
+# Потоковое расшифрование файла (формат шифротекста определяется автоматически)
+def decrypt_file(input_file, output_file, ctx, chunk_size=CHUNK_SIZE, algorithm=None,
+                 mode=MODE_TEXT):
+    with open(input_file, 'rb') as src, _open_plain(output_file, 'w', mode) as dst:
+        for piece in decrypt_stream(read_chunks(src, chunk_size), ctx, algorithm, mode):
+            dst.write(piece)
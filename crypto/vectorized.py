@@ -0,0 +1,76 @@
+# Модуль NumPy после первой загрузки (None, пока не загружен или не установлен)
+np = None
+_numpy_loaded = False
+
+# Ленивая загрузка NumPy: импорт занимает десятки миллисекунд, поэтому
+# откладывается до первой операции над большим буфером. NumPy необязателен:
+# без него работает чисто питоновский путь.
+def numpy():
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        try:
+            import numpy as module
+        except ImportError:
+            module = None
+        np = module
+        _numpy_loaded = True
+    return np
+
+# Тексты короче этого порога быстрее обрабатываются обычным циклом
+VECTORIZE_THRESHOLD = 256
+
+# Максимальный код символа Unicode (верхняя граница для открытого текста)
+MAX_CODE_POINT = 0x10FFFF
+
+# Произведения должны помещаться в знаковое 64-битное целое
+_INT64_LIMIT = 2 ** 63
+
+# Можно ли считать m * k mod n в int64 без переполнения для данного ключа
+def supports(ctx):
+    modulus = ctx.modulus
+    return max(MAX_CODE_POINT + 1, modulus) * modulus < _INT64_LIMIT and numpy() is not None
+
+# Выбор пути: NumPy, если он доступен, модуль подходит и данных достаточно много
+def _use_numpy(ctx, size, use_numpy):
+    if use_numpy is None:
+        return size >= VECTORIZE_THRESHOLD and supports(ctx)
+    if use_numpy and not supports(ctx):
+        raise ValueError(f"Модуль {ctx.modulus} слишком велик для 64-битной арифметики")
+    return use_numpy
+
+# Векторное шифрование: текст -> массив int64 шифротекста (требует NumPy)
+def encrypt_codes(text, ctx):
+    # Все коды символов одним буфером, умножение по модулю одним проходом
+    codes = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+    return (codes.astype(np.int64) * ctx.multiplier) % ctx.modulus
+
+# Векторное расшифрование: массив шифротекста -> текст (требует NumPy)
+def decrypt_codes(values, ctx):
+    modulus = ctx.modulus
+    # Сначала приводим по модулю, чтобы произведение гарантированно влезло в int64
+    values = np.asarray(values, dtype=np.int64) % modulus
+    codes = (values * ctx.inverse) % modulus
+    if codes.size and int(codes.max()) > MAX_CODE_POINT:
+        raise ValueError("chr() arg not in range(0x110000)")
+    return codes.astype('<u4').tobytes().decode('utf-32-le', 'surrogatepass')
+
+# Шифрование текста в слова: массив NumPy для больших текстов, иначе список
+def encrypt_words(text, ctx, use_numpy=None):
+    if _use_numpy(ctx, len(text), use_numpy):
+        return encrypt_codes(text, ctx)
+    multiplier, modulus = ctx.multiplier, ctx.modulus
+    return [(ord(c) * multiplier) % modulus for c in text]
+
+# Шифрование текста в список целых: c = ord(ch) * multiplier mod modulus
+def encrypt_text(text, ctx, use_numpy=None):
+    words = encrypt_words(text, ctx, use_numpy)
+    return words if isinstance(words, list) else words.tolist()
+
+# Расшифрование списка целых обратно в текст: ch = chr(c * inverse mod modulus)
+def decrypt_text(encrypted, ctx, use_numpy=None):
+    if _use_numpy(ctx, len(encrypted), use_numpy):
+        return decrypt_codes(encrypted, ctx)
+    if np is not None and isinstance(encrypted, np.ndarray):
+        encrypted = encrypted.tolist()  # Большие числа Python вместо int64
+    inverse, modulus = ctx.inverse, ctx.modulus
+    return ''.join(chr((c * inverse) % modulus) for c in encrypted)
@@ -0,0 +1,212 @@
+import json
+import math
+import random
+import secrets
+
+import crypto.vectorized as vectorized
+
+# Параметры протоколов аутентификации с нулевым разглашением
+# (общие для клиента и сервера) и проверки на стороне сервера.
+
+PROTOCOL_NAMES = {1: "Фиат-Шамир", 2: "Шнорр", 3: "Гиллу-Кискатер"}
+
+# Фиат-Шамир
+FS_N = 3233  # Модуль (p * q)
+FS_V = 2197  # Открытый ключ клиента
+
+# Шнорр
+SH_P = 2267  # Простое число
+SH_Q = 103   # Простой делитель p-1
+SH_G = 354   # Генератор подгруппы порядка q
+
+# Гиллу-Кискатер
+GQ_N = 3233  # Модуль (p*q)
+GQ_V = 17    # Открытая экспонента
+
+# Разбор номера протокола, присланного клиентом
+def parse_protocol(protocol_data):
+    protocol = int(protocol_data)
+    if protocol not in PROTOCOL_NAMES:
+        raise ValueError(f"Недопустимый протокол: {protocol}")
+    return protocol
+
+# Допустимые значения вызова e для протоколов (включительно)
+CHALLENGE_RANGES = {
+    1: (0, 1),         # Фиат-Шамир: e {0,1}
+    2: (1, SH_Q - 1),  # Шнорр
+    3: (1, GQ_V - 1),  # Гиллу-Кискатер
+}
+
+# Случайный вызов e для протокола
+def challenge(protocol):
+    return random.randint(*CHALLENGE_RANGES[protocol])
+
+# Фиат-Шамир: y² = X * V^e mod n
+def verify_fiat_shamir(X, e, y, n=FS_N, V=FS_V):
+    return pow(y, 2, n) == ((X % n) * pow(V, e, n)) % n
+
+# Шнорр: g^s = r * y^e mod p
+def verify_schnorr(y, r, e, s, p=SH_P, g=SH_G):
+    return pow(g, s, p) == (r * pow(y, e, p)) % p
+
+# Гиллу-Кискатер: y^v = X * J^e mod n
+def verify_guillou_quisquater(J, X, e, y, n=GQ_N, v=GQ_V):
+    return pow(y, v, n) == (X * pow(J, e, n)) % n
+
+# Параллельные раунды: клиент присылает k обязательств одним сообщением,
+# сервер отвечает вектором из k вызовов, клиент - вектором ответов.
+# Стойкость растет с k, а число RTT остается как у одного раунда.
+
+# Целевая стойкость (бит) по умолчанию и ограничение на число раундов
+DEFAULT_SOUNDNESS_BITS = 40
+MAX_ROUNDS = 256
+
+# Начиная с этого числа раундов проверка идет одним векторным проходом NumPy
+ROUNDS_VECTORIZE_THRESHOLD = 16
+
+# Префиксы сообщений параллельного режима
+ROUNDS_PREFIX = "ROUNDS:"
+CHALLENGES_PREFIX = "CHALLENGES:"
+RESPONSES_PREFIX = "RESPONSES:"
+
+# Стойкость одного раунда в битах: log2 от числа возможных вызовов
+def soundness_per_round(protocol):
+    low, high = CHALLENGE_RANGES[protocol]
+    return math.log2(high - low + 1)
+
+# Число раундов k для целевой стойкости: вероятность обмана не больше 2^-bits
+def rounds_for_soundness(protocol, bits=DEFAULT_SOUNDNESS_BITS):
+    rounds = max(1, math.ceil(bits / soundness_per_round(protocol)))
+    if rounds > MAX_ROUNDS:
+        raise ValueError(f"Для стойкости {bits} бит нужно {rounds} раундов (максимум {MAX_ROUNDS})")
+    return rounds
+
+# Вектор случайных вызовов для k раундов
+def challenges(protocol, rounds):
+    return [challenge(protocol) for _ in range(rounds)]
+
+# Обязательства клиента для k раундов: (открытый ключ, случайные значения, обязательства)
+def commit(protocol, secret, rounds=1):
+    if protocol == 1:  # Фиат-Шамир: X = r^2 mod n
+        public = pow(secret, 2, FS_N)
+        randomness = [secrets.randbelow(FS_N - 1) + 1 for _ in range(rounds)]
+        commitments = [pow(r, 2, FS_N) for r in randomness]
+    elif protocol == 2:  # Шнорр: r = g^k mod p
+        public = pow(SH_G, secret, SH_P)
+        randomness = [secrets.randbelow(SH_Q - 1) + 1 for _ in range(rounds)]
+        commitments = [pow(SH_G, k, SH_P) for k in randomness]
+    elif protocol == 3:  # Гиллу-Кискатер: X = r^v mod n
+        public = pow(secret, GQ_V, GQ_N)
+        randomness = [secrets.randbelow(GQ_N - 1) + 1 for _ in range(rounds)]
+        commitments = [pow(r, GQ_V, GQ_N) for r in randomness]
+    else:
+        raise ValueError(f"Недопустимый протокол: {protocol}")
+    return public, randomness, commitments
+
+# Ответы клиента на вектор вызовов
+def respond(protocol, secret, randomness, challenge_vector):
+    if protocol == 1:  # y = r * S^e mod n
+        return [(r * pow(secret, e, FS_N)) % FS_N for r, e in zip(randomness, challenge_vector)]
+    if protocol == 2:  # s = (k + e*x) mod q
+        return [(k + e * secret) % SH_Q for k, e in zip(randomness, challenge_vector)]
+    if protocol == 3:  # y = r * s^e mod n
+        return [(r * pow(secret, e, GQ_N)) % GQ_N for r, e in zip(randomness, challenge_vector)]
+    raise ValueError(f"Недопустимый протокол: {protocol}")
+
+# Возведение в степень по модулю для массивов (бинарный алгоритм по битам показателя)
+def _pow_vector(np, base, exponent, modulus):
+    result = np.ones_like(base)
+    base = base % modulus
+    exponent = exponent.copy()
+    while exponent.any():
+        odd = (exponent & 1) == 1
+        result = np.where(odd, result * base % modulus, result)
+        base = base * base % modulus
+        exponent >>= 1
+    return result
+
+# Проверка всех k раундов одним векторным проходом (модули протоколов малы,
+# произведения помещаются в int64)
+def _verify_rounds_numpy(np, protocol, public, commitments, challenge_vector, responses):
+    e = np.array(challenge_vector, dtype=np.int64)
+    if protocol == 1:
+        n = FS_N
+        X = np.array([c % n for c in commitments], dtype=np.int64)
+        y = np.array([r % n for r in responses], dtype=np.int64)
+        left = y * y % n
+        right = X * _pow_vector(np, np.full_like(e, public % n), e, n) % n
+    elif protocol == 2:
+        p = SH_P
+        r = np.array([c % p for c in commitments], dtype=np.int64)
+        s = np.array([x % SH_Q for x in responses], dtype=np.int64)  # порядок g равен q
+        left = _pow_vector(np, np.full_like(e, SH_G), s, p)
+        right = r * _pow_vector(np, np.full_like(e, public % p), e, p) % p
+    else:
+        n = GQ_N
+        X = np.array([c % n for c in commitments], dtype=np.int64)
+        y = np.array([r % n for r in responses], dtype=np.int64)
+        left = _pow_vector(np, y, np.full_like(e, GQ_V), n)
+        right = X * _pow_vector(np, np.full_like(e, public % n), e, n) % n
+    return bool(np.array_equal(left, right))
+
+# Проверка k параллельных раундов; public - открытый ключ клиента (V, y или J)
+def verify_rounds(protocol, public, commitments, challenge_vector, responses):
+    rounds = len(commitments)
+    if rounds == 0 or rounds != len(challenge_vector) or rounds != len(responses):
+        return False
+    np = vectorized.numpy() if rounds >= ROUNDS_VECTORIZE_THRESHOLD else None
+    if np is not None:
+        return _verify_rounds_numpy(np, protocol, public, commitments, challenge_vector, responses)
+    if protocol == 1:
+        return all(verify_fiat_shamir(X, e, y, V=public)
+                   for X, e, y in zip(commitments, challenge_vector, responses))
+    if protocol == 2:
+        return all(verify_schnorr(public, r, e, s)
+                   for r, e, s in zip(commitments, challenge_vector, responses))
+    return all(verify_guillou_quisquater(public, X, e, y)
+               for X, e, y in zip(commitments, challenge_vector, responses))
+
+# Список целых из JSON-сообщения с проверкой длины
+def _int_list(values, name, rounds=None):
+    if (not isinstance(values, list) or not 0 < len(values) <= MAX_ROUNDS
+            or any(not isinstance(v, int) or isinstance(v, bool) for v in values)):
+        raise ValueError(f"Некорректный список {name}")
+    if rounds is not None and len(values) != rounds:
+        raise ValueError(f"Ожидалось {rounds} значений {name}, получено {len(values)}")
+    return values
+
+def _load_message(prefix, message):
+    if not message.startswith(prefix):
+        raise ValueError(f"Ожидалось сообщение {prefix}")
+    try:
+        return json.loads(message[len(prefix):])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Некорректное сообщение {prefix} {e}") from None
+
+def is_rounds(message):
+    return message.startswith(ROUNDS_PREFIX)
+
+# ROUNDS:{"protocol": ..., "public": ..., "commitments": [...]}
+def format_rounds(protocol, public, commitments):
+    return (ROUNDS_PREFIX + json.dumps({"protocol": protocol, "public": public,
+                                        "commitments": commitments})).encode()
+
+def parse_rounds(message):
+    request = _load_message(ROUNDS_PREFIX, message)
+    if not isinstance(request, dict) or not isinstance(request.get("public"), int):
+        raise ValueError("Некорректный запрос параллельных раундов")
+    request["protocol"] = parse_protocol(request.get("protocol"))
+    _int_list(request.get("commitments"), "обязательств")
+    return request
+
+def format_challenges(challenge_vector):
+    return (CHALLENGES_PREFIX + json.dumps(challenge_vector)).encode()
+
+def parse_challenges(message, rounds=None):
+    return _int_list(_load_message(CHALLENGES_PREFIX, message), "вызовов", rounds)
+
+def format_responses(responses):
+    return (RESPONSES_PREFIX + json.dumps(responses)).encode()
+
+def parse_responses(message, rounds=None):
+    return _int_list(_load_message(RESPONSES_PREFIX, message), "ответов", rounds)
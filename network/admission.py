@@ -0,0 +1,170 @@
+import asyncio
+import queue
+import socket
+import threading
+
+# Ответ клиенту, которому отказано в обслуживании из-за перегрузки сервера
+BUSY_REPLY = b"BUSY"
+
+# Параметры по умолчанию: число обработчиков, длина очереди ожидания и backlog для listen()
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_BACKLOG = 128
+
+# Сколько секунд клиент может выполнять рукопожатие и аутентификацию,
+# прежде чем сервер закроет соединение и освободит обработчик
+HANDSHAKE_TIMEOUT = 10.0
+
+# Сервер отклонил подключение ответом BUSY
+class ServerBusyError(ConnectionError):
+    pass
+
+# Быстрый отказ клиенту: BUSY и закрытие соединения без ожидания данных от него
+def reply_busy(client_socket):
+    try:
+        client_socket.setblocking(False)
+        client_socket.send(BUSY_REPLY)
+        client_socket.shutdown(socket.SHUT_WR)
+        # Вычитываем уже пришедшие данные, чтобы close() не сбросил соединение (RST) раньше BUSY
+        while client_socket.recv(1024):
+            pass
+    except OSError:
+        pass
+    finally:
+        client_socket.close()
+
+# Пул потоков для обработки подключений с ограниченной очередью ожидания.
+# Одновременно обслуживается не более workers клиентов, ещё queue_size ждут
+# свободного обработчика; остальным сразу отправляется BUSY.
+class ConnectionPool:
+    def __init__(self, handler, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, on_reject=None):
+        if workers < 1:
+            raise ValueError("Число обработчиков должно быть положительным")
+        if queue_size < 0:
+            raise ValueError("Размер очереди не может быть отрицательным")
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.on_reject = on_reject
+        self.accepted = 0
+        self.rejected = 0
+        self.active = 0
+        self._waiting = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"connection-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        # Отказываем ещё не начатым подключениям и завершаем обработчики
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                with self._lock:
+                    self._waiting -= 1
+                reply_busy(item[0])
+        for _ in self._threads:
+            self._queue.put(None)
+        self._threads = []
+
+    @property
+    def queue_depth(self):
+        return self._waiting
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active": self.active,
+                "queue_depth": self._waiting,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+            }
+
+    # Постановка подключения в очередь; False - клиент отклонён ответом BUSY
+    def submit(self, client_socket, *args):
+        with self._lock:
+            admitted = self._waiting < self.queue_size or self.active + self._waiting < self.workers
+            if admitted:
+                self._waiting += 1
+                self.accepted += 1
+            else:
+                self.rejected += 1
+        if not admitted:
+            reply_busy(client_socket)
+            if self.on_reject:
+                self.on_reject(*args)
+            return False
+        self._queue.put((client_socket, args))
+        return True
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            client_socket, args = item
+            with self._lock:
+                self._waiting -= 1
+                self.active += 1
+            try:
+                self.handler(client_socket, *args)
+            except Exception:
+                client_socket.close()
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+# То же ограничение для сервера на asyncio: не более workers одновременно
+# обрабатываемых клиентов и queue_size ожидающих, остальные получают BUSY
+class AsyncConnectionGate:
+    def __init__(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        if workers < 1:
+            raise ValueError("Число обработчиков должно быть положительным")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.accepted = 0
+        self.rejected = 0
+        self.active = 0
+        self._waiting = 0
+        self._slots = asyncio.Semaphore(workers)
+
+    @property
+    def queue_depth(self):
+        return self._waiting
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "queue_depth": self._waiting,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+        }
+
+    def admit(self):
+        if self._waiting < self.queue_size or self.active + self._waiting < self.workers:
+            self._waiting += 1
+            self.accepted += 1
+            return True
+        self.rejected += 1
+        return False
+
+    async def __aenter__(self):
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.active -= 1
+        self._slots.release()
@@ -0,0 +1,255 @@
+import asyncio
+import socket
+
+from network.framing import (DATA_FRAME_SIZE, FRAME_DATA, FRAME_HEADER, FRAME_MESSAGE, PREFACE,
+                             FrameError, encode_frame, parse_frame_header)
+
+# Размер одного сообщения старого протокола (граница сообщения = один recv)
+LEGACY_MESSAGE_SIZE = 1024
+
+# Буфер приема по умолчанию: сокет читается в него напрямую (recv_into), за один
+# системный вызов приходит сразу много кадров. Кадр больше буфера его расширяет.
+RECV_BUFFER_SIZE = 1024 * 1024
+
+# Отправка заголовка и данных кадра одним вызовом без их склеивания (sendmsg есть не везде)
+HAS_SENDMSG = hasattr(socket.socket, "sendmsg")
+
+# Отправка нескольких буферов целиком одним sendmsg (повтор при частичной отправке)
+def _sendmsg_all(sock, buffers):
+    buffers = [memoryview(buffer).cast("B") for buffer in buffers]
+    while buffers:
+        sent = sock.sendmsg(buffers)
+        while buffers and sent >= len(buffers[0]):
+            sent -= len(buffers.pop(0))
+        if buffers:
+            buffers[0] = buffers[0][sent:]
+
+# Старый протокол: каждое сообщение - один send(), принимается одним recv(1024)
+class LegacyChannel:
+    framed = False
+
+    def __init__(self, sock):
+        self.sock = sock
+
+    def send_message(self, data):
+        self.sock.send(data)
+
+    def recv_message(self):
+        return self.sock.recv(LEGACY_MESSAGE_SIZE)
+
+    def send_data(self, data):
+        self.sock.sendall(data)
+
+    def recv_data(self, bufsize=RECV_BUFFER_SIZE):
+        return self.sock.recv(bufsize)
+
+    def close(self):
+        self.sock.close()
+
+# Протокол с кадрами (тип + длина + данные): границы сообщений не зависят
+# от того, как TCP разбил или склеил отправленные байты.
+# Прием без лишних копий: сокет читается в заранее выделенный буфер, а recv_data
+# возвращает memoryview кадра внутри него - он действителен до следующего приема.
+class FramedChannel:
+    framed = True
+
+    def __init__(self, sock, buffer_size=RECV_BUFFER_SIZE):
+        self.sock = sock
+        self._buffer = bytearray(max(buffer_size, FRAME_HEADER.size))
+        self._view = memoryview(self._buffer)
+        # Необработанные байты: buffer[start:end]
+        self._start = self._end = 0
+
+    def send_message(self, data):
+        self.sock.sendall(encode_frame(FRAME_MESSAGE, data))
+
+    # Несколько сообщений одним send() - без ожидания между ними
+    def send_messages(self, *messages):
+        self.sock.sendall(b"".join(encode_frame(FRAME_MESSAGE, data) for data in messages))
+
+    # Следующее сообщение; b"" - соединение закрыто
+    def recv_message(self):
+        return bytes(self._recv_payload(FRAME_MESSAGE))
+
+    # Данные файла кадрами; заголовок и порция уходят одним sendmsg без копирования порции
+    def send_data(self, data):
+        view = memoryview(data).cast("B")
+        for start in range(0, len(view), DATA_FRAME_SIZE):
+            chunk = view[start:start + DATA_FRAME_SIZE]
+            if HAS_SENDMSG:
+                _sendmsg_all(self.sock, (FRAME_HEADER.pack(FRAME_DATA, len(chunk)), chunk))
+            else:
+                self.sock.sendall(encode_frame(FRAME_DATA, chunk))
+
+    # Следующая порция данных файла (целый кадр, memoryview до следующего приема);
+    # b"" - соединение закрыто
+    def recv_data(self, bufsize=None):
+        return self._recv_payload(FRAME_DATA)
+
+    def close(self):
+        self.sock.close()
+
+    def _recv_payload(self, expected_type):
+        frame = self._recv_frame()
+        if frame is None:
+            return b""
+        frame_type, payload = frame
+        if frame_type != expected_type:
+            raise FrameError(f"Ожидался кадр типа {expected_type}, получен {frame_type}")
+        return payload
+
+    def _recv_frame(self):
+        while True:
+            header = parse_frame_header(self._view[self._start:self._end])
+            if header is not None:
+                break
+            if not self._fill(self._end - self._start + 1):
+                if self._end > self._start:
+                    raise FrameError("Соединение закрыто посреди кадра")
+                return None
+        frame_type, length = header
+        if not self._fill(FRAME_HEADER.size + length):
+            raise FrameError("Соединение закрыто посреди кадра")
+        start = self._start + FRAME_HEADER.size
+        self._start = start + length
+        payload = self._view[start:self._start]
+        if self._start == self._end:
+            # Буфер разобран целиком - следующий прием снова с его начала
+            self._start = self._end = 0
+        return frame_type, payload
+
+    # Прием, пока в буфере не наберется size необработанных байтов; False - соединение закрыто
+    def _fill(self, size):
+        while self._end - self._start < size:
+            if self._start + size > len(self._buffer):
+                self._compact(size)
+            received = self.sock.recv_into(self._view[self._end:])
+            if not received:
+                return False
+            self._end += received
+        return True
+
+    # Перенос необработанных байтов в начало буфера; кадр больше буфера его расширяет
+    def _compact(self, size):
+        pending = self._end - self._start
+        if size > len(self._buffer):
+            buffer = bytearray(size)
+            buffer[:pending] = self._view[self._start:self._end]
+            self._buffer, self._view = buffer, memoryview(buffer)
+        else:
+            # Области могут перекрываться - переносим через копию
+            self._buffer[:pending] = bytes(self._view[self._start:self._end])
+        self._start, self._end = 0, pending
+
+# Клиент: открытие канала с кадрами на подключенном сокете
+def open_channel(sock, buffer_size=RECV_BUFFER_SIZE):
+    sock.sendall(PREFACE)
+    return FramedChannel(sock, buffer_size)
+
+# Сервер: определение протокола клиента по первому байту без его извлечения (MSG_PEEK)
+def accept_channel(sock, buffer_size=RECV_BUFFER_SIZE):
+    first = sock.recv(1, socket.MSG_PEEK)
+    if first != PREFACE[:1]:
+        return LegacyChannel(sock)
+    preface = b""
+    while len(preface) < len(PREFACE):
+        data = sock.recv(len(PREFACE) - len(preface))
+        if not data:
+            break
+        preface += data
+    if preface != PREFACE:
+        raise FrameError(f"Некорректная преамбула протокола: {preface!r}")
+    return FramedChannel(sock, buffer_size)
+
+# Те же каналы для сервера на asyncio (reader/writer из asyncio.start_server).
+# pending - байты, уже прочитанные при определении протокола.
+class AsyncLegacyChannel:
+    framed = False
+
+    def __init__(self, reader, writer, pending=b""):
+        self.reader = reader
+        self.writer = writer
+        self._pending = pending
+
+    async def send_message(self, data):
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def recv_message(self):
+        return await self.recv_data(LEGACY_MESSAGE_SIZE)
+
+    async def send_data(self, data):
+        await self.send_message(data)
+
+    async def recv_data(self, bufsize=RECV_BUFFER_SIZE):
+        if self._pending:
+            data, self._pending = self._pending[:bufsize], self._pending[bufsize:]
+            return data
+        return await self.reader.read(bufsize)
+
+# У потоков asyncio нет recv_into: кадр читается readexactly прямо из буфера
+# StreamReader (его размер задает limit у asyncio.start_server), без промежуточного разбора
+class AsyncFramedChannel:
+    framed = True
+
+    def __init__(self, reader, writer, pending=b""):
+        self.reader = reader
+        self.writer = writer
+        self._pending = pending
+
+    async def send_message(self, data):
+        self.writer.write(encode_frame(FRAME_MESSAGE, data))
+        await self.writer.drain()
+
+    async def recv_message(self):
+        return await self._recv_payload(FRAME_MESSAGE)
+
+    async def send_data(self, data):
+        view = memoryview(data).cast("B")
+        for start in range(0, len(view), DATA_FRAME_SIZE):
+            chunk = view[start:start + DATA_FRAME_SIZE]
+            self.writer.writelines((FRAME_HEADER.pack(FRAME_DATA, len(chunk)), chunk))
+            await self.writer.drain()
+
+    async def recv_data(self, bufsize=None):
+        return await self._recv_payload(FRAME_DATA)
+
+    # Ровно size байт: сначала прочитанные при определении протокола
+    async def _read(self, size):
+        data, self._pending = self._pending[:size], self._pending[size:]
+        if len(data) < size:
+            try:
+                data += await self.reader.readexactly(size - len(data))
+            except asyncio.IncompleteReadError as e:
+                raise asyncio.IncompleteReadError(data + e.partial, size) from None
+        return data
+
+    async def _recv_payload(self, expected_type):
+        try:
+            head = await self._read(FRAME_HEADER.size)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise FrameError("Соединение закрыто посреди кадра") from None
+            return b""
+        header = parse_frame_header(head)
+        if header is None:
+            raise FrameError(f"Некорректный заголовок кадра: {head!r}")
+        frame_type, length = header
+        try:
+            payload = await self._read(length)
+        except asyncio.IncompleteReadError:
+            raise FrameError("Соединение закрыто посреди кадра") from None
+        if frame_type != expected_type:
+            raise FrameError(f"Ожидался кадр типа {expected_type}, получен {frame_type}")
+        return payload
+
+# Сервер на asyncio: определение протокола клиента по первым прочитанным байтам
+async def accept_async_channel(reader, writer):
+    data = await reader.read(LEGACY_MESSAGE_SIZE)
+    if data[:1] != PREFACE[:1]:
+        return AsyncLegacyChannel(reader, writer, data)
+    if len(data) < len(PREFACE):
+        data += await reader.readexactly(len(PREFACE) - len(data))
+    if data[:len(PREFACE)] != PREFACE:
+        raise FrameError(f"Некорректная преамбула протокола: {data[:len(PREFACE)]!r}")
+    return AsyncFramedChannel(reader, writer, data[len(PREFACE):])
@@ -0,0 +1,80 @@
+import struct
+
+from network.admission import BUSY_REPLY, ServerBusyError
+
+# Преамбула, которой клиент открывает соединение по протоколу с кадрами.
+# Старые клиенты начинают с номера протокола (цифры), так что сервер
+# различает их по первому байту.
+PREFACE = b"ZKF1"
+
+# Типы кадров: управляющее сообщение протокола и порция данных файла
+FRAME_MESSAGE = 0x01
+FRAME_DATA = 0x02
+FRAME_TYPES = (FRAME_MESSAGE, FRAME_DATA)
+
+# Заголовок кадра: тип (1 байт) + длина полезной нагрузки (4 байта, big-endian)
+FRAME_HEADER = struct.Struct("!BI")
+
+# Ограничение на размер одного кадра (защита от заведомо некорректной длины)
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# Размер порции данных файла в одном кадре
+DATA_FRAME_SIZE = 64 * 1024
+
+# Нарушение формата кадров
+class FrameError(ValueError):
+    pass
+
+# Кодирование одного кадра
+def encode_frame(frame_type, payload=b""):
+    if frame_type not in FRAME_TYPES:
+        raise FrameError(f"Неизвестный тип кадра: {frame_type}")
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameError(f"Слишком большой кадр: {len(payload)} байт")
+    return FRAME_HEADER.pack(frame_type, len(payload)) + bytes(payload)
+
+# Заголовок кадра в начале buffer: (тип, длина) или None, если он еще не пришел целиком
+def parse_frame_header(buffer):
+    if not buffer:
+        return None
+    if buffer[0] not in FRAME_TYPES:
+        # Перегруженный сервер отвечает BUSY до разбора протокола, без кадра
+        head = bytes(buffer[:len(BUSY_REPLY)])
+        if BUSY_REPLY.startswith(head):
+            if head == BUSY_REPLY:
+                raise ServerBusyError("Сервер перегружен (BUSY)")
+            return None
+        raise FrameError(f"Неизвестный тип кадра: {buffer[0]}")
+    if len(buffer) < FRAME_HEADER.size:
+        return None
+    frame_type, length = FRAME_HEADER.unpack_from(buffer)
+    if length > MAX_FRAME_SIZE:
+        raise FrameError(f"Слишком большой кадр: {length} байт")
+    return frame_type, length
+
+# Разбор потока байтов на кадры с внутренним буфером.
+# Данные из сокета подаются в feed() порциями любого размера,
+# next_frame() возвращает (тип, полезная нагрузка) или None, если кадр ещё не пришёл целиком.
+class FrameDecoder:
+    def __init__(self, data=b""):
+        self._buffer = bytearray(data)
+
+    def feed(self, data):
+        self._buffer += data
+
+    # Сколько байтов лежит в буфере необработанными
+    def pending(self):
+        return len(self._buffer)
+
+    def next_frame(self):
+        buffer = self._buffer
+        header = parse_frame_header(buffer)
+        if header is None:
+            return None
+        frame_type, length = header
+        end = FRAME_HEADER.size + length
+        if len(buffer) < end:
+            return None
+        payload = bytes(buffer[FRAME_HEADER.size:end])
+        del buffer[:end]
+        return frame_type, payload
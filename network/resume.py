@@ -0,0 +1,375 @@
+import json
+import os
+import threading
+import time
+
+# Возобновляемые загрузки. Клиент присваивает загрузке идентификатор
+# (upload_id) и хранит его вместе с ключом шифрования до подтверждения
+# FILE_RECEIVED: шифрование детерминировано, так что недостающую часть
+# шифротекста можно получить заново из исходного файла.
+# Сервер складывает принятые байты в частичный файл и периодически
+# фиксирует смещение на диске. После обрыва клиент заново подключается,
+# проходит аутентификацию, узнает смещение сообщением RESUME:<upload_id>
+# (ответ OFFSET:<n>) и отправляет заголовок UPLOAD: с upload_id и offset=n,
+# а за ним - только оставшиеся байты.
+
+# Запрос и ответ о зафиксированном смещении
+RESUME_PREFIX = "RESUME:"
+OFFSET_PREFIX = "OFFSET:"
+
+# Каталог частичных загрузок на сервере и как часто фиксировать смещение (байты)
+PARTIAL_DIR = os.path.join("received_files", ".partial")
+CHECKPOINT_BYTES = 4 * 1024 * 1024
+
+# Сколько хранить брошенные частичные загрузки, секунды
+PARTIAL_TTL = 7 * 24 * 3600
+
+# Сколько ждать, пока прежнее соединение отпустит загрузку, секунды:
+# клиент может переподключиться раньше, чем сервер заметит обрыв
+RESUME_WAIT = 10
+
+# Журнал незавершенных загрузок на стороне клиента
+JOURNAL_FILE = ".upload_journal.json"
+
+# Идентификатор загрузки: шестнадцатеричная строка (служит именем файла на сервере)
+def is_upload_id(upload_id):
+    return (isinstance(upload_id, str) and 8 <= len(upload_id) <= 64
+            and all(c in "0123456789abcdef" for c in upload_id))
+
+# Запрос возобновления RESUME:<upload_id>
+def is_resume_query(message):
+    return message.startswith(RESUME_PREFIX)
+
+# Сборка запроса возобновления
+def format_resume_query(upload_id):
+    return (RESUME_PREFIX + upload_id).encode()
+
+# Идентификатор загрузки из запроса возобновления; при ошибке - ValueError
+def parse_resume_query(message):
+    upload_id = message[len(RESUME_PREFIX):]
+    if not is_resume_query(message) or not is_upload_id(upload_id):
+        raise ValueError(f"Некорректный запрос возобновления: {message!r}")
+    return upload_id
+
+# Ответ сервера: смещение, с которого продолжать отправку
+def format_offset(offset):
+    return f"{OFFSET_PREFIX}{offset}".encode()
+
+# Смещение из ответа OFFSET:<n>; при ошибке - ValueError
+def parse_offset(message):
+    if not message.startswith(OFFSET_PREFIX):
+        raise ValueError(f"Ожидался ответ OFFSET:, получено: {message!r}")
+    return int(message[len(OFFSET_PREFIX):])
+
+# Запись атомарной заменой файла, чтобы при сбое не остался обрезанный JSON.
+# В файлах лежит информация о шифровании с секретным ключом - доступ только владельцу.
+def _write_json(path, data):
+    temp_path = path + ".tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with open(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+# Чтение JSON-файла; None, если файла нет или он поврежден
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# Частичные загрузки на сервере: <upload_id>.part с данными и <upload_id>.json
+# с именем файла, информацией о шифровании, размером и зафиксированным смещением.
+# Если загрузка открыта с расшифровщиком (decoder), в .part пишется уже
+# расшифрованный текст, а в .json вместе со смещением - состояние расшифровщика.
+class UploadStore:
+    def __init__(self, directory=PARTIAL_DIR, checkpoint_bytes=CHECKPOINT_BYTES):
+        self.directory = directory
+        self.checkpoint_bytes = checkpoint_bytes
+        self._active = set()
+        self._released = threading.Condition()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, upload_id):
+        base = os.path.join(self.directory, upload_id)
+        return base + ".part", base + ".json"
+
+    # Состояние загрузки и зафиксированное смещение. Если на диске меньше данных,
+    # чем зафиксировано, шифротекст продолжается с того, что есть, а расшифрованный
+    # поток - с начала (состояние расшифровщика для меньшего смещения не сохранилось).
+    def _load(self, upload_id):
+        part_path, state_path = self._paths(upload_id)
+        state = _read_json(state_path)
+        if state is None:
+            return None, 0
+        written = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if written < state["written"]:
+            if "stream" in state:
+                state.update(offset=0, written=0, stream=None)
+            else:
+                state.update(offset=written, written=written)
+        return state, state["offset"]
+
+    # Зафиксированное смещение загрузки; 0 - загрузка неизвестна.
+    # Если загрузку еще принимает прежнее соединение, ждем его завершения до wait секунд.
+    def offset(self, upload_id, wait=RESUME_WAIT):
+        with self._released:
+            if not self._released.wait_for(lambda: upload_id not in self._active, wait):
+                raise ValueError(f"Загрузка {upload_id} уже идет в другом соединении")
+        return self._load(upload_id)[1]
+
+    # Начало или продолжение загрузки с указанного смещения.
+    # Смещение должно совпадать с зафиксированным, а имя, шифрование и
+    # размер - с первой попыткой; иначе ValueError.
+    # decoder(state) создает расшифровщик (feed/finish/state) по сохраненному состоянию.
+    def begin(self, upload_id, filename, encryption_info, size, offset=0, decoder=None):
+        part_path, state_path = self._paths(upload_id)
+        state, committed = self._load(upload_id)
+        if state is None:
+            if offset:
+                raise ValueError(f"Загрузка {upload_id} не найдена, начните с нуля")
+            state = {"filename": filename, "encryption": encryption_info, "size": size,
+                     "offset": 0, "written": 0}
+            if decoder is not None:
+                state["stream"] = None
+        elif (state["filename"], state["encryption"], state["size"]) != (filename, encryption_info, size):
+            raise ValueError(f"Заголовок не совпадает с начатой загрузкой {upload_id}")
+        elif "chunks" in state or ("stream" in state) != (decoder is not None):
+            raise ValueError(f"Загрузка {upload_id} начата в другом режиме")
+        elif offset != committed:
+            raise ValueError(f"Смещение {offset} не совпадает с зафиксированным {committed}")
+
+        with self._released:
+            if upload_id in self._active:
+                raise ValueError(f"Загрузка {upload_id} уже идет в другом соединении")
+            self._active.add(upload_id)
+        try:
+            _write_json(state_path, state)
+            f = open(part_path, "r+b" if os.path.exists(part_path) else "wb")
+            # Данные после последней фиксации могли не дойти до диска - отбрасываем их
+            f.truncate(state["written"])
+            f.seek(state["written"])
+            stream = decoder(state["stream"]) if decoder is not None else None
+        except BaseException:
+            self._release(upload_id)
+            raise
+        return PartialUpload(self, upload_id, f, state, part_path, state_path, stream)
+
+    # Прием куска параллельной загрузки: куски одного файла приходят по разным
+    # соединениям в любом порядке и пишутся в частичный файл по своим смещениям.
+    # Принятые куски перечислены в состоянии загрузки ("chunks": смещение -> длина).
+    def begin_chunk(self, upload_id, filename, encryption_info, size, offset, length):
+        part_path, state_path = self._paths(upload_id)
+        with self._released:
+            state = _read_json(state_path)
+            if state is None:
+                state = {"filename": filename, "encryption": encryption_info, "size": size,
+                         "offset": 0, "written": 0, "chunks": {}}
+                with open(part_path, "wb") as f:
+                    f.truncate(size)
+                _write_json(state_path, state)
+            elif (state["filename"], state["encryption"], state["size"]) != (filename, encryption_info, size):
+                raise ValueError(f"Заголовок не совпадает с начатой загрузкой {upload_id}")
+            elif "chunks" not in state or upload_id in self._active:
+                raise ValueError(f"Загрузка {upload_id} идет последовательно, а не кусками")
+            elif state.get("done"):
+                raise ValueError(f"Загрузка {upload_id} уже собрана")
+            for start, chunk_length in state["chunks"].items():
+                start = int(start)
+                if (start, chunk_length) != (offset, length) and start < offset + length and offset < start + chunk_length:
+                    raise ValueError(f"Кусок {offset}+{length} пересекается с принятым {start}+{chunk_length}")
+        f = open(part_path, "r+b")
+        f.seek(offset)
+        return ChunkUpload(self, upload_id, f, offset, length)
+
+    # Отметка принятого куска. True возвращается ровно одному вызову -
+    # тому, после которого файл собран целиком (он и расшифровывает файл).
+    def _finish_chunk(self, upload_id, offset, length):
+        state_path = self._paths(upload_id)[1]
+        with self._released:
+            state = _read_json(state_path)
+            if state is None or state.get("done"):
+                return False
+            state["chunks"][str(offset)] = length
+            state["done"] = sum(state["chunks"].values()) >= state["size"]
+            _write_json(state_path, state)
+            return state["done"]
+
+    # Удаление загрузки (после расшифровки или при отказе)
+    def discard(self, upload_id):
+        for path in self._paths(upload_id):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # Удаление брошенных загрузок старше max_age секунд
+    def purge(self, max_age=PARTIAL_TTL):
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) > max_age:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _release(self, upload_id):
+        with self._released:
+            self._active.discard(upload_id)
+            self._released.notify_all()
+
+# Открытая частичная загрузка: запись данных с периодической фиксацией смещения.
+# offset - сколько байтов принято, written - сколько записано в файл
+# (меньше offset, если расшифровщик держит неполное слово).
+class PartialUpload:
+    def __init__(self, store, upload_id, file, state, path, state_path, decoder=None):
+        self.store = store
+        self.upload_id = upload_id
+        self.path = path
+        self._file = file
+        self._state = state
+        self._state_path = state_path
+        self._decoder = decoder
+        self.offset = state["offset"]
+        self.written = state["written"]
+        self._committed = self.offset
+
+    @property
+    def size(self):
+        return self._state["size"]
+
+    @property
+    def complete(self):
+        return self.offset >= self.size
+
+    # Запись данных; лишние байты сверх размера файла отбрасываются
+    def write(self, data):
+        data = data[:self.size - self.offset]
+        self.offset += len(data)
+        if self._decoder is not None:
+            data = self._decoder.feed(data)
+        self._file.write(data)
+        self.written += len(data)
+        if self.offset - self._committed >= self.store.checkpoint_bytes:
+            self.checkpoint()
+
+    # Конец данных: запись остатка, который держал расшифровщик
+    def finish(self):
+        if self._decoder is not None:
+            data = self._decoder.finish()
+            self._file.write(data)
+            self.written += len(data)
+
+    # Фиксация: данные сбрасываются на диск, затем записываются смещение
+    # и состояние расшифровщика
+    def checkpoint(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._state.update(offset=self.offset, written=self.written)
+        if self._decoder is not None:
+            self._state["stream"] = self._decoder.state()
+        _write_json(self._state_path, self._state)
+        self._committed = self.offset
+
+    def close(self):
+        try:
+            self.checkpoint()
+        finally:
+            self._file.close()
+            self.store._release(self.upload_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# Кусок параллельной загрузки, открытый на запись
+class ChunkUpload:
+    def __init__(self, store, upload_id, file, offset, length):
+        self.store = store
+        self.upload_id = upload_id
+        self.path = store._paths(upload_id)[0]
+        self._file = file
+        self.offset = offset
+        self.length = length
+        self.received = 0
+        # Собран ли после этого куска весь файл (выставляется при закрытии)
+        self.assembled = False
+
+    @property
+    def complete(self):
+        return self.received >= self.length
+
+    # Запись данных куска; лишние байты сверх длины куска отбрасываются
+    def write(self, data):
+        data = data[:self.length - self.received]
+        self._file.write(data)
+        self.received += len(data)
+
+    # Кусок засчитывается, только если пришел целиком и сброшен на диск
+    def close(self):
+        try:
+            if self.complete:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        finally:
+            self._file.close()
+        if self.complete:
+            self.assembled = self.store._finish_chunk(self.upload_id, self.offset, self.length)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+# Журнал клиента: незавершенные загрузки по пути исходного файла.
+# Запись действительна, пока исходный файл не изменился (размер и время изменения).
+# Ключ шифрования нужен, чтобы получить недостающий шифротекст заново, поэтому
+# журнал доступен только владельцу и удаляется, когда в нем не остается загрузок.
+class UploadJournal:
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self):
+        return _read_json(self.path) or {}
+
+    # Незавершенная загрузка файла или None
+    def get(self, file_path):
+        entry = self._load().get(os.path.abspath(file_path))
+        if entry is None:
+            return None
+        stat = os.stat(file_path)
+        if (entry["source_size"], entry["source_mtime"]) != (stat.st_size, stat.st_mtime):
+            return None
+        return entry
+
+    # Запись о начатой загрузке файла
+    def add(self, file_path, upload_id, encryption_info, binary):
+        stat = os.stat(file_path)
+        with self._lock:
+            journal = self._load()
+            journal[os.path.abspath(file_path)] = {
+                "upload_id": upload_id,
+                "encryption": encryption_info,
+                "binary": binary,
+                "source_size": stat.st_size,
+                "source_mtime": stat.st_mtime,
+            }
+            _write_json(self.path, journal)
+
+    # Удаление записи после подтверждения FILE_RECEIVED
+    def remove(self, file_path):
+        with self._lock:
+            journal = self._load()
+            if journal.pop(os.path.abspath(file_path), None) is None:
+                return
+            if journal:
+                _write_json(self.path, journal)
+            else:
+                os.remove(self.path)
@@ -0,0 +1,68 @@
+import json
+import os
+
+from network.resume import is_upload_id
+
+# Единый заголовок загрузки вместо трех сообщений FILENAME:/ENCRYPTION:/FILESIZE:.
+# Клиент отправляет его и сразу следом данные файла; сервер отвечает
+# только при отказе (ERROR: ...), поэтому до начала передачи нет лишних RTT.
+UPLOAD_PREFIX = "UPLOAD:"
+
+# Сессия: после подтверждения FILE_RECEIVED клиент может прислать следующий
+# заголовок UPLOAD: в том же соединении без повторной аутентификации.
+# Сессия завершается сообщением BYE, закрытием соединения или простоем
+# дольше SESSION_IDLE_TIMEOUT секунд.
+SESSION_END = "BYE"
+SESSION_IDLE_TIMEOUT = 60
+
+# Параллельная (полосовая) загрузка: шифротекст делится на куски, которые
+# идут по нескольким аутентифицированным соединениям. Заголовок куска - тот же
+# UPLOAD: с upload_id, смещением offset и длиной куска length. На каждый кусок
+# сервер отвечает CHUNK_RECEIVED, а на последний недостающий - собирает файл,
+# расшифровывает его и отвечает FILE_RECEIVED.
+CHUNK_RECEIVED = "CHUNK_RECEIVED"
+
+# Сборка заголовка загрузки: UPLOAD:{"filename": ..., "encryption": ..., "size": ...}
+def format_upload_header(filename, encryption_info, size, **fields):
+    header = {"filename": filename, "encryption": encryption_info, "size": size, **fields}
+    return (UPLOAD_PREFIX + json.dumps(header, ensure_ascii=False)).encode()
+
+# Сообщение - заголовок загрузки UPLOAD:
+def is_upload_header(message):
+    return message.startswith(UPLOAD_PREFIX)
+
+# Разбор заголовка загрузки в словарь; при ошибке - ValueError с описанием
+def parse_upload_header(message):
+    if not is_upload_header(message):
+        raise ValueError("Ожидался заголовок UPLOAD:")
+    try:
+        header = json.loads(message[len(UPLOAD_PREFIX):])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Некорректный заголовок загрузки: {e}") from None
+    if not isinstance(header, dict):
+        raise ValueError("Заголовок загрузки должен быть JSON-объектом")
+
+    filename = header.get("filename")
+    if not isinstance(filename, str) or not filename or os.path.basename(filename) != filename:
+        raise ValueError(f"Некорректное имя файла: {filename!r}")
+    if not isinstance(header.get("encryption"), str):
+        raise ValueError("В заголовке загрузки нет информации о шифровании")
+    size = header.get("size")
+    if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+        raise ValueError(f"Некорректный размер файла: {size!r}")
+
+    # Возобновляемая загрузка: идентификатор и смещение, с которого идут данные
+    if "upload_id" in header and not is_upload_id(header["upload_id"]):
+        raise ValueError(f"Некорректный идентификатор загрузки: {header['upload_id']!r}")
+    offset = header.setdefault("offset", 0)
+    if (not isinstance(offset, int) or isinstance(offset, bool) or not 0 <= offset <= size
+            or (offset and "upload_id" not in header)):
+        raise ValueError(f"Некорректное смещение: {offset!r}")
+
+    # Кусок параллельной загрузки
+    if "length" in header:
+        length = header["length"]
+        if (not isinstance(length, int) or isinstance(length, bool) or length <= 0
+                or offset + length > size or "upload_id" not in header):
+            raise ValueError(f"Некорректная длина куска: {length!r}")
+    return header
@@ -1,227 +1,821 @@
+import argparse
+import asyncio
 import socket
-import random
 import os
-import threading  # Добавляем модуль threading
 # Import decryption modules
-import crypto.fiat_shamir as fiat_shamir
-import crypto.shnorr_encryption as shnorr_encryption
-import crypto.guillou_quisquater as guillou_quisquater
+import crypto.nizk as nizk
+import crypto.zk_protocols as zk
+from crypto.decrypt_pool import DEFAULT_WORKERS as DEFAULT_DECRYPT_WORKERS, DecryptPool
+from crypto.encryption_info import check_info, context_from_info, info_compression, stream_decryptor
+from network.admission import (BUSY_REPLY, DEFAULT_BACKLOG, DEFAULT_QUEUE_SIZE, DEFAULT_WORKERS,
+                               HANDSHAKE_TIMEOUT, AsyncConnectionGate, ConnectionPool)
+from network.channel import RECV_BUFFER_SIZE, accept_async_channel, accept_channel
+from network.framing import FrameError
+from network.resume import UploadStore, format_offset, is_resume_query, parse_resume_query
+from network.upload import CHUNK_RECEIVED, SESSION_END, SESSION_IDLE_TIMEOUT, is_upload_header, parse_upload_header
 
 # Создаем директорию для сохранения файлов, если она не существует
 SAVE_DIR = "received_files"
 if not os.path.exists(SAVE_DIR):
     os.makedirs(SAVE_DIR)
 
+# Адрес и порт сервера по умолчанию
+HOST = "0.0.0.0"
+PORT = 8080
+
+# Названия алгоритмов шифрования для журнала
+ALGORITHM_NAMES = {"FS": "Фиат-Шамир", "SH": "Шнорр", "GQ": "Гиллу-Кискатер"}
+
+# Использованные nonce неинтерактивных доказательств (защита от повтора)
+replay_cache = nizk.ReplayCache()
+
+# Пул процессов расшифровки; до запуска сервера расшифровка идет в потоке клиента
+decrypt_pool = DecryptPool(0)
+
+# Запуск пула процессов расшифровки с заданным числом процессов
+def start_decrypt_pool(workers):
+    global decrypt_pool
+    decrypt_pool = DecryptPool(workers).start()
+    return decrypt_pool
+
+# Частичные загрузки, которые клиенты могут продолжить после обрыва
+upload_store = UploadStore(os.path.join(SAVE_DIR, ".partial"))
+
+# Сколько секунд сессия клиента может простаивать между загрузками
+session_idle_timeout = SESSION_IDLE_TIMEOUT
+
+# Сколько секунд ждать каждого сообщения клиента до успешной аутентификации
+handshake_timeout = HANDSHAKE_TIMEOUT
+
+# Минимальная стойкость параллельных раундов в битах: клиент с меньшим числом
+# раундов не проходит аутентификацию (0 - принимать любое число раундов)
+min_soundness_bits = zk.DEFAULT_SOUNDNESS_BITS
+
+# Размер буфера приема соединения, байты
+recv_buffer_size = RECV_BUFFER_SIZE
+
+# Запись в журнал алгоритма расшифровки (заодно проверяет информацию о шифровании, контекст кэшируется)
+def log_decryption(encryption_info, addr):
+    algorithm, _ = context_from_info(encryption_info)
+    method = info_compression(encryption_info)
+    compressed = f" (открытый текст сжат: {method})" if method else ""
+    print(f"[СЕРВЕР] Расшифровка файла от {addr} с использованием {ALGORITHM_NAMES[algorithm]}{compressed}...")
+
+# Расшифровка принятого файла в соответствии с информацией о шифровании
+def decrypt_received_file(encryption_info, encrypted_file, decrypted_file, addr):
+    # Проверяем информацию о шифровании до постановки в очередь
+    log_decryption(encryption_info, addr)
+    # Сама расшифровка выполняется в пуле процессов и не держит GIL сервера
+    decrypt_pool.decrypt(encryption_info, encrypted_file, decrypted_file)
+
+# Проверка ответов на вектор вызовов параллельных раундов
+def verify_rounds_reply(rounds_request, challenge_vector, responses_data, addr):
+    protocol = rounds_request["protocol"]
+    required = zk.rounds_for_soundness(protocol, min_soundness_bits)
+    if len(challenge_vector) < required:
+        print(f"[СЕРВЕР] Клиент {addr} прислал {len(challenge_vector)} раундов, нужно не меньше {required}")
+        return False
+    try:
+        responses = zk.parse_responses(responses_data, len(challenge_vector))
+    except ValueError as e:
+        print(f"[СЕРВЕР] Некорректные ответы от {addr}: {e}")
+        return False
+    # Открытый ключ клиента Фиат-Шамир известен серверу заранее
+    public = zk.FS_V if protocol == 1 else rounds_request["public"]
+    success = zk.verify_rounds(protocol, public, rounds_request["commitments"],
+                               challenge_vector, responses)
+    bits = len(challenge_vector) * zk.soundness_per_round(protocol)
+    print(f"[СЕРВЕР] Проверено {len(challenge_vector)} раундов от {addr} (стойкость ~{bits:.0f} бит)")
+    return success
+
+# Разбор и проверка заголовка UPLOAD: до приема данных (клиенту отвечаем только при ошибке)
+def read_upload_header(header_data):
+    header = parse_upload_header(header_data)
+    check_info(header["encryption"])
+    return header
+
+# Первое сообщение сессии: заголовок загрузки или запрос смещения возобновляемой загрузки
+def is_session_request(message):
+    return is_upload_header(message) or is_resume_query(message)
+
+# Ответ на RESUME:<upload_id> - зафиксированное смещение загрузки
+def answer_resume_query(message, addr):
+    upload_id = parse_resume_query(message)
+    offset = upload_store.offset(upload_id)
+    print(f"[СЕРВЕР] Клиент {addr} продолжает загрузку {upload_id} со смещения {offset}")
+    return format_offset(offset)
+
+# Прием данных возобновляемой загрузки или куска в хранилище частичных загрузок;
+# recv_data - функция приема очередного блока. При обрыве принятые байты
+# остаются на сервере, и клиент может продолжить с зафиксированного смещения.
+def receive_partial(upload, recv_data):
+    while not upload.complete:
+        data = recv_data()
+        if not data:
+            break
+        upload.write(data)
+
+# Расшифровка очередной порции шифротекста и запись открытого текста
+def write_decrypted(f, decryptor, data):
+    f.write(decryptor.feed(data))
+
+# Расшифровщик возобновляемой загрузки по сохраненному состоянию; None - загрузка
+# копит шифротекст и расшифровывается в пуле процессов после приема. Так же
+# принимается сжатый открытый текст: состояние распаковщика не сохраняется,
+# а в пуле он расшифровывается и распаковывается за один проход
+def partial_decoder(encryption_info, filesize):
+    if not decrypt_pool.streams(filesize) or info_compression(encryption_info):
+        return None
+    return lambda state: stream_decryptor(encryption_info, state)
+
+# Прием одного файла: данные, расшифровка и подтверждение FILE_RECEIVED.
+# Небольшой файл расшифровывается на лету и пишется по мере прихода данных,
+# без промежуточного файла шифротекста. Большой принимается шифротекстом и
+# расшифровывается в пуле процессов, чтобы не держать GIL потока соединения.
+# Куски параллельной загрузки приходят в любом порядке, поэтому собираются
+# в шифротекст и расшифровываются целиком.
+def receive_file(channel, addr, header):
+    filename, encryption_info, filesize = header["filename"], header["encryption"], header["size"]
+    upload_id = header.get("upload_id")
+
+    # Создаем уникальное имя файла для каждого клиента, чтобы избежать конфликтов
+    client_id = f"{addr[0]}_{addr[1]}"
+    decrypted_file = os.path.join(SAVE_DIR, f"{client_id}_{filename}")
+    if "length" in header:
+        # Кусок параллельной загрузки; файл расшифровывает соединение, принявшее последний кусок
+        with upload_store.begin_chunk(upload_id, filename, encryption_info, filesize,
+                                      header["offset"], header["length"]) as upload:
+            receive_partial(upload, lambda: channel.recv_data(recv_buffer_size))
+        if not upload.complete:
+            print(f"[СЕРВЕР] Кусок {header['offset']} загрузки {upload_id} от {addr} прерван")
+            return
+        if not upload.assembled:
+            channel.send_message(f"{CHUNK_RECEIVED}: {header['offset']}".encode())
+            return
+        print(f"[СЕРВЕР] Зашифрованный файл от {addr} собран из кусков: {upload.path}")
+        try:
+            decrypt_received_file(encryption_info, upload.path, decrypted_file, addr)
+        finally:
+            upload_store.discard(upload_id)
+    elif upload_id:
+        # Возобновляемая загрузка: принятое копится в хранилище частичных загрузок.
+        # Небольшой несжатый файл расшифровывается на лету, и при фиксации смещения
+        # сохраняется состояние расшифровщика
+        decoder = partial_decoder(encryption_info, filesize)
+        if decoder is not None:
+            log_decryption(encryption_info, addr)
+        upload = upload_store.begin(upload_id, filename, encryption_info, filesize, header["offset"],
+                                    decoder=decoder)
+        try:
+            with upload:
+                receive_partial(upload, lambda: channel.recv_data(recv_buffer_size))
+                if upload.complete:
+                    upload.finish()
+        except FrameError as e:
+            # Обрыв посреди кадра - не ошибка данных: зафиксированная часть сохранена,
+            # клиент продолжит загрузку с последней фиксации
+            print(f"[СЕРВЕР] Соединение с {addr} оборвано: {e}")
+        except ValueError:
+            # Шифротекст не расшифровывается - продолжать такую загрузку бессмысленно
+            upload_store.discard(upload_id)
+            raise
+        if not upload.complete:
+            print(f"[СЕРВЕР] Загрузка {upload_id} от {addr} прервана на {upload.offset} из {filesize} байт")
+            return
+        try:
+            if decoder is None:
+                decrypt_received_file(encryption_info, upload.path, decrypted_file, addr)
+            else:
+                os.replace(upload.path, decrypted_file)
+        finally:
+            upload_store.discard(upload_id)
+    elif decrypt_pool.streams(filesize):
+        log_decryption(encryption_info, addr)
+        decryptor = stream_decryptor(encryption_info)
+        bytes_received = 0
+
+        try:
+            with open(decrypted_file, 'wb') as f:
+                while bytes_received < filesize:
+                    data = channel.recv_data(recv_buffer_size)
+                    if not data:
+                        break
+                    write_decrypted(f, decryptor, data)
+                    bytes_received += len(data)
+
+                # Неполный файл не сохраняем
+                if bytes_received < filesize:
+                    raise ConnectionError(f"Передача прервана: получено {bytes_received} из {filesize} байт")
+                f.write(decryptor.finish())
+        except BaseException:
+            os.remove(decrypted_file)
+            raise
+    else:
+        encrypted_file = os.path.join(SAVE_DIR, f"{client_id}_encrypted_{filename}")
+        bytes_received = 0
+
+        with open(encrypted_file, 'wb') as f:
+            while bytes_received < filesize:
+                data = channel.recv_data(recv_buffer_size)
+                if not data:
+                    break
+                f.write(data)
+                bytes_received += len(data)
+
+        # Неполный файл не расшифровываем
+        if bytes_received < filesize:
+            os.remove(encrypted_file)
+            raise ConnectionError(f"Передача прервана: получено {bytes_received} из {filesize} байт")
+
+        print(f"[СЕРВЕР] Зашифрованный файл от {addr} получен и сохранен как {encrypted_file}")
+        try:
+            decrypt_received_file(encryption_info, encrypted_file, decrypted_file, addr)
+        finally:
+            os.remove(encrypted_file)
+
+    print(f"[СЕРВЕР] Файл от {addr} успешно расшифрован и сохранен как {decrypted_file}")
+
+    # Отправляем подтверждение
+    channel.send_message(f"FILE_RECEIVED: Файл {filename} успешно получен и расшифрован".encode())
+
+# Сессия клиента с кадрами: загрузки принимаются одна за другой без повторной
+# аутентификации, пока клиент не пришлет BYE, не закроет соединение или не
+# будет простаивать дольше session_idle_timeout
+def serve_session(channel, addr, header_data):
+    uploads = 0
+    try:
+        while header_data and header_data != SESSION_END:
+            try:
+                if is_resume_query(header_data):
+                    channel.send_message(answer_resume_query(header_data, addr))
+                    header_data = channel.recv_message().decode()
+                    continue
+                header = read_upload_header(header_data)
+            except ValueError as e:
+                print(f"[СЕРВЕР] Заголовок загрузки от {addr} отклонен: {e}")
+                channel.send_message(f"ERROR: {e}".encode())
+                return
+            # Ответ не отправляем: клиент передает данные сразу за заголовком
+            print(f"[СЕРВЕР] Информация о шифровании от {addr}: {header['encryption']}")
+            print(f"[СЕРВЕР] Получаю зашифрованный файл от {addr}: {header['filename']}, "
+                  f"размер: {header['size']} байт, с байта {header['offset']}")
+            receive_file(channel, addr, header)
+            uploads += 1
+            header_data = channel.recv_message().decode()
+    except socket.timeout:
+        print(f"[СЕРВЕР] Сессия с {addr} закрыта: простой дольше {session_idle_timeout} с")
+    print(f"[СЕРВЕР] Сессия с {addr} завершена, принято файлов: {uploads}")
+
 # Функция для обработки клиента в отдельном потоке
 def handle_client(client_socket, addr):
     print(f"[СЕРВЕР] Клиент подключился: {addr}")
 
     try:
-        # Получаем выбранный протокол
-        protocol_data = client_socket.recv(1024).decode().strip()
+        # Молчащий клиент не должен занимать обработчик: до аутентификации ожидание ограничено
+        client_socket.settimeout(handshake_timeout)
+        # Новые клиенты открывают соединение преамбулой протокола с кадрами, старые - сразу номером протокола
+        channel = accept_channel(client_socket, recv_buffer_size)
+        if channel.framed:
+            print(f"[СЕРВЕР] Клиент {addr} использует протокол с кадрами")
+
+        # Получаем выбранный протокол, обязательства параллельных раундов
+        # или сразу неинтерактивное доказательство
+        protocol_data = channel.recv_message().decode().strip()
+        proof = rounds_request = None
         try:
-            protocol = int(protocol_data)
-            if protocol not in [1, 2, 3]:
-                raise ValueError(f"Недопустимый протокол: {protocol}")
+            if nizk.is_proof(protocol_data):
+                proof = nizk.parse_proof(protocol_data)
+                protocol = proof["protocol"]
+            elif zk.is_rounds(protocol_data):
+                rounds_request = zk.parse_rounds(protocol_data)
+                protocol = rounds_request["protocol"]
+            else:
+                protocol = zk.parse_protocol(protocol_data)
             print(f"[СЕРВЕР] Клиент {addr} выбрал протокол: {protocol}")
         except ValueError as e:
             print(f"[СЕРВЕР] Ошибка при получении протокола от {addr}: {e}")
             print(f"[СЕРВЕР] Полученные данные: '{protocol_data}'")
-            client_socket.send(b"ERROR: Invalid protocol")
-            client_socket.close()
+            channel.send_message(b"ERROR: Invalid protocol")
             return
-        
+
         auth_success = False
-        
-        if protocol == 1:  # Фиат-Шамир
-            # Устанавливаем параметры криптографии
-            n = 3233  # Простое число (p * q)
-            V = 2197  # Открытый ключ клиента
-            
+
+        if proof:  # Неинтерактивный режим: вызовы k раундов - хэш доказательства, проверяем сразу
+            print(f"[СЕРВЕР] Получено неинтерактивное доказательство от {addr}")
+            auth_success = nizk.check_proof(proof, replay_cache)
+
+        elif rounds_request:  # Параллельные раунды: все вызовы одним сообщением
+            rounds = len(rounds_request["commitments"])
+            challenge_vector = zk.challenges(protocol, rounds)
+            channel.send_message(zk.format_challenges(challenge_vector))
+            print(f"[СЕРВЕР] Отправлено {rounds} вызовов клиенту {addr}")
+            auth_success = verify_rounds_reply(rounds_request, challenge_vector,
+                                               channel.recv_message().decode(), addr)
+
+        elif protocol == 1:  # Фиат-Шамир
             # Получаем X от клиента
-            X = int(client_socket.recv(1024).decode())
+            X = int(channel.recv_message().decode())
             print(f"[СЕРВЕР] Получено X от {addr}: {X}")
 
             # Генерируем случайное e {0,1} и отправляем клиенту
-            e = random.randint(0, 1)
-            client_socket.send(str(e).encode())
+            e = zk.challenge(protocol)
+            channel.send_message(str(e).encode())
             print(f"[СЕРВЕР] Отправлено e клиенту {addr}: {e}")
 
             # Получаем y от клиента
-            y = int(client_socket.recv(1024).decode())
+            y = int(channel.recv_message().decode())
             print(f"[СЕРВЕР] Получено y от {addr}: {y}")
 
             # Проверяем условие y² = X * V^e mod n
-            auth_success = pow(y, 2, n) == ((X % n) * pow(V, e, n)) % n
-            
+            auth_success = zk.verify_fiat_shamir(X, e, y)
+
         elif protocol == 2:  # Шнорр
-            # Параметры для протокола Шнорра
-            p = 2267  # Простое число
-            q = 103   # Простой делитель p-1
-            g = 354   # Генератор подгруппы порядка q
-            
             # Получаем открытый ключ от клиента
-            y = int(client_socket.recv(1024).decode())
-            
+            y = int(channel.recv_message().decode())
+
             # Получаем r
-            r = int(client_socket.recv(1024).decode())
+            r = int(channel.recv_message().decode())
             print(f"[СЕРВЕР] Получено r от {addr}: {r}")
-            
+
             # Отправляем случайный вызов e
-            e = random.randint(1, q-1)
-            client_socket.send(str(e).encode())
+            e = zk.challenge(protocol)
+            channel.send_message(str(e).encode())
             print(f"[СЕРВЕР] Отправлено e клиенту {addr}: {e}")
-            
+
             # Получаем s от клиента
-            s = int(client_socket.recv(1024).decode())
+            s = int(channel.recv_message().decode())
             print(f"[СЕРВЕР] Получено s от {addr}: {s}")
-            
+
             # Проверяем g^s = r * y^e mod p
-            left_side = pow(g, s, p)
-            right_side = (r * pow(y, e, p)) % p
-            auth_success = (left_side == right_side)
-            
+            auth_success = zk.verify_schnorr(y, r, e, s)
+
         elif protocol == 3:  # Гиллу-Кискатер
-            # Параметры для протокола Гийо-Кискатер
-            n = 3233  # Модуль (p*q)
-            v = 17    # Открытая экспонента
-            
             # Получаем открытый ключ от клиента
-            J = int(client_socket.recv(1024).decode())
-            
+            J = int(channel.recv_message().decode())
+
             # Получаем X
-            X = int(client_socket.recv(1024).decode())
+            X = int(channel.recv_message().decode())
             print(f"[СЕРВЕР] Получено X от {addr}: {X}")
-            
+
             # Отправляем случайный вызов e
-            e = random.randint(1, v-1)
-            client_socket.send(str(e).encode())
+            e = zk.challenge(protocol)
+            channel.send_message(str(e).encode())
             print(f"[СЕРВЕР] Отправлено e клиенту {addr}: {e}")
-            
+
             # Получаем y от клиента
-            y = int(client_socket.recv(1024).decode())
+            y = int(channel.recv_message().decode())
             print(f"[СЕРВЕР] Получено y от {addr}: {y}")
-            
+
             # Проверяем y^v = X * J^e mod n
-            left_side = pow(y, v, n)
-            right_side = (X * pow(J, e, n)) % n
-            auth_success = (left_side == right_side)
-            
+            auth_success = zk.verify_guillou_quisquater(J, X, e, y)
+
         if auth_success:
-            client_socket.send(b"AUTH_SUCCESS")
+            channel.send_message(b"AUTH_SUCCESS")
             print(f"[СЕРВЕР] Аутентификация клиента {addr} успешна!")
-            
+
             try:
-                # Получаем имя файла
-                filename_data = client_socket.recv(1024).decode()
+                # Первое сообщение после аутентификации: единый заголовок UPLOAD: (протокол с кадрами)
+                # или старая последовательность FILENAME:, ENCRYPTION:, FILESIZE: с подтверждениями.
+                # Дальше любое ожидание клиента ограничено таймаутом простоя сессии
+                client_socket.settimeout(session_idle_timeout)
+                header_data = channel.recv_message().decode()
+                if channel.framed and is_session_request(header_data):
+                    serve_session(channel, addr, header_data)
+                else:
+                    # Старый клиент: имя файла, информация о шифровании и размер с подтверждениями
+                    filename_data = header_data
+                    if not filename_data.startswith("FILENAME:"):
+                        print(f"[СЕРВЕР] Ошибка от {addr}: неверный формат имени файла")
+                        return
+
+                    filename = filename_data.replace("FILENAME:", "")
+                    channel.send_message(b"OK")  # Подтверждаем получение
+
+                    # Получаем информацию о шифровании
+                    encryption_data = channel.recv_message().decode()
+                    if not encryption_data.startswith("ENCRYPTION:"):
+                        print(f"[СЕРВЕР] Ошибка от {addr}: неверный формат информации о шифровании")
+                        return
+
+                    encryption_info = encryption_data.replace("ENCRYPTION:", "")
+                    channel.send_message(b"OK")  # Подтверждаем получение
+                    print(f"[СЕРВЕР] Информация о шифровании от {addr}: {encryption_info}")
+
+                    # Получаем размер файла
+                    filesize_data = channel.recv_message().decode()
+                    if not filesize_data.startswith("FILESIZE:"):
+                        print(f"[СЕРВЕР] Ошибка от {addr}: неверный формат размера файла")
+                        return
+
+                    filesize = int(filesize_data.replace("FILESIZE:", ""))
+                    print(f"[СЕРВЕР] Получаю зашифрованный файл от {addr}: {filename}, размер: {filesize} байт")
+
+                    # Отправляем готовность к приему
+                    channel.send_message(b"READY")
+
+                    receive_file(channel, addr, {"filename": filename, "encryption": encryption_info,
+                                                 "size": filesize})
+
+            except socket.timeout:
+                print(f"[СЕРВЕР] Клиент {addr} не прислал заголовок загрузки за {session_idle_timeout} с")
+            except Exception as e:
+                print(f"[СЕРВЕР] Ошибка при обработке файла от {addr}: {str(e)}")
+                channel.send_message(f"ERROR: {str(e)}".encode())
+
+        else:
+            channel.send_message(b"AUTH_FAILED")
+            print(f"[СЕРВЕР] Аутентификация клиента {addr} провалена!")
+
+    except socket.timeout:
+        print(f"[СЕРВЕР] Клиент {addr} не прошел аутентификацию за {handshake_timeout} с")
+    except Exception as e:
+        print(f"[СЕРВЕР] Ошибка с клиентом {addr}: {str(e)}")
+    finally:
+        client_socket.close()
+        print(f"[СЕРВЕР] Соединение с клиентом {addr} закрыто")
+
+# Прием данных загрузки или куска в цикле событий (как receive_partial).
+# Запись (с расшифровкой и сбросом на диск при фиксации) идет в отдельном потоке,
+# чтобы не задерживать рукопожатия остальных клиентов
+async def receive_partial_async(upload, channel):
+    while not upload.complete:
+        data = await channel.recv_data(recv_buffer_size)
+        if not data:
+            break
+        await asyncio.to_thread(upload.write, data)
+
+# Прием файла размера filesize в path в цикле событий: write(f, data) для каждой
+# порции и finish(f) после приема всех данных выполняются в отдельном потоке,
+# там же файл открывается и закрывается. Возвращает число принятых байтов.
+async def receive_stream_async(channel, path, filesize, write, finish=None):
+    f = await asyncio.to_thread(open, path, 'wb')
+    bytes_received = 0
+    try:
+        while bytes_received < filesize:
+            data = await channel.recv_data(recv_buffer_size)
+            if not data:
+                break
+            await asyncio.to_thread(write, f, data)
+            bytes_received += len(data)
+        if bytes_received >= filesize and finish is not None:
+            await asyncio.to_thread(finish, f)
+    finally:
+        await asyncio.to_thread(f.close)
+    return bytes_received
+
+# Прием одного файла в цикле событий (как receive_file); работа с диском,
+# расшифровка и ожидание пула процессов - в отдельных потоках, вне цикла событий
+async def receive_file_async(channel, addr, header):
+    filename, encryption_info, filesize = header["filename"], header["encryption"], header["size"]
+    upload_id = header.get("upload_id")
+
+    client_id = f"{addr[0]}_{addr[1]}"
+    decrypted_file = os.path.join(SAVE_DIR, f"{client_id}_{filename}")
+    if "length" in header:
+        upload = await asyncio.to_thread(upload_store.begin_chunk, upload_id, filename, encryption_info,
+                                         filesize, header["offset"], header["length"])
+        try:
+            await receive_partial_async(upload, channel)
+        finally:
+            await asyncio.to_thread(upload.close)
+        if not upload.complete:
+            print(f"[СЕРВЕР] Кусок {header['offset']} загрузки {upload_id} от {addr} прерван")
+            return
+        if not upload.assembled:
+            await channel.send_message(f"{CHUNK_RECEIVED}: {header['offset']}".encode())
+            return
+        print(f"[СЕРВЕР] Зашифрованный файл от {addr} собран из кусков: {upload.path}")
+        try:
+            await asyncio.to_thread(decrypt_received_file, encryption_info,
+                                    upload.path, decrypted_file, addr)
+        finally:
+            await asyncio.to_thread(upload_store.discard, upload_id)
+    elif upload_id:
+        decoder = partial_decoder(encryption_info, filesize)
+        if decoder is not None:
+            log_decryption(encryption_info, addr)
+        upload = await asyncio.to_thread(upload_store.begin, upload_id, filename, encryption_info,
+                                         filesize, header["offset"], decoder)
+        try:
+            try:
+                await receive_partial_async(upload, channel)
+                if upload.complete:
+                    await asyncio.to_thread(upload.finish)
+            finally:
+                await asyncio.to_thread(upload.close)
+        except FrameError as e:
+            print(f"[СЕРВЕР] Соединение с {addr} оборвано: {e}")
+        except ValueError:
+            await asyncio.to_thread(upload_store.discard, upload_id)
+            raise
+        if not upload.complete:
+            print(f"[СЕРВЕР] Загрузка {upload_id} от {addr} прервана на {upload.offset} из {filesize} байт")
+            return
+        try:
+            if decoder is None:
+                await asyncio.to_thread(decrypt_received_file, encryption_info,
+                                        upload.path, decrypted_file, addr)
+            else:
+                await asyncio.to_thread(os.replace, upload.path, decrypted_file)
+        finally:
+            await asyncio.to_thread(upload_store.discard, upload_id)
+    elif decrypt_pool.streams(filesize):
+        log_decryption(encryption_info, addr)
+        decryptor = stream_decryptor(encryption_info)
+
+        try:
+            bytes_received = await receive_stream_async(channel, decrypted_file, filesize,
+                                                        lambda f, data: write_decrypted(f, decryptor, data),
+                                                        lambda f: f.write(decryptor.finish()))
+            if bytes_received < filesize:
+                raise ConnectionError(f"Передача прервана: получено {bytes_received} из {filesize} байт")
+        except BaseException:
+            await asyncio.to_thread(os.remove, decrypted_file)
+            raise
+    else:
+        encrypted_file = os.path.join(SAVE_DIR, f"{client_id}_encrypted_{filename}")
+        try:
+            bytes_received = await receive_stream_async(channel, encrypted_file, filesize,
+                                                        lambda f, data: f.write(data))
+            if bytes_received < filesize:
+                raise ConnectionError(f"Передача прервана: получено {bytes_received} из {filesize} байт")
+            print(f"[СЕРВЕР] Зашифрованный файл от {addr} получен и сохранен как {encrypted_file}")
+            await asyncio.to_thread(decrypt_received_file, encryption_info,
+                                    encrypted_file, decrypted_file, addr)
+        finally:
+            await asyncio.to_thread(os.remove, encrypted_file)
+
+    print(f"[СЕРВЕР] Файл от {addr} успешно расшифрован и сохранен как {decrypted_file}")
+    await channel.send_message(f"FILE_RECEIVED: Файл {filename} успешно получен и расшифрован".encode())
+
+# Сессия клиента с кадрами в цикле событий (как serve_session)
+async def serve_session_async(channel, addr, header_data):
+    uploads = 0
+
+    async def next_message():
+        return (await asyncio.wait_for(channel.recv_message(), session_idle_timeout)).decode()
+
+    try:
+        while header_data and header_data != SESSION_END:
+            try:
+                if is_resume_query(header_data):
+                    # Ожидание прежнего соединения с этой загрузкой - в отдельном потоке
+                    await channel.send_message(await asyncio.to_thread(answer_resume_query, header_data, addr))
+                    header_data = await next_message()
+                    continue
+                header = read_upload_header(header_data)
+            except ValueError as e:
+                print(f"[СЕРВЕР] Заголовок загрузки от {addr} отклонен: {e}")
+                await channel.send_message(f"ERROR: {e}".encode())
+                return
+            print(f"[СЕРВЕР] Информация о шифровании от {addr}: {header['encryption']}")
+            print(f"[СЕРВЕР] Получаю зашифрованный файл от {addr}: {header['filename']}, "
+                  f"размер: {header['size']} байт, с байта {header['offset']}")
+            await receive_file_async(channel, addr, header)
+            uploads += 1
+            header_data = await next_message()
+    except asyncio.TimeoutError:
+        print(f"[СЕРВЕР] Сессия с {addr} закрыта: простой дольше {session_idle_timeout} с")
+    print(f"[СЕРВЕР] Сессия с {addr} завершена, принято файлов: {uploads}")
+
+# Обработка клиента в цикле событий asyncio (тот же протокол, что и handle_client)
+async def handle_client_async(reader, writer):
+    addr = writer.get_extra_info("peername")
+    print(f"[СЕРВЕР] Клиент подключился: {addr}")
+
+    try:
+        # Протокол клиента (с кадрами или старый) определяется по первым байтам.
+        # До аутентификации каждое ожидание клиента ограничено handshake_timeout
+        channel = await asyncio.wait_for(accept_async_channel(reader, writer), handshake_timeout)
+        if channel.framed:
+            print(f"[СЕРВЕР] Клиент {addr} использует протокол с кадрами")
+
+        # Одно сообщение протокола в виде строки
+        async def recv_message(timeout=handshake_timeout):
+            return (await asyncio.wait_for(channel.recv_message(), timeout)).decode()
+
+        # Получаем выбранный протокол, обязательства параллельных раундов
+        # или сразу неинтерактивное доказательство
+        protocol_data = (await recv_message()).strip()
+        proof = rounds_request = None
+        try:
+            if nizk.is_proof(protocol_data):
+                proof = nizk.parse_proof(protocol_data)
+                protocol = proof["protocol"]
+            elif zk.is_rounds(protocol_data):
+                rounds_request = zk.parse_rounds(protocol_data)
+                protocol = rounds_request["protocol"]
+            else:
+                protocol = zk.parse_protocol(protocol_data)
+            print(f"[СЕРВЕР] Клиент {addr} выбрал протокол: {protocol}")
+        except ValueError as e:
+            print(f"[СЕРВЕР] Ошибка при получении протокола от {addr}: {e}")
+            print(f"[СЕРВЕР] Полученные данные: '{protocol_data}'")
+            await channel.send_message(b"ERROR: Invalid protocol")
+            return
+
+        auth_success = False
+
+        if proof:  # Неинтерактивный режим
+            auth_success = nizk.check_proof(proof, replay_cache)
+
+        elif rounds_request:  # Параллельные раунды
+            challenge_vector = zk.challenges(protocol, len(rounds_request["commitments"]))
+            await channel.send_message(zk.format_challenges(challenge_vector))
+            auth_success = verify_rounds_reply(rounds_request, challenge_vector,
+                                               await recv_message(), addr)
+
+        elif protocol == 1:  # Фиат-Шамир
+            X = int(await recv_message())
+            e = zk.challenge(protocol)
+            await channel.send_message(str(e).encode())
+            y = int(await recv_message())
+            auth_success = zk.verify_fiat_shamir(X, e, y)
+
+        elif protocol == 2:  # Шнорр
+            y = int(await recv_message())
+            r = int(await recv_message())
+            e = zk.challenge(protocol)
+            await channel.send_message(str(e).encode())
+            s = int(await recv_message())
+            auth_success = zk.verify_schnorr(y, r, e, s)
+
+        elif protocol == 3:  # Гиллу-Кискатер
+            J = int(await recv_message())
+            X = int(await recv_message())
+            e = zk.challenge(protocol)
+            await channel.send_message(str(e).encode())
+            y = int(await recv_message())
+            auth_success = zk.verify_guillou_quisquater(J, X, e, y)
+
+        if not auth_success:
+            await channel.send_message(b"AUTH_FAILED")
+            print(f"[СЕРВЕР] Аутентификация клиента {addr} провалена!")
+            return
+
+        await channel.send_message(b"AUTH_SUCCESS")
+        print(f"[СЕРВЕР] Аутентификация клиента {addr} успешна!")
+
+        try:
+            # Заголовок загрузки UPLOAD: или старые FILENAME:/ENCRYPTION:/FILESIZE: - как в handle_client
+            header_data = (await asyncio.wait_for(channel.recv_message(), session_idle_timeout)).decode()
+            if channel.framed and is_session_request(header_data):
+                await serve_session_async(channel, addr, header_data)
+            else:
+                filename_data = header_data
                 if not filename_data.startswith("FILENAME:"):
                     print(f"[СЕРВЕР] Ошибка от {addr}: неверный формат имени файла")
                     return
-                    
                 filename = filename_data.replace("FILENAME:", "")
-                client_socket.send(b"OK")  # Подтверждаем получение
-                
-                # Получаем информацию о шифровании
-                encryption_data = client_socket.recv(1024).decode()
+                await channel.send_message(b"OK")
+
+                encryption_data = await recv_message(session_idle_timeout)
                 if not encryption_data.startswith("ENCRYPTION:"):
                     print(f"[СЕРВЕР] Ошибка от {addr}: неверный формат информации о шифровании")
                     return
-                    
                 encryption_info = encryption_data.replace("ENCRYPTION:", "")
-                client_socket.send(b"OK")  # Подтверждаем получение
+                await channel.send_message(b"OK")
                 print(f"[СЕРВЕР] Информация о шифровании от {addr}: {encryption_info}")
-                
-                # Получаем размер файла
-                filesize_data = client_socket.recv(1024).decode()
+
+                filesize_data = await recv_message(session_idle_timeout)
                 if not filesize_data.startswith("FILESIZE:"):
                     print(f"[СЕРВЕР] Ошибка от {addr}: неверный формат размера файла")
                     return
-                    
                 filesize = int(filesize_data.replace("FILESIZE:", ""))
+                await channel.send_message(b"READY")
                 print(f"[СЕРВЕР] Получаю зашифрованный файл от {addr}: {filename}, размер: {filesize} байт")
-                
-                # Отправляем готовность к приему
-                client_socket.send(b"READY")
-                
-                # Создаем уникальное имя файла для каждого клиента, чтобы избежать конфликтов
-                client_id = f"{addr[0]}_{addr[1]}"
-                encrypted_file = os.path.join(SAVE_DIR, f"{client_id}_encrypted_{filename}")
-                bytes_received = 0
-                
-                with open(encrypted_file, 'wb') as f:
-                    while bytes_received < filesize:
-                        data = client_socket.recv(4096)
-                        if not data:
-                            break
-                        f.write(data)
-                        bytes_received += len(data)
-                        
-                print(f"[СЕРВЕР] Зашифрованный файл от {addr} получен и сохранен как {encrypted_file}")
-                
-                # Расшифровываем файл
-                decrypted_file = os.path.join(SAVE_DIR, f"{client_id}_{filename}")
-                
-                # Парсим информацию о шифровании и расшифровываем соответственно
-                enc_parts = encryption_info.split(":")
-                
-                if enc_parts[0] == "FS":  # Фиат-Шамир
-                    N = int(enc_parts[1])
-                    secret = int(enc_parts[2])
-                    print(f"[СЕРВЕР] Расшифровка файла от {addr} с использованием Фиат-Шамир...")
-                    fiat_shamir.decrypt_fileFS(encrypted_file, decrypted_file, secret, N)
-                    
-                elif enc_parts[0] == "SH":  # Шнорр
-                    p = int(enc_parts[1])
-                    g = int(enc_parts[2])
-                    secret = int(enc_parts[3])
-                    print(f"[СЕРВЕР] Расшифровка файла от {addr} с использованием Шнорр...")
-                    shnorr_encryption.decrypt_fileSH(encrypted_file, decrypted_file, secret, g, p)
-                    
-                elif enc_parts[0] == "GQ":  # Гиллу-Кискатер
-                    N = int(enc_parts[1])
-                    v = int(enc_parts[2])
-                    secret = int(enc_parts[3])
-                    print(f"[СЕРВЕР] Расшифровка файла от {addr} с использованием Гиллу-Кискатер...")
-                    guillou_quisquater.decrypt_fileGQ(encrypted_file, decrypted_file, v, N)
-                
-                # Удаляем зашифрованный файл
-                os.remove(encrypted_file)
-                
-                print(f"[СЕРВЕР] Файл от {addr} успешно расшифрован и сохранен как {decrypted_file}")
-                
-                # Отправляем подтверждение
-                client_socket.send(f"FILE_RECEIVED: Файл {filename} успешно получен и расшифрован".encode())
-                
-            except Exception as e:
-                print(f"[СЕРВЕР] Ошибка при обработке файла от {addr}: {str(e)}")
-                client_socket.send(f"ERROR: {str(e)}".encode())
-            
-        else:
-            client_socket.send(b"AUTH_FAILED")
-            print(f"[СЕРВЕР] Аутентификация клиента {addr} провалена!")
-            
+                await receive_file_async(channel, addr, {"filename": filename, "encryption": encryption_info,
+                                                         "size": filesize})
+
+        except asyncio.TimeoutError:
+            print(f"[СЕРВЕР] Клиент {addr} не прислал заголовок загрузки за {session_idle_timeout} с")
+        except Exception as e:
+            print(f"[СЕРВЕР] Ошибка при обработке файла от {addr}: {str(e)}")
+            await channel.send_message(f"ERROR: {str(e)}".encode())
+
+    except asyncio.TimeoutError:
+        print(f"[СЕРВЕР] Клиент {addr} не прошел аутентификацию за {handshake_timeout} с")
     except Exception as e:
         print(f"[СЕРВЕР] Ошибка с клиентом {addr}: {str(e)}")
     finally:
-        client_socket.close()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
         print(f"[СЕРВЕР] Соединение с клиентом {addr} закрыто")
 
-# Запуск TCP-сервера
-server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-server_socket.bind(("0.0.0.0", 8080))
-server_socket.listen(5)
-
-print("[СЕРВЕР] Ожидание клиентов...")
-
-try:
-    while True:
-        client_socket, addr = server_socket.accept()
-        # Запуск нового потока для обработки клиента
-        client_thread = threading.Thread(target=handle_client, args=(client_socket, addr))
-        client_thread.daemon = True  # Поток завершится, когда завершится основной поток
-        client_thread.start()
-        print(f"[СЕРВЕР] Запущен новый поток для клиента {addr}")
-except KeyboardInterrupt:
-    print("[СЕРВЕР] Завершение работы сервера...")
-finally:
-    server_socket.close()
\ No newline at end of file
+# Сообщение об отказе клиенту при перегрузке сервера
+def log_rejected(addr, stats):
+    print(f"[СЕРВЕР] Сервер перегружен, клиенту {addr} отправлен BUSY "
+          f"(в очереди: {stats['queue_depth']}, отклонено всего: {stats['rejected']})")
+
+# Запуск TCP-сервера: подключения обрабатывает пул потоков с ограниченной очередью
+def run_threaded_server(host=HOST, port=PORT, workers=DEFAULT_WORKERS,
+                        queue_size=DEFAULT_QUEUE_SIZE, backlog=DEFAULT_BACKLOG,
+                        decrypt_workers=DEFAULT_DECRYPT_WORKERS):
+    start_decrypt_pool(decrypt_workers)
+    upload_store.purge()
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.bind((host, port))
+    server_socket.listen(backlog)
+
+    pool = ConnectionPool(handle_client, workers, queue_size,
+                          on_reject=lambda addr: log_rejected(addr, pool.stats()))
+    pool.start()
+
+    print(f"[СЕРВЕР] Ожидание клиентов... (обработчиков: {workers}, очередь: {queue_size}, backlog: {backlog})")
+
+    try:
+        while True:
+            client_socket, addr = server_socket.accept()
+            # Передаем клиента в пул; при переполненной очереди он сразу получит BUSY
+            if pool.submit(client_socket, addr):
+                print(f"[СЕРВЕР] Клиент {addr} поставлен в очередь (в очереди: {pool.queue_depth})")
+    except KeyboardInterrupt:
+        print("[СЕРВЕР] Завершение работы сервера...")
+    finally:
+        pool.stop()
+        server_socket.close()
+        decrypt_pool.stop(wait=False)
+        stats = pool.stats()
+        print(f"[СЕРВЕР] Принято клиентов: {stats['accepted']}, отклонено: {stats['rejected']}")
+
+# Запуск TCP-сервера на asyncio: все клиенты в одном цикле событий,
+# число одновременно обслуживаемых клиентов ограничено так же, как в пуле потоков
+async def serve_async(host=HOST, port=PORT, workers=DEFAULT_WORKERS,
+                      queue_size=DEFAULT_QUEUE_SIZE, backlog=DEFAULT_BACKLOG):
+    gate = AsyncConnectionGate(workers, queue_size)
+
+    async def on_connect(reader, writer):
+        if not gate.admit():
+            log_rejected(writer.get_extra_info("peername"), gate.stats())
+            writer.write(BUSY_REPLY)
+            writer.close()
+            return
+        async with gate:
+            await handle_client_async(reader, writer)
+
+    server = await asyncio.start_server(on_connect, host, port, backlog=backlog, reuse_address=True,
+                                        limit=recv_buffer_size)
+    print(f"[СЕРВЕР] Ожидание клиентов (asyncio)... (обработчиков: {workers}, очередь: {queue_size}, backlog: {backlog})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        stats = gate.stats()
+        print(f"[СЕРВЕР] Принято клиентов: {stats['accepted']}, отклонено: {stats['rejected']}")
+
+def run_async_server(host=HOST, port=PORT, workers=DEFAULT_WORKERS,
+                     queue_size=DEFAULT_QUEUE_SIZE, backlog=DEFAULT_BACKLOG,
+                     decrypt_workers=DEFAULT_DECRYPT_WORKERS):
+    start_decrypt_pool(decrypt_workers)
+    upload_store.purge()
+    try:
+        asyncio.run(serve_async(host, port, workers, queue_size, backlog))
+    except KeyboardInterrupt:
+        print("[СЕРВЕР] Завершение работы сервера...")
+    finally:
+        decrypt_pool.stop(wait=False)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сервер приема файлов с аутентификацией с нулевым разглашением")
+    parser.add_argument("--host", default=HOST, help="адрес для прослушивания")
+    parser.add_argument("--port", type=int, default=PORT, help="порт сервера")
+    parser.add_argument("--mode", choices=("threads", "asyncio"), default="threads",
+                        help="threads - пул потоков, asyncio - один цикл событий")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="число одновременно обслуживаемых клиентов")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="сколько клиентов может ждать обработчика, остальные получают BUSY")
+    parser.add_argument("--backlog", type=int, default=DEFAULT_BACKLOG,
+                        help="длина очереди входящих соединений для listen()")
+    parser.add_argument("--decrypt-workers", type=int, default=DEFAULT_DECRYPT_WORKERS,
+                        help="число процессов расшифровки (0 - расшифровывать в потоке клиента)")
+    parser.add_argument("--idle-timeout", type=float, default=SESSION_IDLE_TIMEOUT,
+                        help="сколько секунд сессия клиента может простаивать между загрузками")
+    parser.add_argument("--handshake-timeout", type=float, default=HANDSHAKE_TIMEOUT,
+                        help="сколько секунд ждать сообщений клиента до успешной аутентификации")
+    parser.add_argument("--soundness-bits", type=int, default=zk.DEFAULT_SOUNDNESS_BITS,
+                        help="минимальная стойкость параллельных раундов в битах (0 - без ограничения)")
+    parser.add_argument("--recv-buffer", type=int, default=RECV_BUFFER_SIZE,
+                        help="размер буфера приема соединения в байтах")
+    args = parser.parse_args()
+    # Требуемое число раундов должно быть достижимо для каждого протокола
+    for protocol in zk.PROTOCOL_NAMES:
+        try:
+            zk.rounds_for_soundness(protocol, args.soundness_bits)
+        except ValueError as e:
+            parser.error(str(e))
+    session_idle_timeout = args.idle_timeout
+    handshake_timeout = args.handshake_timeout
+    min_soundness_bits = args.soundness_bits
+    recv_buffer_size = args.recv_buffer
+
+    if args.mode == "asyncio":
+        run_async_server(args.host, args.port, args.workers, args.queue_size, args.backlog,
+                         args.decrypt_workers)
+    else:
+        run_threaded_server(args.host, args.port, args.workers, args.queue_size, args.backlog,
+                            args.decrypt_workers)
@@ -4,7 +4,6 @@ import socket
 import threading
 import queue
 import time
-import random
 from datetime import datetime
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
@@ -15,9 +14,15 @@ from PyQt6.QtCore import Qt, QTimer, pyqtSignal, pyqtSlot, QSize
 from PyQt6.QtGui import QPalette, QColor, QFont
 
 # Импортируем модули криптографии
-import crypto.fiat_shamir as fiat_shamir
-import crypto.shnorr_encryption as shnorr_encryption
-import crypto.guillou_quisquater as guillou_quisquater
+import crypto.nizk as nizk
+import crypto.zk_protocols as zk
+from crypto.decrypt_pool import DEFAULT_WORKERS as DEFAULT_DECRYPT_WORKERS, DecryptPool
+from crypto.encryption_info import check_info, context_from_info, info_compression, stream_decryptor
+from network.admission import DEFAULT_BACKLOG, DEFAULT_QUEUE_SIZE, DEFAULT_WORKERS, HANDSHAKE_TIMEOUT, ConnectionPool
+from network.channel import RECV_BUFFER_SIZE, accept_channel
+from network.framing import FrameError
+from network.resume import UploadStore, format_offset, is_resume_query, parse_resume_query
+from network.upload import CHUNK_RECEIVED, SESSION_END, SESSION_IDLE_TIMEOUT, is_upload_header, parse_upload_header
 
 # Директория для сохранения файлов
 SAVE_DIR = "received_files"
@@ -41,13 +46,26 @@ class ServerGUI(QMainWindow):
         self.server_running = False
         self.server_socket = None
         self.server_thread = None
-        self.client_threads = []
+        self.connection_pool = None
+        self.decrypt_pool = DecryptPool(0)  # до запуска сервера - расшифровка в потоке клиента
+        self.replay_cache = nizk.ReplayCache()  # использованные nonce неинтерактивных доказательств
+        self.upload_store = UploadStore(os.path.join(SAVE_DIR, ".partial"))  # прерванные загрузки
         self.log_queue = queue.Queue()
         self.clients = {}  # для хранения информации о клиентах
         
         # Порт сервера (по умолчанию 8080)
         self.port = "8080"
         
+        # Ограничения нагрузки: обработчики, очередь ожидания и backlog для listen()
+        self.workers = str(DEFAULT_WORKERS)
+        self.queue_size = str(DEFAULT_QUEUE_SIZE)
+        self.backlog = str(DEFAULT_BACKLOG)
+        self.decrypt_workers = str(DEFAULT_DECRYPT_WORKERS)
+        
+        # Минимальная стойкость параллельных раундов в битах (0 - без ограничения)
+        self.soundness_bits = str(zk.DEFAULT_SOUNDNESS_BITS)
+        self.min_soundness_bits = zk.DEFAULT_SOUNDNESS_BITS
+        
         # Создание интерфейса
         self.create_widgets()
         
@@ -60,6 +78,7 @@ class ServerGUI(QMainWindow):
         # Запуск таймера для обработки логов
         self.log_timer = QTimer(self)
         self.log_timer.timeout.connect(self.process_log_queue)
+        self.log_timer.timeout.connect(self.update_pool_stats)
         self.log_timer.start(100)
         
         # Применяем темную тему
@@ -203,6 +222,29 @@ class ServerGUI(QMainWindow):
         self.port_entry = QLineEdit(self.port)
         self.port_entry.setMaximumWidth(100)
         
+        # Размер пула обработчиков, очереди и backlog
+        workers_label = QLabel("Обработчики:")
+        self.workers_entry = QLineEdit(self.workers)
+        self.workers_entry.setMaximumWidth(50)
+        
+        queue_label = QLabel("Очередь:")
+        self.queue_entry = QLineEdit(self.queue_size)
+        self.queue_entry.setMaximumWidth(50)
+        
+        backlog_label = QLabel("Backlog:")
+        self.backlog_entry = QLineEdit(self.backlog)
+        self.backlog_entry.setMaximumWidth(50)
+        
+        # Число процессов расшифровки (0 - расшифровка в потоке клиента)
+        decrypt_workers_label = QLabel("Процессы расшифровки:")
+        self.decrypt_workers_entry = QLineEdit(self.decrypt_workers)
+        self.decrypt_workers_entry.setMaximumWidth(50)
+        
+        # Минимальная стойкость параллельных раундов
+        soundness_label = QLabel("Стойкость, бит:")
+        self.soundness_entry = QLineEdit(self.soundness_bits)
+        self.soundness_entry.setMaximumWidth(50)
+        
         # Кнопки управления сервером
         self.start_button = QPushButton("Запустить сервер")
         self.start_button.clicked.connect(self.start_server)
@@ -214,10 +256,24 @@ class ServerGUI(QMainWindow):
         # Добавляем элементы в панель настроек
         settings_layout.addWidget(port_label)
         settings_layout.addWidget(self.port_entry)
+        settings_layout.addWidget(workers_label)
+        settings_layout.addWidget(self.workers_entry)
+        settings_layout.addWidget(queue_label)
+        settings_layout.addWidget(self.queue_entry)
+        settings_layout.addWidget(backlog_label)
+        settings_layout.addWidget(self.backlog_entry)
+        settings_layout.addWidget(decrypt_workers_label)
+        settings_layout.addWidget(self.decrypt_workers_entry)
+        settings_layout.addWidget(soundness_label)
+        settings_layout.addWidget(self.soundness_entry)
         settings_layout.addWidget(self.start_button)
         settings_layout.addWidget(self.stop_button)
         settings_layout.addStretch()
         
+        # Счетчики нагрузки: активные обработчики, глубина очереди и отказы
+        self.pool_stats_label = QLabel()
+        settings_layout.addWidget(self.pool_stats_label)
+        
         # Разделительная линия
         separator = QFrame()
         separator.setFrameShape(QFrame.Shape.HLine)
@@ -290,6 +346,16 @@ class ServerGUI(QMainWindow):
         except queue.Empty:
             pass
     
+    def update_pool_stats(self):
+        """Обновляет счетчики нагрузки пула обработчиков"""
+        if not self.connection_pool:
+            self.pool_stats_label.setText("")
+            return
+        stats = self.connection_pool.stats()
+        self.pool_stats_label.setText(
+            f"Активно: {stats['active']} | В очереди: {stats['queue_depth']} | Отклонено: {stats['rejected']}"
+        )
+    
     @pyqtSlot(str)
     def append_log(self, message):
         """Добавляет сообщение в лог-виджет"""
@@ -313,7 +379,29 @@ class ServerGUI(QMainWindow):
             if port < 1 or port > 65535:
                 raise ValueError("Порт должен быть между 1 и 65535")
             
-            self.server_thread = threading.Thread(target=self.run_server, args=(port,))
+            workers = int(self.workers_entry.text())
+            queue_size = int(self.queue_entry.text())
+            backlog = int(self.backlog_entry.text())
+            decrypt_workers = int(self.decrypt_workers_entry.text())
+            if workers < 1 or queue_size < 0 or backlog < 1:
+                raise ValueError("Число обработчиков и backlog должны быть положительными, очередь - неотрицательной")
+            if decrypt_workers < 0:
+                raise ValueError("Число процессов расшифровки не может быть отрицательным")
+            soundness_bits = int(self.soundness_entry.text().strip() or 0)
+            if soundness_bits < 0:
+                raise ValueError("Стойкость не может быть отрицательной")
+            # Требуемое число раундов должно быть достижимо для каждого протокола
+            for protocol in zk.PROTOCOL_NAMES:
+                zk.rounds_for_soundness(protocol, soundness_bits)
+            self.min_soundness_bits = soundness_bits
+            
+            # Процессы расшифровки создаются до потока сервера
+            self.decrypt_pool = DecryptPool(decrypt_workers).start()
+            
+            # Брошенные частичные загрузки удаляем при каждом запуске
+            self.upload_store.purge()
+            
+            self.server_thread = threading.Thread(target=self.run_server, args=(port, workers, queue_size, backlog))
             self.server_thread.daemon = True
             self.server_thread.start()
             
@@ -324,7 +412,7 @@ class ServerGUI(QMainWindow):
             self.log(f"Сервер запущен на порту {port}")
             
         except ValueError as e:
-            QMessageBox.critical(self, "Ошибка", f"Некорректный порт: {str(e)}")
+            QMessageBox.critical(self, "Ошибка", f"Некорректные настройки сервера: {str(e)}")
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Не удалось запустить сервер: {str(e)}")
     
@@ -346,6 +434,15 @@ class ServerGUI(QMainWindow):
                 self.server_thread.join(1.0)
                 self.server_thread = None
             
+            # Ожидающим в очереди клиентам отправляется BUSY, обработчики завершаются
+            if self.connection_pool:
+                self.connection_pool.stop()
+                self.connection_pool = None
+            
+            # Останавливаем процессы расшифровки, не дожидаясь начатых задач
+            self.decrypt_pool.stop(wait=False)
+            self.decrypt_pool = DecryptPool(0)
+            
             # Очищаем список клиентов
             self.clients_tree.clear()
             self.clients = {}
@@ -358,16 +455,20 @@ class ServerGUI(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "Ошибка", f"Ошибка при остановке сервера: {str(e)}")
     
-    def run_server(self, port):
+    def run_server(self, port, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE, backlog=DEFAULT_BACKLOG):
         """Функция для запуска сервера в отдельном потоке"""
         try:
             self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.server_socket.bind(("0.0.0.0", port))
-            self.server_socket.listen(5)
+            self.server_socket.listen(backlog)
             self.server_socket.settimeout(1.0)  # Таймаут для возможности остановки сервера
             
-            self.log("Ожидание подключения клиентов...")
+            # Пул обработчиков с ограниченной очередью; лишние клиенты сразу получают BUSY
+            self.connection_pool = ConnectionPool(self.handle_client, workers, queue_size,
+                                                  on_reject=self.client_rejected).start()
+            
+            self.log(f"Ожидание подключения клиентов... (обработчиков: {workers}, очередь: {queue_size}, backlog: {backlog})")
             
             while self.server_running:
                 try:
@@ -379,21 +480,15 @@ class ServerGUI(QMainWindow):
                         "addr": addr,
                         "socket": client_socket,
                         "protocol": "Неизвестно",
-                        "status": "Подключен",
+                        "status": "В очереди",
                         "connected_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                     }
                     
                     # Обновляем отображение клиентов
                     self.clients_update_signal.emit()
                     
-                    # Запускаем поток для обработки клиента
-                    client_thread = threading.Thread(
-                        target=self.handle_client, 
-                        args=(client_socket, addr, client_id)
-                    )
-                    client_thread.daemon = True
-                    client_thread.start()
-                    self.client_threads.append(client_thread)
+                    # Передаем клиента в пул обработчиков
+                    self.connection_pool.submit(client_socket, addr, client_id)
                     
                 except socket.timeout:
                     # Таймаут нужен для проверки условия выхода из цикла
@@ -408,20 +503,45 @@ class ServerGUI(QMainWindow):
             if self.server_socket:
                 self.server_socket.close()
     
+    def client_rejected(self, addr, client_id):
+        """Клиенту отказано из-за перегрузки (очередь пула заполнена)"""
+        if client_id in self.clients:
+            del self.clients[client_id]
+            self.clients_update_signal.emit()
+        stats = self.connection_pool.stats()
+        self.log(f"Сервер перегружен, клиенту {addr} отправлен BUSY "
+                 f"(в очереди: {stats['queue_depth']}, отклонено всего: {stats['rejected']})")
+    
     def handle_client(self, client_socket, addr, client_id):
-        """Обработка клиента в отдельном потоке"""
+        """Обработка клиента в потоке из пула обработчиков"""
         self.log(f"Клиент подключился: {addr}")
+        if client_id in self.clients:
+            self.clients[client_id]["status"] = "Подключен"
+            self.clients_update_signal.emit()
         
         try:
-            # Получаем выбранный протокол
-            protocol_data = client_socket.recv(1024).decode().strip()
+            # Молчащий клиент не должен занимать обработчик: до аутентификации ожидание ограничено
+            client_socket.settimeout(HANDSHAKE_TIMEOUT)
+            # Новые клиенты открывают соединение преамбулой протокола с кадрами, старые - сразу номером протокола
+            channel = accept_channel(client_socket)
+            if channel.framed:
+                self.log(f"Клиент {addr} использует протокол с кадрами")
+            
+            # Получаем выбранный протокол, обязательства параллельных раундов
+            # или сразу неинтерактивное доказательство
+            protocol_data = channel.recv_message().decode().strip()
+            proof = rounds_request = None
             try:
-                protocol = int(protocol_data)
-                if protocol not in [1, 2, 3]:
-                    raise ValueError(f"Недопустимый протокол: {protocol}")
+                if nizk.is_proof(protocol_data):
+                    proof = nizk.parse_proof(protocol_data)
+                    protocol = proof["protocol"]
+                elif zk.is_rounds(protocol_data):
+                    rounds_request = zk.parse_rounds(protocol_data)
+                    protocol = rounds_request["protocol"]
+                else:
+                    protocol = zk.parse_protocol(protocol_data)
                 
-                protocol_names = {1: "Фиат-Шамир", 2: "Шнорр", 3: "Гиллу-Кискатер"}
-                protocol_name = protocol_names.get(protocol, "Неизвестный")
+                protocol_name = zk.PROTOCOL_NAMES[protocol]
                 
                 # Обновляем информацию о клиенте
                 self.clients[client_id]["protocol"] = protocol_name
@@ -431,188 +551,160 @@ class ServerGUI(QMainWindow):
             except ValueError as e:
                 self.log(f"Ошибка при получении протокола от {addr}: {e}")
                 self.log(f"Полученные данные: '{protocol_data}'")
-                client_socket.send(b"ERROR: Invalid protocol")
-                client_socket.close()
+                channel.send_message(b"ERROR: Invalid protocol")
                 return
             
             auth_success = False
             
-            if protocol == 1:  # Фиат-Шамир
-                # Устанавливаем параметры криптографии
-                n = 3233  # Простое число (p * q)
-                V = 2197  # Открытый ключ клиента
+            if proof:  # Неинтерактивный режим: вызовы k раундов - хэш доказательства, проверяем сразу
+                self.log(f"Получено неинтерактивное доказательство от {addr}")
+                auth_success = nizk.check_proof(proof, self.replay_cache)
+                
+            elif rounds_request:  # Параллельные раунды: все вызовы одним сообщением
+                rounds = len(rounds_request["commitments"])
+                challenge_vector = zk.challenges(protocol, rounds)
+                channel.send_message(zk.format_challenges(challenge_vector))
+                self.log(f"Отправлено {rounds} вызовов клиенту {addr}")
                 
+                responses_data = channel.recv_message().decode()
+                required = zk.rounds_for_soundness(protocol, self.min_soundness_bits)
+                if rounds < required:
+                    self.log(f"Клиент {addr} прислал {rounds} раундов, нужно не меньше {required}")
+                else:
+                    try:
+                        responses = zk.parse_responses(responses_data, rounds)
+                        # Открытый ключ клиента Фиат-Шамир известен серверу заранее
+                        public = zk.FS_V if protocol == 1 else rounds_request["public"]
+                        auth_success = zk.verify_rounds(protocol, public, rounds_request["commitments"],
+                                                        challenge_vector, responses)
+                        bits = rounds * zk.soundness_per_round(protocol)
+                        self.log(f"Проверено {rounds} раундов от {addr} (стойкость ~{bits:.0f} бит)")
+                    except ValueError as e:
+                        self.log(f"Некорректные ответы от {addr}: {e}")
+                
+            elif protocol == 1:  # Фиат-Шамир
                 # Получаем X от клиента
-                X = int(client_socket.recv(1024).decode())
+                X = int(channel.recv_message().decode())
                 self.log(f"Получено X от {addr}: {X}")
 
                 # Генерируем случайное e {0,1} и отправляем клиенту
-                e = random.randint(0, 1)
-                client_socket.send(str(e).encode())
+                e = zk.challenge(protocol)
+                channel.send_message(str(e).encode())
                 self.log(f"Отправлено e клиенту {addr}: {e}")
 
                 # Получаем y от клиента
-                y = int(client_socket.recv(1024).decode())
+                y = int(channel.recv_message().decode())
                 self.log(f"Получено y от {addr}: {y}")
 
                 # Проверяем условие y² = X * V^e mod n
-                auth_success = pow(y, 2, n) == ((X % n) * pow(V, e, n)) % n
+                auth_success = zk.verify_fiat_shamir(X, e, y)
                 
             elif protocol == 2:  # Шнорр
-                # Параметры для протокола Шнорра
-                p = 2267  # Простое число
-                q = 103   # Простой делитель p-1
-                g = 354   # Генератор подгруппы порядка q
-                
                 # Получаем открытый ключ от клиента
-                y = int(client_socket.recv(1024).decode())
+                y = int(channel.recv_message().decode())
                 
                 # Получаем r
-                r = int(client_socket.recv(1024).decode())
+                r = int(channel.recv_message().decode())
                 self.log(f"Получено r от {addr}: {r}")
                 
                 # Отправляем случайный вызов e
-                e = random.randint(1, q-1)
-                client_socket.send(str(e).encode())
+                e = zk.challenge(protocol)
+                channel.send_message(str(e).encode())
                 self.log(f"Отправлено e клиенту {addr}: {e}")
                 
                 # Получаем s от клиента
-                s = int(client_socket.recv(1024).decode())
+                s = int(channel.recv_message().decode())
                 self.log(f"Получено s от {addr}: {s}")
                 
                 # Проверяем g^s = r * y^e mod p
-                left_side = pow(g, s, p)
-                right_side = (r * pow(y, e, p)) % p
-                auth_success = (left_side == right_side)
+                auth_success = zk.verify_schnorr(y, r, e, s)
                 
             elif protocol == 3:  # Гиллу-Кискатер
-                # Параметры для протокола Гийо-Кискатер
-                n = 3233  # Модуль (p*q)
-                v = 17    # Открытая экспонента
-                
                 # Получаем открытый ключ от клиента
-                J = int(client_socket.recv(1024).decode())
+                J = int(channel.recv_message().decode())
                 
                 # Получаем X
-                X = int(client_socket.recv(1024).decode())
+                X = int(channel.recv_message().decode())
                 self.log(f"Получено X от {addr}: {X}")
                 
                 # Отправляем случайный вызов e
-                e = random.randint(1, v-1)
-                client_socket.send(str(e).encode())
+                e = zk.challenge(protocol)
+                channel.send_message(str(e).encode())
                 self.log(f"Отправлено e клиенту {addr}: {e}")
                 
                 # Получаем y от клиента
-                y = int(client_socket.recv(1024).decode())
+                y = int(channel.recv_message().decode())
                 self.log(f"Получено y от {addr}: {y}")
                 
                 # Проверяем y^v = X * J^e mod n
-                left_side = pow(y, v, n)
-                right_side = (X * pow(J, e, n)) % n
-                auth_success = (left_side == right_side)
+                auth_success = zk.verify_guillou_quisquater(J, X, e, y)
             
             # Обновляем статус клиента
             if auth_success:
                 self.clients[client_id]["status"] = "Аутентифицирован"
                 self.clients_update_signal.emit()
                 
-                client_socket.send(b"AUTH_SUCCESS")
+                channel.send_message(b"AUTH_SUCCESS")
                 self.log(f"Аутентификация клиента {addr} успешна!")
                 
                 try:
-                    # Получаем имя файла
-                    filename_data = client_socket.recv(1024).decode()
-                    if not filename_data.startswith("FILENAME:"):
-                        self.log(f"Ошибка от {addr}: неверный формат имени файла")
-                        return
+                    # Первое сообщение после аутентификации: единый заголовок UPLOAD: (протокол с кадрами)
+                    # или старая последовательность FILENAME:, ENCRYPTION:, FILESIZE: с подтверждениями
+                    # Дальше любое ожидание клиента ограничено таймаутом простоя сессии
+                    client_socket.settimeout(SESSION_IDLE_TIMEOUT)
+                    header_data = channel.recv_message().decode()
+                    if channel.framed and (is_upload_header(header_data) or is_resume_query(header_data)):
+                        self.serve_session(channel, addr, client_id, header_data)
+                    else:
+                        # Старый клиент: имя файла, информация о шифровании и размер с подтверждениями
+                        filename_data = header_data
+                        if not filename_data.startswith("FILENAME:"):
+                            self.log(f"Ошибка от {addr}: неверный формат имени файла")
+                            return
                         
-                    filename = filename_data.replace("FILENAME:", "")
-                    client_socket.send(b"OK")  # Подтверждаем получение
+                        filename = filename_data.replace("FILENAME:", "")
+                        channel.send_message(b"OK")  # Подтверждаем получение
                     
-                    # Получаем информацию о шифровании
-                    encryption_data = client_socket.recv(1024).decode()
-                    if not encryption_data.startswith("ENCRYPTION:"):
-                        self.log(f"Ошибка от {addr}: неверный формат информации о шифровании")
-                        return
+                        # Получаем информацию о шифровании
+                        encryption_data = channel.recv_message().decode()
+                        if not encryption_data.startswith("ENCRYPTION:"):
+                            self.log(f"Ошибка от {addr}: неверный формат информации о шифровании")
+                            return
                         
-                    encryption_info = encryption_data.replace("ENCRYPTION:", "")
-                    client_socket.send(b"OK")  # Подтверждаем получение
-                    self.log(f"Информация о шифровании от {addr}: {encryption_info}")
+                        encryption_info = encryption_data.replace("ENCRYPTION:", "")
+                        channel.send_message(b"OK")  # Подтверждаем получение
+                        self.log(f"Информация о шифровании от {addr}: {encryption_info}")
                     
-                    # Получаем размер файла
-                    filesize_data = client_socket.recv(1024).decode()
-                    if not filesize_data.startswith("FILESIZE:"):
-                        self.log(f"Ошибка от {addr}: неверный формат размера файла")
-                        return
+                        # Получаем размер файла
+                        filesize_data = channel.recv_message().decode()
+                        if not filesize_data.startswith("FILESIZE:"):
+                            self.log(f"Ошибка от {addr}: неверный формат размера файла")
+                            return
                         
-                    filesize = int(filesize_data.replace("FILESIZE:", ""))
-                    self.log(f"Получаю зашифрованный файл от {addr}: {filename}, размер: {filesize} байт")
+                        filesize = int(filesize_data.replace("FILESIZE:", ""))
+                        self.log(f"Получаю зашифрованный файл от {addr}: {filename}, размер: {filesize} байт")
                     
-                    # Отправляем готовность к приему
-                    client_socket.send(b"READY")
-                    
-                    # Создаем уникальное имя файла для каждого клиента
-                    encrypted_file = os.path.join(SAVE_DIR, f"{client_id}_encrypted_{filename}")
-                    bytes_received = 0
-                    
-                    with open(encrypted_file, 'wb') as f:
-                        while bytes_received < filesize:
-                            data = client_socket.recv(4096)
-                            if not data:
-                                break
-                            f.write(data)
-                            bytes_received += len(data)
-                            
-                    self.log(f"Зашифрованный файл от {addr} получен и сохранен как {encrypted_file}")
-                    
-                    # Расшифровываем файл
-                    decrypted_file = os.path.join(SAVE_DIR, f"{client_id}_{filename}")
-                    
-                    # Парсим информацию о шифровании и расшифровываем
-                    enc_parts = encryption_info.split(":")
-                    
-                    if enc_parts[0] == "FS":  # Фиат-Шамир
-                        N = int(enc_parts[1])
-                        secret = int(enc_parts[2])
-                        self.log(f"Расшифровка файла от {addr} с использованием Фиат-Шамир...")
-                        fiat_shamir.decrypt_fileFS(encrypted_file, decrypted_file, secret, N)
-                        
-                    elif enc_parts[0] == "SH":  # Шнорр
-                        p = int(enc_parts[1])
-                        g = int(enc_parts[2])
-                        secret = int(enc_parts[3])
-                        self.log(f"Расшифровка файла от {addr} с использованием Шнорр...")
-                        shnorr_encryption.decrypt_fileSH(encrypted_file, decrypted_file, secret, g, p)
+                        # Отправляем готовность к приему
+                        channel.send_message(b"READY")
                         
-                    elif enc_parts[0] == "GQ":  # Гиллу-Кискатер
-                        N = int(enc_parts[1])
-                        v = int(enc_parts[2])
-                        secret = int(enc_parts[3])
-                        self.log(f"Расшифровка файла от {addr} с использованием Гиллу-Кискатер...")
-                        guillou_quisquater.decrypt_fileGQ(encrypted_file, decrypted_file, v, N)
-                    
-                    # Удаляем зашифрованный файл
-                    os.remove(encrypted_file)
-                    
-                    self.log(f"Файл от {addr} успешно расшифрован и сохранен как {decrypted_file}")
-                    
-                    # Обновляем список файлов
-                    self.files_update_signal.emit()
-                    
-                    # Отправляем подтверждение
-                    client_socket.send(f"FILE_RECEIVED: Файл {filename} успешно получен и расшифрован".encode())
+                        self.receive_file(channel, addr, client_id, {"filename": filename, "size": filesize,
+                                                                     "encryption": encryption_info})
                     
+                except socket.timeout:
+                    self.log(f"Клиент {addr} не прислал заголовок загрузки за {SESSION_IDLE_TIMEOUT} с")
                 except Exception as e:
                     self.log(f"Ошибка при обработке файла от {addr}: {str(e)}")
-                    client_socket.send(f"ERROR: {str(e)}".encode())
+                    channel.send_message(f"ERROR: {str(e)}".encode())
                 
             else:
                 self.clients[client_id]["status"] = "Ошибка аутентификации"
                 self.clients_update_signal.emit()
                 
-                client_socket.send(b"AUTH_FAILED")
+                channel.send_message(b"AUTH_FAILED")
                 self.log(f"Аутентификация клиента {addr} провалена!")
                 
+        except socket.timeout:
+            self.log(f"Клиент {addr} не прошел аутентификацию за {HANDSHAKE_TIMEOUT} с")
         except Exception as e:
             self.log(f"Ошибка с клиентом {addr}: {str(e)}")
         finally:
@@ -624,6 +716,175 @@ class ServerGUI(QMainWindow):
             client_socket.close()
             self.log(f"Соединение с клиентом {addr} закрыто")
     
+    def receive_file(self, channel, addr, client_id, header):
+        """Прием одного файла: данные, расшифровка и подтверждение FILE_RECEIVED.
+        Небольшой файл расшифровывается на лету по мере прихода данных, без
+        промежуточного файла шифротекста; большой принимается шифротекстом и
+        расшифровывается в пуле процессов. Загрузка с upload_id копится в хранилище
+        частичных загрузок и после обрыва может быть продолжена; куски параллельной
+        загрузки собираются в шифротекст и расшифровываются целиком"""
+        filename, encryption_info, filesize = header["filename"], header["encryption"], header["size"]
+        upload_id = header.get("upload_id")
+        decrypted_file = os.path.join(SAVE_DIR, f"{client_id}_{filename}")
+        
+        # Проверяем информацию о шифровании (контекст ключа кэшируется)
+        algorithm, _ = context_from_info(encryption_info)
+        algorithm_names = {"FS": "Фиат-Шамир", "SH": "Шнорр", "GQ": "Гиллу-Кискатер"}
+        method = info_compression(encryption_info)
+        if method:
+            self.log(f"Открытый текст файла {filename} сжат методом {method}")
+        
+        if "length" in header:
+            # Кусок параллельной загрузки; файл расшифровывает соединение, принявшее последний кусок
+            with self.upload_store.begin_chunk(upload_id, filename, encryption_info, filesize,
+                                               header["offset"], header["length"]) as upload:
+                while not upload.complete:
+                    data = channel.recv_data(RECV_BUFFER_SIZE)
+                    if not data:
+                        break
+                    upload.write(data)
+            if not upload.complete:
+                self.log(f"Кусок {header['offset']} загрузки {upload_id} от {addr} прерван")
+                return
+            if not upload.assembled:
+                channel.send_message(f"{CHUNK_RECEIVED}: {header['offset']}".encode())
+                return
+            self.log(f"Зашифрованный файл от {addr} собран из кусков: {upload.path}")
+            self.log(f"Расшифровка файла от {addr} с использованием {algorithm_names[algorithm]}...")
+            
+            # Расшифровка идет в пуле процессов и не тормозит рукопожатия других клиентов
+            try:
+                self.decrypt_pool.decrypt(encryption_info, upload.path, decrypted_file)
+            finally:
+                self.upload_store.discard(upload_id)
+        elif upload_id:
+            self.log(f"Расшифровка файла от {addr} с использованием {algorithm_names[algorithm]}...")
+            # Небольшой несжатый файл расшифровывается на лету, и при фиксации смещения
+            # сохраняется состояние расшифровщика. Большой или сжатый копит шифротекст:
+            # пул процессов расшифрует (и распакует) его за один проход
+            decoder = None
+            if self.decrypt_pool.streams(filesize) and not method:
+                decoder = lambda state: stream_decryptor(encryption_info, state)
+            upload = self.upload_store.begin(upload_id, filename, encryption_info, filesize, header["offset"],
+                                             decoder=decoder)
+            try:
+                with upload:
+                    while not upload.complete:
+                        data = channel.recv_data(RECV_BUFFER_SIZE)
+                        if not data:
+                            break
+                        upload.write(data)
+                    if upload.complete:
+                        upload.finish()
+            except FrameError as e:
+                # Обрыв посреди кадра - не ошибка данных: зафиксированная часть сохранена,
+                # клиент продолжит загрузку с последней фиксации
+                self.log(f"Соединение с {addr} оборвано: {e}")
+            except ValueError:
+                # Шифротекст не расшифровывается - продолжать такую загрузку бессмысленно
+                self.upload_store.discard(upload_id)
+                raise
+            if not upload.complete:
+                self.log(f"Загрузка {upload_id} от {addr} прервана на {upload.offset} из {filesize} байт")
+                return
+            try:
+                if decoder is None:
+                    self.decrypt_pool.decrypt(encryption_info, upload.path, decrypted_file)
+                else:
+                    os.replace(upload.path, decrypted_file)
+            finally:
+                self.upload_store.discard(upload_id)
+        elif self.decrypt_pool.streams(filesize):
+            self.log(f"Расшифровка файла от {addr} с использованием {algorithm_names[algorithm]}...")
+            decryptor = stream_decryptor(encryption_info)
+            bytes_received = 0
+            
+            try:
+                with open(decrypted_file, 'wb') as f:
+                    while bytes_received < filesize:
+                        data = channel.recv_data(RECV_BUFFER_SIZE)
+                        if not data:
+                            break
+                        f.write(decryptor.feed(data))
+                        bytes_received += len(data)
+                    
+                    # Неполный файл не сохраняем
+                    if bytes_received < filesize:
+                        raise ConnectionError(f"Передача прервана: получено {bytes_received} из {filesize} байт")
+                    f.write(decryptor.finish())
+            except BaseException:
+                os.remove(decrypted_file)
+                raise
+        else:
+            # Большой файл принимаем шифротекстом: расшифровка в пуле процессов
+            # не тормозит рукопожатия других клиентов
+            encrypted_file = os.path.join(SAVE_DIR, f"{client_id}_encrypted_{filename}")
+            bytes_received = 0
+            
+            with open(encrypted_file, 'wb') as f:
+                while bytes_received < filesize:
+                    data = channel.recv_data(RECV_BUFFER_SIZE)
+                    if not data:
+                        break
+                    f.write(data)
+                    bytes_received += len(data)
+            
+            # Неполный файл не расшифровываем
+            if bytes_received < filesize:
+                os.remove(encrypted_file)
+                raise ConnectionError(f"Передача прервана: получено {bytes_received} из {filesize} байт")
+            
+            self.log(f"Зашифрованный файл от {addr} получен и сохранен как {encrypted_file}")
+            self.log(f"Расшифровка файла от {addr} с использованием {algorithm_names[algorithm]}...")
+            try:
+                self.decrypt_pool.decrypt(encryption_info, encrypted_file, decrypted_file)
+            finally:
+                os.remove(encrypted_file)
+        
+        self.log(f"Файл от {addr} успешно расшифрован и сохранен как {decrypted_file}")
+        
+        # Обновляем список файлов
+        self.files_update_signal.emit()
+        
+        # Отправляем подтверждение
+        channel.send_message(f"FILE_RECEIVED: Файл {filename} успешно получен и расшифрован".encode())
+    
+    def serve_session(self, channel, addr, client_id, header_data):
+        """Сессия клиента с кадрами: загрузки одна за другой без повторной аутентификации,
+        пока клиент не пришлет BYE, не закроет соединение или не будет простаивать
+        дольше SESSION_IDLE_TIMEOUT"""
+        uploads = 0
+        try:
+            while header_data and header_data != SESSION_END:
+                try:
+                    if is_resume_query(header_data):
+                        # Клиент продолжает прерванную загрузку: сообщаем зафиксированное смещение
+                        upload_id = parse_resume_query(header_data)
+                        offset = self.upload_store.offset(upload_id)
+                        self.log(f"Клиент {addr} продолжает загрузку {upload_id} со смещения {offset}")
+                        channel.send_message(format_offset(offset))
+                        header_data = channel.recv_message().decode()
+                        continue
+                    header = parse_upload_header(header_data)
+                    check_info(header["encryption"])
+                except ValueError as e:
+                    self.log(f"Заголовок загрузки от {addr} отклонен: {e}")
+                    channel.send_message(f"ERROR: {e}".encode())
+                    return
+                # Ответ не отправляем: клиент передает данные сразу за заголовком
+                self.log(f"Информация о шифровании от {addr}: {header['encryption']}")
+                self.log(f"Получаю зашифрованный файл от {addr}: {header['filename']}, "
+                         f"размер: {header['size']} байт, с байта {header['offset']}")
+                self.receive_file(channel, addr, client_id, header)
+                
+                uploads += 1
+                self.clients[client_id]["status"] = f"Сессия: принято файлов {uploads}"
+                self.clients_update_signal.emit()
+                header_data = channel.recv_message().decode()
+        except socket.timeout:
+            self.log(f"Сессия с {addr} закрыта: простой дольше {SESSION_IDLE_TIMEOUT} с")
+        self.log(f"Сессия с {addr} завершена, принято файлов: {uploads}")
+    
     @pyqtSlot()
     def _update_clients_list_gui(self):
         """Обновляет список клиентов в GUI"""
@@ -652,7 +913,7 @@ class ServerGUI(QMainWindow):
         
         try:
             if os.path.exists(SAVE_DIR):
-                files = [f for f in os.listdir(SAVE_DIR) if not f.startswith("encrypted_")]
+                files = [f for f in os.listdir(SAVE_DIR) if not f.startswith(("encrypted_", "."))]
                 
                 for file in files:
                     file_path = os.path.join(SAVE_DIR, file)